@@ -0,0 +1,275 @@
+"""User input activity sampling.
+
+Instead of running Python for every mouse move, a backend answers one
+question - "how many seconds since the last input?" - and a 1 Hz sampler
+thread turns the answers into a per-second ``DayBitmap``.
+
+Backends:
+- ``WindowsIdleBackend``: GetLastInputInfo, no input hooks at all.
+- ``XScreenSaverBackend``: XScreenSaverQueryInfo on X11, no hooks either.
+- ``ListenerBackend``: pynput hooks whose callbacks only store a monotonic
+  timestamp in a single slot; fallback where no idle query is available.
+"""
+
+from __future__ import annotations
+
+import ctypes
+import ctypes.util
+import sys
+import threading
+import time
+from datetime import date, datetime, timedelta
+from typing import Iterator, List, Optional, Protocol, Tuple
+
+SECONDS_PER_DAY = 86400
+
+
+class ActivityBackend(Protocol):
+    def start(self) -> None: ...
+
+    def stop(self) -> None: ...
+
+    def idle_seconds(self) -> float: ...
+
+
+class ListenerBackend:
+    """pynput hooks reduced to one attribute store per input event."""
+
+    def __init__(self) -> None:
+        self.last_input = time.monotonic()
+        self._listeners: list = []
+
+    def _touch(self, *_: object, **__: object) -> None:
+        self.last_input = time.monotonic()
+
+    def start(self) -> None:
+        from pynput import keyboard, mouse
+
+        self._listeners = [
+            keyboard.Listener(on_press=self._touch),
+            mouse.Listener(on_move=self._touch, on_click=self._touch, on_scroll=self._touch),
+        ]
+        for listener in self._listeners:
+            listener.start()
+
+    def stop(self) -> None:
+        for listener in self._listeners:
+            listener.stop()
+        self._listeners = []
+
+    def idle_seconds(self) -> float:
+        return max(0.0, time.monotonic() - self.last_input)
+
+
+class WindowsIdleBackend:
+    """GetLastInputInfo: the OS already tracks the last input tick."""
+
+    class _LastInputInfo(ctypes.Structure):
+        _fields_ = [("cbSize", ctypes.c_uint), ("dwTime", ctypes.c_uint)]
+
+    def __init__(self) -> None:
+        user32 = ctypes.windll.user32  # type: ignore[attr-defined]
+        kernel32 = ctypes.windll.kernel32  # type: ignore[attr-defined]
+        self._get_last_input = user32.GetLastInputInfo
+        self._get_tick = kernel32.GetTickCount
+        self._get_tick.restype = ctypes.c_uint
+        self._info = self._LastInputInfo()
+        self._info.cbSize = ctypes.sizeof(self._info)
+
+    def start(self) -> None:
+        pass
+
+    def stop(self) -> None:
+        pass
+
+    def idle_seconds(self) -> float:
+        if not self._get_last_input(ctypes.byref(self._info)):
+            return 0.0
+        # Both values are 32-bit tick counts; mask handles the 49.7 day wrap
+        return ((self._get_tick() - self._info.dwTime) & 0xFFFFFFFF) / 1000.0
+
+
+class XScreenSaverBackend:
+    """XScreenSaverQueryInfo idle time on X11 sessions."""
+
+    class _Info(ctypes.Structure):
+        _fields_ = [
+            ("window", ctypes.c_ulong),
+            ("state", ctypes.c_int),
+            ("kind", ctypes.c_int),
+            ("til_or_since", ctypes.c_ulong),
+            ("idle", ctypes.c_ulong),
+            ("eventMask", ctypes.c_ulong),
+        ]
+
+    def __init__(self) -> None:
+        x11_name = ctypes.util.find_library("X11")
+        xss_name = ctypes.util.find_library("Xss")
+        if not x11_name or not xss_name:
+            raise RuntimeError("libX11/libXss not available")
+        self._x11 = ctypes.cdll.LoadLibrary(x11_name)
+        self._xss = ctypes.cdll.LoadLibrary(xss_name)
+        self._x11.XOpenDisplay.restype = ctypes.c_void_p
+        self._x11.XDefaultRootWindow.argtypes = [ctypes.c_void_p]
+        self._x11.XDefaultRootWindow.restype = ctypes.c_ulong
+        self._xss.XScreenSaverAllocInfo.restype = ctypes.POINTER(self._Info)
+        self._xss.XScreenSaverQueryInfo.argtypes = [
+            ctypes.c_void_p,
+            ctypes.c_ulong,
+            ctypes.POINTER(self._Info),
+        ]
+        self._display = self._x11.XOpenDisplay(None)
+        if not self._display:
+            raise RuntimeError("cannot open X display")
+        self._root = self._x11.XDefaultRootWindow(self._display)
+        self._info = self._xss.XScreenSaverAllocInfo()
+
+    def start(self) -> None:
+        pass
+
+    def stop(self) -> None:
+        pass
+
+    def idle_seconds(self) -> float:
+        if not self._xss.XScreenSaverQueryInfo(self._display, self._root, self._info):
+            return 0.0
+        return self._info.contents.idle / 1000.0
+
+
+def create_backend(kind: str = "auto") -> ActivityBackend:
+    """Pick an idle-query backend, falling back to input listeners."""
+    if kind == "listener":
+        return ListenerBackend()
+    try:
+        if sys.platform == "win32":
+            return WindowsIdleBackend()
+        return XScreenSaverBackend()
+    except (OSError, RuntimeError, AttributeError):
+        if kind == "idle":
+            raise
+        return ListenerBackend()
+
+
+class DayBitmap:
+    """One bit per second of a calendar day (10800 bytes)."""
+
+    def __init__(self, day: date) -> None:
+        self.day = day
+        self.bits = bytearray(SECONDS_PER_DAY // 8)
+
+    def set(self, second: int) -> None:
+        if 0 <= second < SECONDS_PER_DAY:
+            self.bits[second >> 3] |= 1 << (second & 7)
+
+    def get(self, second: int) -> bool:
+        return bool(self.bits[second >> 3] & (1 << (second & 7)))
+
+    def count(self, start: int = 0, end: int = SECONDS_PER_DAY) -> int:
+        """Active seconds in [start, end)."""
+        start, end = max(0, start), min(SECONDS_PER_DAY, end)
+        if start >= end:
+            return 0
+        lo, hi = (start + 7) >> 3, end >> 3
+        if lo >= hi:
+            return sum(self.get(s) for s in range(start, end))
+        total = int.from_bytes(self.bits[lo:hi], "little").bit_count()
+        total += sum(self.get(s) for s in range(start, lo << 3))
+        total += sum(self.get(s) for s in range(hi << 3, end))
+        return total
+
+    def runs(self, start: int = 0, end: int = SECONDS_PER_DAY) -> Iterator[Tuple[int, int]]:
+        """Active intervals [a, b) within [start, end)."""
+        run_start: Optional[int] = None
+        for s in range(max(0, start), min(SECONDS_PER_DAY, end)):
+            if not self.bits[s >> 3]:
+                if run_start is not None:
+                    yield run_start, s
+                    run_start = None
+                continue
+            if self.get(s):
+                if run_start is None:
+                    run_start = s
+            elif run_start is not None:
+                yield run_start, s
+                run_start = None
+        if run_start is not None:
+            yield run_start, min(SECONDS_PER_DAY, end)
+
+
+def second_of_day(ts: datetime) -> int:
+    return ts.hour * 3600 + ts.minute * 60 + ts.second
+
+
+class ActivitySampler:
+    """Polls a backend once per ``interval`` and records active seconds."""
+
+    def __init__(self, backend: ActivityBackend, interval: float = 1.0) -> None:
+        self.backend = backend
+        self.interval = interval
+        self.bitmap = DayBitmap(datetime.now().date())
+        self._previous: Optional[DayBitmap] = None  # kept for windows spanning midnight
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        if self._thread is not None:
+            return
+        self.backend.start()
+        self._thread = threading.Thread(
+            target=self._run, name="wwa-activity", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=2)
+            self._thread = None
+        self.backend.stop()
+
+    def idle_seconds(self) -> float:
+        return self.backend.idle_seconds()
+
+    def active_within(self, seconds: float) -> bool:
+        return self.idle_seconds() <= seconds
+
+    def _bitmaps(
+        self, start: datetime, end: datetime
+    ) -> Iterator[Tuple[DayBitmap, int, int, datetime]]:
+        for bm in (self._previous, self.bitmap):
+            if bm is None:
+                continue
+            day_start = datetime.combine(bm.day, datetime.min.time())
+            a = int((start - day_start).total_seconds())
+            b = int((end - day_start).total_seconds())
+            if a < SECONDS_PER_DAY and b > 0:
+                yield bm, a, b, day_start
+
+    def active_seconds(self, start: datetime, end: datetime) -> int:
+        """Active seconds in [start, end)."""
+        return sum(bm.count(a, b) for bm, a, b, _ in self._bitmaps(start, end))
+
+    def runs(self, start: datetime, end: datetime) -> List[Tuple[datetime, datetime]]:
+        """Active intervals in [start, end), split at midnight."""
+        out = []
+        for bm, a, b, day_start in self._bitmaps(start, end):
+            for ra, rb in bm.runs(a, b):
+                out.append((day_start + timedelta(seconds=ra), day_start + timedelta(seconds=rb)))
+        return out
+
+    def sample(self, now: Optional[datetime] = None) -> None:
+        """Record the second of the most recent input, if it is recent."""
+        now = now or datetime.now()
+        idle = self.idle_seconds()
+        if idle > self.interval * 2:
+            return
+        last = now - timedelta(seconds=idle)
+        if last.date() != self.bitmap.day:
+            if last.date() < self.bitmap.day:
+                return
+            self._previous, self.bitmap = self.bitmap, DayBitmap(last.date())
+        self.bitmap.set(second_of_day(last))
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            self.sample()
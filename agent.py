@@ -0,0 +1,494 @@
+"""The agent runtime: tracker, reminders and OS integrations.
+
+Constructing an ``Agent`` has no side effects beyond restoring tracker
+state. ``start()`` only starts the session monitor, so lock events and
+``/status`` are served right away; the input sampler, presence poller,
+timers and heavy imports (pandas, numpy, requests) warm up on a
+background thread. Modules keep such imports inside the functions that
+need them. The HTTP layer (``app.create_app``) only calls into
+an ``Agent``, so it can be served by any threaded WSGI server. The runtime
+is per process: run one server process with many threads, not several
+worker processes.
+"""
+
+from __future__ import annotations
+
+import atexit
+import importlib
+import sys
+import threading
+import time
+from datetime import date, datetime, timedelta
+from typing import Any, Callable, Dict, Optional
+
+import metrics
+from activity import ActivitySampler, create_backend
+from broadcast import StatusBroadcaster
+from clock import EventClock, When
+from compaction import LockRetry
+from config import (
+    ACTIVITY_BACKEND,
+    ACTIVITY_SAMPLE_S,
+    EXPORT_EVERY_MIN,
+    EXTEND_BLOCK_MIN,
+    IDLE_BREAK_S,
+    INGEST_IDS,
+    INGEST_MAX_AHEAD_S,
+    LOCK_DEBOUNCE_S,
+    REMINDER_RULES,
+    RULES_RELOAD_S,
+    STATE_COMPACT_EVERY,
+    TEAM_PUSH_S,
+    TEAM_QUEUE_MAX,
+    TEAM_SERVER_URL,
+    TEAM_TOKEN,
+    TEAM_USER,
+    TRACKER_REORDER_S,
+    TRACKER_SNAPSHOT,
+    TRACKER_TAIL,
+    WORK_TARGET_MIN,
+)
+from engine import DayState, Rules
+from ingest import EVENT_TYPES, EventIngestor
+from journal import Journal
+from notifier import LookFarWindow, StandUpWindow, ask_yes_no, window_stats
+from notifier import dispatcher as reveal_dispatcher
+from policy import PolicyFile, ReminderRule
+from presence import in_call_via_graph
+from presence import service as presence_service
+from scheduler import Scheduler
+from session import SessionPipeline
+from state_store import StateStore
+from storage import (
+    export_stats,
+    flush,
+    log_activity,
+    log_activity_rows,
+    log_tracker_event,
+    maintain,
+    shutdown,
+    tracker_events_on,
+    writer_stats,
+)
+from storage import writer as log_writer
+from team_client import TeamUplink
+from tracker import WorkTracker
+from ui import ui
+from windows_lock import start_windows_session_monitor
+
+
+WARM_MODULES = ("numpy", "pandas", "requests")
+WINDOWS = {"lookfar": LookFarWindow, "standup": StandUpWindow}
+
+
+def thread_stats() -> dict:
+    by_name: dict = {}
+    for t in threading.enumerate():
+        name = t.name.split("-")[0] if not t.name.startswith("wwa-") else t.name
+        by_name[name] = by_name.get(name, 0) + 1
+    return {"total": threading.active_count(), "by_name": by_name}
+
+
+class _Reminder:
+    """Today's progress of one reminder rule."""
+
+    def __init__(self, rule: ReminderRule) -> None:
+        self.rule = rule
+        self.timer = f"remind:{rule.name}"
+        self.reset()
+
+    def reset(self) -> None:
+        self.anchor: Optional[datetime] = None  # last shown (or reset by a break)
+        self.anchor_work = 0.0  # work minutes at ``anchor``
+        self.fired = 0
+        self.ignored = 0
+
+
+class Agent:
+    """The runtime. ``clock``, ``sched``, ``in_call``, ``windows`` and ``ask``
+    default to the real ones; simulation.py passes virtual stand-ins."""
+
+    def __init__(
+        self,
+        clock: Optional[EventClock] = None,
+        sched: Optional[Scheduler] = None,
+        in_call: Callable[[], bool] = in_call_via_graph,
+        windows: Optional[Dict[str, Any]] = None,
+        ask: Callable[..., None] = ask_yes_no,
+    ) -> None:
+        self.clock = clock or EventClock()
+        self.in_call = in_call
+        self.windows = windows or WINDOWS
+        self.ask = ask
+        self.rules = PolicyFile(REMINDER_RULES)
+        self.uplink: Optional[TeamUplink] = None
+        if TEAM_SERVER_URL and TEAM_USER:
+            self.uplink = TeamUplink(
+                TEAM_SERVER_URL, TEAM_USER, token=TEAM_TOKEN,
+                interval=TEAM_PUSH_S, max_queue=TEAM_QUEUE_MAX,
+            )
+        self.tracker = WorkTracker(
+            store=StateStore(
+                TRACKER_SNAPSHOT, TRACKER_TAIL, compact_every=STATE_COMPACT_EVERY, writer=log_writer,
+            ),
+            on_event=self._on_tracker_event,
+            history=tracker_events_on,
+            clock=self.clock,
+            reorder_s=TRACKER_REORDER_S,
+            rules=Rules(break_free=timedelta(minutes=self.rules.policy.break_free_min)),
+        )
+        self.broadcaster = StatusBroadcaster()
+        self.ingestor = EventIngestor(
+            self.tracker, log_activity_rows, ids=Journal(INGEST_IDS), max_ahead_s=INGEST_MAX_AHEAD_S,
+        )
+        self.sampler: Optional[ActivitySampler] = None
+        self.sched = sched or Scheduler()
+        self.maintenance = LockRetry(
+            maintain, lambda delay, _job: self.sched.after("maintenance", delay),
+            max_delay=EXPORT_EVERY_MIN * 60,
+        )
+        self.session = SessionPipeline(
+            self.handle_lock, self.handle_unlock, clock=self.clock, debounce_s=LOCK_DEBOUNCE_S
+        )
+        self.monitor = None
+        self.started = False
+        self.ready = threading.Event()
+        self.warmup_s: Optional[float] = None
+        self._warmup: Optional[threading.Thread] = None
+
+        self.reminders: Dict[str, _Reminder] = {}
+        self._reminder_day: Optional[date] = None
+        self.end_target_min = WORK_TARGET_MIN
+        self.extend_prompt_open = False
+        self.last_tick = self.clock.now()
+        self._break_seen: Optional[datetime] = None
+        self._remind_lock = threading.Lock()
+
+        # Timers only fire once the scheduler is started while warming up
+        self.sched.add("activity", self.minute_tick, interval=60)
+        # One timer: a retry moves its deadline, and it never runs twice at once
+        self.sched.add("maintenance", self.maintenance, interval=EXPORT_EVERY_MIN * 60, blocking=True)
+        self.sched.add("end_of_day", self._remind_end_of_day)
+        self.sched.add("rules", self.reload_rules, interval=RULES_RELOAD_S)
+        self.apply_policy()
+
+        self.tracker.subscribe(self.publish_status)
+        self.tracker.subscribe(self.reschedule_reminders)
+        self.publish_status()
+
+        metrics.gauge(
+            "wwa_threads", "Live threads by name.",
+            lambda: {(k,): v for k, v in thread_stats()["by_name"].items()}, ("name",),
+        )
+        metrics.gauge("wwa_stream_subscribers", "Open /stream connections.",
+                      self.broadcaster.subscribers)
+        metrics.gauge(
+            "wwa_work_minutes", "Today's accumulated minutes.",
+            lambda: {(k.split("_")[0],): v for k, v in self.tracker.state.snapshot().items()},
+            ("kind",),
+        )
+
+    def _log(self, event: str, details: str, s: dict) -> None:
+        log_activity(
+            event,
+            details=details,
+            work_min=s["work_minutes"],
+            break_min=s["break_minutes"],
+            absence_min=s["absence_minutes"],
+            at=self.clock.now(),
+        )
+
+    def _on_tracker_event(self, kind: str, ts: datetime, value: float = 0.0) -> None:
+        log_tracker_event(kind, ts, value)
+        if self.uplink is not None:
+            self.uplink.submit(kind, ts, value)
+
+    # Lifecycle
+    def start(self) -> None:
+        if self.started:
+            return
+        self.started = True
+        if sys.platform == "win32":
+            # The window procedure only enqueues; the tracker runs on the session thread
+            self.session.start()
+            self.monitor = start_windows_session_monitor(
+                on_lock=self.session.lock, on_unlock=self.session.unlock
+            )
+        atexit.register(self.stop)
+        self._warmup = threading.Thread(target=self._warm_start, name="wwa-warmup", daemon=True)
+        self._warmup.start()
+
+    def _warm_start(self) -> None:
+        """Everything not needed for the first requests; sets ``ready``."""
+        t0 = time.perf_counter()
+        sampler = ActivitySampler(create_backend(ACTIVITY_BACKEND), interval=ACTIVITY_SAMPLE_S)
+        try:
+            sampler.start()
+        except ImportError as exc:  # e.g. pynput without a display
+            print(f"Input activity unavailable: {exc}", file=sys.stderr)
+        else:
+            self.sampler = sampler
+        presence_service.subscribe(lambda _in_call: reveal_dispatcher.check())
+        presence_service.start()
+        if self.uplink is not None:
+            self.uplink.start()
+        self.sched.after("activity", 0)
+        self.sched.after("maintenance", 0)  # first start: imports old workbooks
+        self.sched.start()
+        # Pay for the heavy imports now rather than inside the first export or poll
+        for name in WARM_MODULES:
+            try:
+                importlib.import_module(name)
+            except ImportError:
+                pass
+        self.warmup_s = time.perf_counter() - t0
+        self.ready.set()
+
+    def stop(self) -> None:
+        if not self.started:
+            return
+        self.started = False
+        if self._warmup is not None:
+            self._warmup.join(timeout=10)
+        self.sched.stop()
+        ui.stop()  # reminder windows; the main loop runs only if one was shown
+        if self.monitor is not None:
+            self.monitor.stop()
+        self.session.stop()
+        if self.sampler is not None:
+            self.sampler.stop()
+        presence_service.stop()
+        if self.uplink is not None:
+            self.uplink.stop()
+        self.tracker.checkpoint()
+        shutdown()
+
+    # Status
+    def full_status(self) -> dict:
+        s = self.tracker.get_status()
+        return {
+            **s,
+            "target_minutes": self.end_target_min,
+            "remaining_minutes": max(0, round(self.end_target_min - s["work_minutes"], 1)),
+        }
+
+    def publish_status(self) -> None:
+        self.broadcaster.publish(self.full_status())
+
+    def stats(self) -> dict:
+        return {
+            "writer": writer_stats(),
+            "threads": thread_stats(),
+            "pending_reveals": reveal_dispatcher.pending(),
+            "reminder_windows": window_stats(),
+            "stream_subscribers": self.broadcaster.subscribers(),
+            "team_uplink": self.uplink.stats() if self.uplink is not None else None,
+            "session": self.session.stats(),
+            "maintenance_retries": self.maintenance.retries,
+            "export": export_stats(),
+            "late_events": self.tracker.late_events,
+            "past_day_events": self.tracker.past_events,
+            "warmup_s": None if self.warmup_s is None else round(self.warmup_s, 3),
+            "timers": self.sched.stats(),
+            "rules": {
+                "path": str(self.rules.path),
+                "loads": self.rules.loads,
+                "error": self.rules.error,
+                "reminders": [r.name for r in self.rules.policy.reminders],
+            },
+        }
+
+    # Commands
+    def start_work(self) -> None:
+        self._log("start_work", "manual", self.tracker.start_work())
+
+    def end_work(self) -> None:
+        self._log("end_work", "manual", self.tracker.end_work())
+
+    def handle_event(self, data: dict) -> None:
+        """Single /event payload; unknown types are ignored."""
+        kind = data.get("type")
+        if kind not in EVENT_TYPES:
+            return
+        method, detail_field = EVENT_TYPES[kind]
+        self._log(kind, data.get(detail_field, ""), getattr(self.tracker, method)())
+
+    def handle_lock(self, at: When = None) -> None:
+        self._log("lock", "windows", self.tracker.break_start(at or self.tracker.clock.stamp()))
+        # fsync boundary before the session goes away
+        self.tracker.release(force=True)
+        flush(wait=False)
+
+    def handle_unlock(self, at: When = None) -> None:
+        self._log("unlock", "windows", self.tracker.break_end(at or self.tracker.clock.stamp()))
+
+    # Timers
+    def minute_tick(self) -> None:
+        """Credit exact active seconds since the previous tick; long idle -> break.
+
+        The newest seconds may not be sampled yet, so they go to the next tick.
+        """
+        now = self.clock.now()
+        if self.sampler is not None:
+            upto = now - timedelta(seconds=2 * ACTIVITY_SAMPLE_S)
+            self.tracker.record_activity(
+                upto, self.sampler.runs(self.last_tick, upto), timedelta(seconds=IDLE_BREAK_S)
+            )
+            self.last_tick = upto
+        self.publish_status()  # also covers day rollover
+        reveal_dispatcher.check()
+
+    def _working(self) -> bool:
+        s = self.tracker.state
+        return bool(s.start_ts) and not s.end_ts
+
+    def reload_rules(self) -> None:
+        error = self.rules.error
+        changed = self.rules.reload()
+        if self.rules.error and self.rules.error != error:
+            print(f"Reminder rules not loaded, keeping the previous ones: {self.rules.error}",
+                  file=sys.stderr)
+        if changed:
+            self.apply_policy()
+
+    def apply_policy(self) -> None:
+        """Switch to the current rules; reminders keep today's progress by name."""
+        policy = self.rules.policy
+        self.tracker.rules = Rules(break_free=timedelta(minutes=policy.break_free_min))
+        with self._remind_lock:
+            names = {rule.name for rule in policy.reminders}
+            for name in [n for n in self.reminders if n not in names]:
+                self.sched.remove(self.reminders.pop(name).timer)
+            for rule in policy.reminders:
+                reminder = self.reminders.get(rule.name)
+                if reminder is None:
+                    reminder = self.reminders[rule.name] = _Reminder(rule)
+                    self.sched.add(reminder.timer, lambda r=reminder: self._remind(r))
+                reminder.rule = rule
+        self.reschedule_reminders()
+
+    def reschedule_reminders(self) -> None:
+        """Recompute every reminder deadline from the current state.
+
+        Called on each tracker change and after a reminder fires; nothing
+        polls. A break of at least a rule's ``reset_after_break_min`` counts
+        as the reminder having been followed.
+        """
+        with self._remind_lock:
+            self._reschedule(self.tracker.state, self.clock.now())
+
+    def _reschedule(self, state: DayState, now: datetime) -> None:
+        if state.day != self._reminder_day:
+            self._reminder_day = state.day
+            for reminder in self.reminders.values():
+                reminder.reset()
+        long_break: Optional[timedelta] = None
+        if state.in_break:
+            self._break_seen = self._break_seen or state.break_started or now
+        elif self._break_seen is not None:
+            long_break, self._break_seen = now - self._break_seen, None
+
+        working = self._working()
+        work = state.work_effective.total_seconds() / 60
+        for reminder in self.reminders.values():
+            if not working:
+                self.sched.cancel(reminder.timer)
+                continue
+            reset = reminder.rule.reset_after_break_min
+            if long_break is not None and reset is not None and long_break >= timedelta(minutes=reset):
+                reminder.anchor, reminder.anchor_work = now, work
+            self._schedule(reminder, state, now, work)
+
+        if not working or self.extend_prompt_open:
+            self.sched.cancel("end_of_day")
+        else:
+            # Work accrues at most in real time, so the target cannot be hit earlier
+            left = self.end_target_min - work
+            self._at("end_of_day", now + timedelta(minutes=max(0.0, left)))
+
+    def _schedule(self, reminder: _Reminder, state: DayState, now: datetime, work: float) -> None:
+        rule = reminder.rule
+        if reminder.anchor is None and rule.at_start:
+            due = now
+        elif rule.clock == "work":
+            due = now + timedelta(minutes=rule.every_min - (work - reminder.anchor_work))
+        else:
+            due = (reminder.anchor or state.start_ts or now) + timedelta(minutes=rule.every_min)
+        self._at(reminder.timer, due)
+
+    def _at(self, name: str, when: datetime) -> None:
+        """Set a timer's deadline from a wall-clock time."""
+        self.sched.after(name, (when - self.clock.now()).total_seconds())
+
+    def _remind(self, reminder: _Reminder) -> None:
+        with self._remind_lock:
+            if not self._working() or self.reminders.get(reminder.rule.name) is not reminder:
+                return
+            rule, state, now = reminder.rule, self.tracker.state, self.clock.now()
+            work = state.work_effective.total_seconds() / 60
+            if (rule.clock == "work" and not (reminder.anchor is None and rule.at_start)
+                    and work - reminder.anchor_work < rule.every_min):
+                self._schedule(reminder, state, now, work)  # fired early: less work than time
+                return
+            window = self.windows[rule.window]
+            in_call = self.in_call()
+            ignored = reminder.ignored + 1 if window.showing() else 0
+            escalated = rule.escalate_after is not None and ignored >= rule.escalate_after
+            facts = {
+                "working": True,
+                "in_break": state.in_break,
+                "in_call": in_call,
+                "youtube": state.youtube_on,
+                "work_min": work,
+                "break_min": state.break_total.total_seconds() / 60,
+                "absence_min": state.absence_total.total_seconds() / 60,
+                "hour": now.hour + now.minute / 60,
+                "weekday": now.weekday(),
+                "ignored": ignored,
+                "fired_today": reminder.fired,
+            }
+            if not rule.check(facts) or (in_call and rule.in_call == "defer" and not escalated):
+                self.sched.after(reminder.timer, rule.recheck_min * 60)
+                return
+            reminder.anchor, reminder.anchor_work = now, work
+            reminder.fired += 1
+            reminder.ignored = ignored
+            self._schedule(reminder, state, now, work)
+        details = ", ".join(
+            ([rule.name] if rule.name != rule.window else []) + (["escalated"] if escalated else [])
+        )
+        self._log(f"{rule.window}_show", details, self.tracker.get_status())
+        if in_call and rule.in_call == "minimize" and not escalated:
+            window.fire(minimized=True, reveal_when=lambda: not self.in_call())
+        else:
+            window.fire()
+
+    def _remind_end_of_day(self) -> None:
+        status = self.tracker.get_status()
+        if (self._working() and status["work_minutes"] >= self.end_target_min
+                and not self.extend_prompt_open):
+            self._ask_extend(status)
+        else:
+            self.reschedule_reminders()
+
+    def _ask_extend(self, status: dict) -> None:
+        def _on_answer(yes: bool) -> None:
+            self.extend_prompt_open = False
+            if yes:
+                self._log("end_work", "auto by target", status)
+                self.tracker.end_work()
+            else:
+                self.end_target_min += EXTEND_BLOCK_MIN
+                self.publish_status()
+                self._log("extend_day", f"+{EXTEND_BLOCK_MIN} min", status)
+                self.reschedule_reminders()
+
+        self.extend_prompt_open = True
+        self.ask(
+            title="Koniec pracy",
+            message=(
+                "Masz 8h pracy. Zakończyć na dziś? "
+                "Kliknij 'Nie' aby wydłużyć o 15 minut."
+            ),
+            on_answer=_on_answer,
+        )
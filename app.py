@@ -1,285 +1,173 @@
 from __future__ import annotations
 
+import argparse
 import sys
-import threading
-from datetime import datetime, timedelta
+import time
 from typing import Optional
 
-from apscheduler.schedulers.background import BackgroundScheduler
-from flask import Flask, request, send_from_directory
+from flask import Flask, Response, g, request, send_from_directory
 from flask_cors import CORS
-from pynput import keyboard, mouse
 
-from config import (
-    EXTEND_BLOCK_MIN,
-    LOOK_FAR_EVERY_MIN,
-    SERVER_PORT,
-    STAND_UP_EVERY_MIN,
-    STANDUP_RESET_IDLE_MIN,
-    WORK_TARGET_MIN,
-)
-from notifier import LookFarWindow, StandUpWindow
-from presence import in_call_via_graph
-from storage import log_activity
-from tracker import WorkTracker
-from windows_lock import start_windows_session_monitor
-
-app = Flask(__name__, static_folder="templates")
-CORS(app)
-tracker = WorkTracker()
-
-sched = BackgroundScheduler()
-last_lookfar: Optional[datetime] = None
-last_standup_prompt: Optional[datetime] = None
-last_standup_reset: datetime = datetime.now()
-end_target_min = WORK_TARGET_MIN
-
-last_input_ts = datetime.now()
-
-
-def _on_any_input(_=None) -> None:
-    global last_input_ts
-    last_input_ts = datetime.now()
-
-
-keyboard.Listener(on_press=_on_any_input).start()
-mouse.Listener(on_move=_on_any_input, on_click=lambda *a, **k: _on_any_input()).start()
-
-
-def _handle_lock() -> None:
-    s = tracker.break_start()
-    log_activity(
-        "lock",
-        details="windows",
-        work_min=s["work_minutes"],
-        break_min=s["break_minutes"],
-        absence_min=s["absence_minutes"],
-    )
-
-
-def _handle_unlock() -> None:
-    s = tracker.break_end()
-    log_activity(
-        "unlock",
-        details="windows",
-        work_min=s["work_minutes"],
-        break_min=s["break_minutes"],
-        absence_min=s["absence_minutes"],
-    )
-
-
-if sys.platform == "win32":
-    start_windows_session_monitor(on_lock=_handle_lock, on_unlock=_handle_unlock)
+import metrics
+from agent import Agent
+from config import SERVER_HOST, SERVER_MODE, SERVER_PORT, SERVER_STREAMS, SERVER_THREADS
+from serving import date_range, serve
+from storage import export_all, flush, history
 
+REQUEST_SECONDS = metrics.histogram(
+    "wwa_http_request_seconds", "HTTP handler latency.", ("route", "method", "status")
+)
 
-def minute_tick() -> None:
-    """Runs every minute."""
-    global last_lookfar, last_standup_prompt, last_standup_reset, end_target_min
-    now = datetime.now()
 
-    # Count active minute if any input within last 60s and no break
-    if (now - last_input_ts) <= timedelta(seconds=60):
-        tracker.tick_active_minute()
-        if tracker.state.in_break:
-            tracker.break_end()
-    else:
-        tracker.break_start()
+def create_app(agent: Optional[Agent] = None, max_streams: int = SERVER_STREAMS) -> Flask:
+    """HTTP layer over an ``Agent``. The agent is not started here.
 
-    # Heuristic: if in break for >= STANDUP_RESET_IDLE_MIN, treat as stood up
-    if tracker.state.in_break and tracker.state.break_started:
-        if (now - tracker.state.break_started) >= timedelta(
-                minutes=STANDUP_RESET_IDLE_MIN
-        ):
-            last_standup_reset = now
+    Each open ``/stream`` holds a server thread for as long as it is
+    connected, so at most ``max_streams`` are served at a time; more get a
+    503 and the clients fall back to polling ``/status``.
+    """
+    agent = agent or Agent()
+    app = Flask(__name__, static_folder="templates")
+    CORS(app)
+    app.extensions["wwa_agent"] = agent
 
-    status = tracker.get_status()
-    in_call = in_call_via_graph()
+    @app.before_request
+    def _start_timer() -> None:
+        g.t0 = time.perf_counter()
 
-    # Look far
-    if tracker.state.start_ts:
-        due_look = (not last_lookfar) or (
-                (now - last_lookfar) >= timedelta(minutes=LOOK_FAR_EVERY_MIN)
+    @app.after_request
+    def _observe(response: Response) -> Response:
+        rule = request.url_rule.rule if request.url_rule is not None else "unmatched"
+        REQUEST_SECONDS.observe(
+            time.perf_counter() - g.t0, rule, request.method, str(response.status_code)
         )
-        if due_look:
-            last_lookfar = now
-            log_activity(
-                "lookfar_show",
-                details="",
-                work_min=status["work_minutes"],
-                break_min=status["break_minutes"],
-                absence_min=status["absence_minutes"],
-            )
-            if in_call:
-                LookFarWindow().show_and_log(
-                    minimized=True, reveal_when=lambda: not in_call_via_graph()
-                )
-            else:
-                LookFarWindow().show_and_log()
-
-    # Stand up
-    if tracker.state.start_ts:
-        need_stand = (now - last_standup_reset) >= timedelta(
-            minutes=STAND_UP_EVERY_MIN
+        return response
+
+    @app.get("/status")
+    def status() -> tuple[dict, int]:
+        return agent.full_status(), 200
+
+    @app.get("/stream")
+    def stream():
+        """Server-Sent Events: full status on connect, then changed fields only."""
+        sub = agent.broadcaster.subscribe(limit=max_streams)
+        if sub is None:
+            return {"ok": False, "error": "too many streams"}, 503, {"Retry-After": "60"}
+        response = Response(
+            agent.broadcaster.sse(sub),
+            mimetype="text/event-stream",
+            headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
         )
-        if need_stand and (
-                not last_standup_prompt
-                or (now - last_standup_prompt) >= timedelta(minutes=STAND_UP_EVERY_MIN)
-        ):
-            last_standup_prompt = now
-            log_activity(
-                "standup_show",
-                details="",
-                work_min=status["work_minutes"],
-                break_min=status["break_minutes"],
-                absence_min=status["absence_minutes"],
-            )
-            if in_call:
-                StandUpWindow().show_and_log(
-                    minimized=True, reveal_when=lambda: not in_call_via_graph()
-                )
-            else:
-                StandUpWindow().show_and_log()
-
-    # End-of-day
-    worked = status["work_minutes"]
-    if tracker.state.start_ts and worked >= end_target_min:
-        def _ask_extend(
-                worked_val: float, break_val: float, absence_val: float
-        ) -> None:
-            import tkinter as tk
-            from tkinter import messagebox
-
-            global end_target_min
-            root = tk.Tk()
-            root.withdraw()
-            yes = messagebox.askyesno(
-                title="Koniec pracy",
-                message=(
-                    "Masz 8h pracy. Zakończyć na dziś? "
-                    "Kliknij 'Nie' aby wydłużyć o 15 minut."
-                ),
-            )
-            if yes:
-                log_activity(
-                    "end_work",
-                    details="auto by target",
-                    work_min=worked_val,
-                    break_min=break_val,
-                    absence_min=absence_val,
+        # Also when the body is never iterated (the client left at once)
+        response.call_on_close(lambda: agent.broadcaster.unsubscribe(sub))
+        return response
+
+    @app.post("/start")
+    def start_work() -> tuple[dict, int]:
+        agent.start_work()
+        return {"ok": True}, 200
+
+    @app.post("/end")
+    def end_work() -> tuple[dict, int]:
+        agent.end_work()
+        return {"ok": True}, 200
+
+    @app.post("/event")
+    def event() -> tuple[dict, int]:
+        agent.handle_event(request.get_json(force=True, silent=True) or {})
+        return {"ok": True}, 200
+
+    @app.post("/events")
+    def events() -> tuple[dict, int]:
+        """Bulk ingestion: [{"id", "type", "ts", "url"|"reason"}, ...].
+
+        ``id`` makes retries idempotent; ``ts`` (ISO-8601 or epoch ms) is when
+        the event happened and defaults to now.
+        """
+        data = request.get_json(force=True, silent=True)
+        items = data.get("events") if isinstance(data, dict) else data
+        if not isinstance(items, list):
+            return {"ok": False, "error": "expected a list of events"}, 400
+        return {"ok": True, **agent.ingestor.ingest(items)}, 200
+
+    @app.get("/stats")
+    def stats() -> tuple[dict, int]:
+        return agent.stats(), 200
+
+    @app.get("/metrics")
+    def prometheus_metrics() -> Response:
+        return Response(metrics.render(), mimetype="text/plain; version=0.0.4")
+
+    @app.post("/profile")
+    def profile_toggle() -> tuple[dict, int]:
+        """{"on": true, "interval": 0.01} starts sampling, {"on": false} stops it."""
+        data = request.get_json(force=True, silent=True) or {}
+        if not isinstance(data, dict):
+            return {"ok": False, "error": "expected a JSON object"}, 400
+        if data.get("on"):
+            try:
+                interval = data.get("interval")
+                metrics.profiler.start(
+                    interval=None if interval is None else float(interval),
+                    reset=bool(data.get("reset", True)),
                 )
-                tracker.end_work()
-            else:
-                end_target_min += EXTEND_BLOCK_MIN
-                log_activity(
-                    "extend_day",
-                    details=f"+{EXTEND_BLOCK_MIN} min",
-                    work_min=worked_val,
-                    break_min=break_val,
-                    absence_min=absence_val,
-                )
-            root.destroy()
-
-        threading.Thread(
-            target=_ask_extend,
-            args=(worked, status["break_minutes"], status["absence_minutes"]),
-            daemon=True,
-        ).start()
-
-
-sched.add_job(minute_tick, "interval", minutes=1, next_run_time=datetime.now())
-sched.start()
-
-
-# ---- HTTP API ----
-
-@app.get("/status")
-def status() -> tuple[dict, int]:
-    s = tracker.get_status()
-    return (
-        {
-            **s,
-            "target_minutes": end_target_min,
-            "remaining_minutes": max(0, round(end_target_min - s["work_minutes"], 1)),
-        },
-        200,
-    )
-
-
-@app.post("/start")
-def start_work() -> tuple[dict, int]:
-    s = tracker.start_work()
-    log_activity(
-        "start_work",
-        details="manual",
-        work_min=s["work_minutes"],
-        break_min=s["break_minutes"],
-        absence_min=s["absence_minutes"],
-    )
-    return {"ok": True}, 200
-
-
-@app.post("/end")
-def end_work() -> tuple[dict, int]:
-    s = tracker.end_work()
-    log_activity(
-        "end_work",
-        details="manual",
-        work_min=s["work_minutes"],
-        break_min=s["break_minutes"],
-        absence_min=s["absence_minutes"],
-    )
-    return {"ok": True}, 200
-
-
-@app.post("/event")
-def event() -> tuple[dict, int]:
-    data = request.get_json(force=True, silent=True) or {}
-    kind = data.get("type")
-    if kind == "youtube_start":
-        s = tracker.youtube_start()
-        log_activity(
-            "youtube_start",
-            details=data.get("url", ""),
-            work_min=s["work_minutes"],
-            break_min=s["break_minutes"],
-            absence_min=s["absence_minutes"],
-        )
-    elif kind == "youtube_stop":
-        s = tracker.youtube_stop()
-        log_activity(
-            "youtube_stop",
-            details=data.get("url", ""),
-            work_min=s["work_minutes"],
-            break_min=s["break_minutes"],
-            absence_min=s["absence_minutes"],
-        )
-    elif kind == "break_start":
-        s = tracker.break_start()
-        log_activity(
-            "break_start",
-            details=data.get("reason", ""),
-            work_min=s["work_minutes"],
-            break_min=s["break_minutes"],
-            absence_min=s["absence_minutes"],
-        )
-    elif kind == "break_end":
-        s = tracker.break_end()
-        log_activity(
-            "break_end",
-            details=data.get("reason", ""),
-            work_min=s["work_minutes"],
-            break_min=s["break_minutes"],
-            absence_min=s["absence_minutes"],
-        )
-    return {"ok": True}, 200
-
-
-@app.get("/")
-@app.get("/panel")
-def panel():
-    return send_from_directory("templates", "status.html")
+            except (TypeError, ValueError):
+                return {"ok": False, "error": "interval must be a positive number of seconds"}, 400
+        else:
+            metrics.profiler.stop()
+        return {"ok": True, **metrics.profiler.stats()}, 200
+
+    @app.get("/profile")
+    def profile_report():
+        """Hottest stacks so far; ``?format=folded`` for flame graph tools."""
+        if request.args.get("format") == "folded":
+            return Response(metrics.profiler.folded(), mimetype="text/plain")
+        top = request.args.get("top", default=20, type=int)
+        stacks = [{"stack": s.split(";"), "samples": n} for s, n in metrics.profiler.top(top)]
+        return {**metrics.profiler.stats(), "top": stacks}, 200
+
+    @app.post("/export")
+    def export() -> tuple[dict, int]:
+        return {"ok": export_all()}, 200
+
+    @app.get("/history/<period>")
+    def history_rollups(period: str) -> tuple[dict, int]:
+        """Pre-aggregated history: daily, weekly or weekdays (averages)."""
+        queries = {"daily": history.daily, "weekly": history.weekly, "weekdays": history.weekdays}
+        if period not in queries:
+            return {"ok": False, "error": f"unknown period: {period}"}, 404
+        try:
+            start, end = date_range(default_days=90)
+        except ValueError as exc:
+            return {"ok": False, "error": str(exc)}, 400
+        flush(wait=True)
+        return {"from": str(start), "to": str(end), period: queries[period](start, end)}, 200
+
+    @app.get("/")
+    @app.get("/panel")
+    def panel():
+        return send_from_directory("templates", "status.html")
+
+    return app
+
+
+def main(argv: Optional[list] = None) -> int:
+    parser = argparse.ArgumentParser(description="Work Wellness Assistant agent")
+    parser.add_argument("--server", choices=["auto", "waitress", "dev"], default=SERVER_MODE)
+    parser.add_argument("--host", default=SERVER_HOST)
+    parser.add_argument("--port", type=int, default=SERVER_PORT)
+    parser.add_argument("--threads", type=int, default=SERVER_THREADS)
+    parser.add_argument("--streams", type=int, default=SERVER_STREAMS,
+                        help="max open /stream connections (at most half of --threads)")
+    args = parser.parse_args(argv)
+    streams = max(0, min(args.streams, args.threads // 2))  # the rest serve normal requests
+
+    agent = Agent()
+    agent.start()
+    print(f"Starting server on http://localhost:{args.port}")
+    serve(create_app(agent, streams), args.server, args.host, args.port, args.threads)
+    return 0
 
 
 if __name__ == "__main__":
-    print(f"Starting server on http://localhost:{SERVER_PORT}")
-    app.run(port=SERVER_PORT)
+    sys.exit(main())
@@ -0,0 +1,699 @@
+"""Micro-benchmarks for the agent's hot paths.
+
+Run all with ``python bench.py`` or pick some: ``python bench.py replay``.
+Each benchmark prints one line of metrics; nothing here runs at import time.
+"""
+
+from __future__ import annotations
+
+import os
+import sys
+import tempfile
+import time
+from typing import Callable, Dict
+
+BENCHES: Dict[str, Callable[[], dict]] = {}
+
+# Benchmarks that touch storage must never write to the real Desktop
+os.environ.setdefault("DESKTOP_DIR", tempfile.mkdtemp(prefix="wwa-bench-"))
+
+
+def bench(fn: Callable[[], dict]) -> Callable[[], dict]:
+    BENCHES[fn.__name__[len("bench_"):]] = fn
+    return fn
+
+
+def _best_of(fn: Callable[[], object], repeat: int = 3) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+@bench
+def bench_replay(users: int = 200, days: int = 365, per_day: int = 40) -> dict:
+    """Vectorized replay of a year of time-ordered history for many users."""
+    import numpy as np
+
+    from engine import replay_arrays
+
+    rng = np.random.default_rng(0)
+    streams = users * days
+    n = streams * per_day
+    group = np.repeat(np.arange(streams, dtype=np.int64), per_day)
+    day_start = (group % days) * 86400.0
+    offsets = np.sort(rng.uniform(0, 9 * 3600, (streams, per_day)), axis=1).ravel()
+    ts = day_start + 8 * 3600 + offsets
+    kind = rng.choice(7, size=n, p=[0.02, 0.02, 0.6, 0.09, 0.09, 0.09, 0.09]).astype(np.int8)
+    secs = _best_of(lambda: replay_arrays(group, ts, kind))
+    return {"events": n, "seconds": round(secs, 3), "events_per_s": int(n / secs)}
+
+
+@bench
+def bench_input(events: int = 200_000, rate_hz: int = 500) -> dict:
+    """Per-event CPU of input handling under synthetic high-rate mouse moves.
+
+    ``legacy`` is the old callback (``datetime.now()`` into a global),
+    ``listener`` the ListenerBackend slot store, and ``idle_query`` the cost
+    of the 1 Hz sampler when the OS tracks input (no per-event Python at all).
+    """
+    from datetime import datetime
+
+    from activity import ActivitySampler, ListenerBackend
+
+    state = {"last": datetime.now()}
+
+    def legacy(*_: object) -> None:
+        state["last"] = datetime.now()
+
+    listener = ListenerBackend()
+
+    def cpu_per_call(fn: Callable[..., None], n: int) -> float:
+        t0 = time.process_time()
+        for i in range(n):
+            fn(i, i)
+        return (time.process_time() - t0) / n
+
+    legacy_s = cpu_per_call(legacy, events)
+    listener_s = cpu_per_call(listener._touch, events)
+    sampler = ActivitySampler(listener)
+    sample_s = cpu_per_call(lambda *_: sampler.sample(), 10_000)
+    return {
+        "legacy_cpu_pct": round(legacy_s * rate_hz * 100, 3),
+        "listener_cpu_pct": round(listener_s * rate_hz * 100, 3),
+        "idle_query_cpu_pct": round(sample_s * 100, 4),
+    }
+
+
+@bench
+def bench_events(n: int = 20_000, batch: int = 500) -> dict:
+    """Events/second: one-at-a-time tracker call + log row vs /events batches."""
+    from datetime import datetime, timedelta
+
+    import storage
+    from ingest import EventIngestor
+    from tracker import WorkTracker
+
+    kinds = ["youtube_start", "youtube_stop", "break_start", "break_end"]
+
+    tracker = WorkTracker()
+    methods = [getattr(tracker, k) for k in kinds]
+    t0 = time.perf_counter()
+    for i in range(n):
+        s = methods[i % 4]()
+        storage.log_activity(kinds[i % 4], "", s["work_minutes"], s["break_minutes"], s["absence_minutes"])
+    storage.flush()
+    single = n / (time.perf_counter() - t0)
+
+    ingestor = EventIngestor(WorkTracker(), storage.log_activity_rows)
+    base = datetime.now() - timedelta(hours=1)
+    items = [
+        {"id": f"e{i}", "type": kinds[i % 4], "ts": (base + timedelta(milliseconds=i)).isoformat()}
+        for i in range(n)
+    ]
+    t0 = time.perf_counter()
+    for i in range(0, n, batch):
+        ingestor.ingest(items[i:i + batch])
+    storage.flush()
+    batched = n / (time.perf_counter() - t0)
+    dup = ingestor.ingest(items[-batch:])["duplicates"]
+    return {
+        "single_events_per_s": int(single),
+        "batched_events_per_s": int(batched),
+        "retried_batch_duplicates": dup,
+    }
+
+
+@bench
+def bench_team(users: int = 2000, days: int = 120, ingest_users: int = 400, threads: int = 8) -> dict:
+    """Team server: sharded ingestion throughput and dashboard query latency.
+
+    Ingestion posts one day of events per user from ``threads`` threads;
+    the queries then run over ``users`` x ``days`` of rollups.
+    """
+    import json
+    from concurrent.futures import ThreadPoolExecutor
+    from datetime import date, datetime, timedelta
+    from pathlib import Path
+
+    from engine import DayState
+    from team import TeamHub, TeamStore
+
+    store = TeamStore(Path(os.environ["DESKTOP_DIR"]) / "bench-team.sqlite3")
+    hub = TeamHub(store, shards=16)
+    today = date.today()
+    base = datetime.combine(today, datetime.min.time()) + timedelta(hours=8)
+    day_events = [("start_work", 0, 0.0)]
+    for m in range(0, 480, 15):
+        day_events.append(("active", m * 60 + 600, 600.0))
+        if m % 60 == 0:
+            day_events += [("break_start", m * 60 + 620, 0.0), ("break_end", m * 60 + 900, 0.0)]
+
+    def post(u: int) -> None:
+        batch = [
+            {"id": f"{u}-{i}", "kind": k, "ts": (base + timedelta(seconds=off)).isoformat(), "value": v}
+            for i, (k, off, v) in enumerate(day_events)
+        ]
+        for i in range(0, len(batch), 20):
+            hub.ingest(f"user{u:05d}", batch[i:i + 20])
+
+    t0 = time.perf_counter()
+    with ThreadPoolExecutor(threads) as pool:
+        list(pool.map(post, range(ingest_users)))
+    ingest_s = time.perf_counter() - t0
+
+    rows = []
+    for u in range(users):
+        for d in range(1, days + 1):
+            state = DayState(day=today - timedelta(days=d), work_effective=timedelta(minutes=400 + u % 90))
+            rows.append(state.to_dict())
+    with store._lock, store._conn:
+        store._conn.executemany(
+            "INSERT OR REPLACE INTO daily"
+            " (user, day, work_s, break_s, absence_s, start_ts, end_ts, state)"
+            " VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            [
+                (f"user{i // days:05d}", r["day"], r["work_s"], r["break_s"], r["absence_s"], None, None, json.dumps(r))
+                for i, r in enumerate(rows)
+            ],
+        )
+    month = (today - timedelta(days=30), today)
+    quarter = (today - timedelta(days=90), today)
+    return {
+        "ingest_events_per_s": int(hub.events / ingest_s),
+        "daily_rollups": len(rows),
+        "team_daily_30d_ms": round(_best_of(lambda: store.team_daily(*month)) * 1000, 1),
+        "team_summary_90d_ms": round(_best_of(lambda: store.team_summary(*quarter)) * 1000, 1),
+        "user_days_90d_ms": round(_best_of(lambda: store.user_days("user00042", *quarter)) * 1000, 2),
+    }
+
+
+@bench
+def bench_reorder(trials: int = 200, events: int = 300, seed: int = 1) -> dict:
+    """Totals must not depend on arrival order: random days are delivered
+    with bounded reordering (within and beyond the reorder window) and
+    compared with in-order delivery. Raises AssertionError on a mismatch."""
+    import random
+    from datetime import datetime, timedelta
+
+    from clock import EventClock
+    from tracker import WorkTracker
+
+    rnd = random.Random(seed)
+    kinds = ("break_start", "break_end", "youtube_start", "youtube_stop", "active")
+    base = datetime.combine(datetime.now().date(), datetime.min.time()) + timedelta(hours=7)
+
+    def day() -> list:
+        t, out = base, [(base, "start_work", 0.0)]
+        for _ in range(events):
+            t += timedelta(seconds=rnd.randint(1, 240))
+            kind = rnd.choice(kinds)
+            out.append((t, kind, 30.0 if kind == "active" else 0.0))
+        return out
+
+    def deliver(evs: list, delay_s: float, reorder_s: float) -> tuple:
+        """Each event arrives up to ``delay_s`` after it happened."""
+        now = [base]
+        clock = EventClock(wall=lambda: now[0], mono=lambda: (now[0] - base).total_seconds())
+        tracker = WorkTracker(clock=clock, reorder_s=reorder_s)
+        arrivals = sorted(evs, key=lambda e: e[0] + timedelta(seconds=rnd.uniform(0, delay_s)))
+        t0 = time.perf_counter()
+        for e in arrivals:
+            now[0] = max(now[0], e[0])
+            tracker.apply_events([e])
+        now[0] += timedelta(seconds=reorder_s + 1)
+        tracker.release()
+        return tracker.state.snapshot(), tracker.late_events, time.perf_counter() - t0
+
+    cost = {"in_order": 0.0, "buffered": 0.0, "refold": 0.0}
+    late = 0
+    for _ in range(trials):
+        evs = day()
+        expected, _, dt = deliver(evs, 0, 0)
+        cost["in_order"] += dt
+        for name, delay, window in (("buffered", 60, 120), ("refold", 600, 2)):
+            got, n_late, dt = deliver(evs, delay, window)
+            assert got == expected, (name, got, expected)
+            cost[name] += dt
+            late += n_late
+    n = trials * (events + 1)
+    return {
+        "trials": trials,
+        "late_refolds": late,
+        **{f"{k}_us_per_event": round(v / n * 1e6, 1) for k, v in cost.items()},
+    }
+
+
+@bench
+def bench_history(days: int = 365, per_day: int = 60) -> dict:
+    """Weekday report: pandas over the XLSX vs history rollups and columns."""
+    from datetime import date, datetime, timedelta
+    from pathlib import Path
+
+    import pandas as pd
+
+    from history import History
+
+    root = Path(os.environ["DESKTOP_DIR"]) / "bench-history"
+    start = date.today() - timedelta(days=days)
+    rows = []
+    for d in range(days):
+        base = datetime.combine(start + timedelta(days=d), datetime.min.time()) + timedelta(hours=8)
+        for i in range(per_day):
+            rows.append({
+                "timestamp": (base + timedelta(minutes=8 * i)).isoformat(timespec="seconds"),
+                "event": ("lock", "unlock", "lookfar_show", "youtube_start")[i % 4],
+                "details": "",
+                "work_minutes_today": 8.0 * i,
+                "break_minutes_today": float(i),
+                "absence_minutes_today": 0.0,
+            })
+    xlsx = root / "aktywnosc.xlsx"
+    xlsx.parent.mkdir(parents=True, exist_ok=True)
+    pd.DataFrame(rows).to_excel(xlsx, index=False)
+
+    def from_xlsx() -> object:
+        df = pd.read_excel(xlsx)
+        df["day"] = pd.to_datetime(df["timestamp"]).dt.date
+        daily = df.groupby("day")["work_minutes_today"].last()
+        return daily.groupby(pd.to_datetime(daily.index).dayofweek).mean()
+
+    history = History(root / "history")
+    t0 = time.perf_counter()
+    history.rebuild(rows, [])
+    rebuild_s = time.perf_counter() - t0
+    end = date.today()
+    quarter = end - timedelta(days=91)
+    return {
+        "rows": len(rows),
+        "xlsx_weekdays_s": round(_best_of(from_xlsx, repeat=1), 2),
+        "rebuild_s": round(rebuild_s, 2),
+        "rollup_weekdays_ms": round(_best_of(lambda: history.weekdays(quarter, end)) * 1000, 2),
+        "column_scan_year_ms": round(_best_of(lambda: history.activity_columns(start, end)) * 1000, 2),
+    }
+
+
+@bench
+def bench_timers(timers: int = 200, seconds: float = 3.0, moves: int = 20_000) -> dict:
+    """Scheduler lateness with many live timers and frequent deadline moves.
+
+    Every timer recurs every 50-250 ms while the main thread keeps moving
+    one-shot deadlines, as tracker changes do; ``move_us`` is the cost of one
+    ``after`` call.
+    """
+    from scheduler import Scheduler
+
+    sched = Scheduler()
+    for i in range(timers):
+        sched.add(f"t{i}", lambda: None, interval=0.05 + 0.2 * i / timers)
+    for i in range(10):
+        sched.add(f"once{i}", lambda: None)
+    sched.start()
+    t0 = time.perf_counter()
+    for i in range(moves):
+        sched.after(f"once{i % 10}", 0.01 * (i % 50))
+    move_s = time.perf_counter() - t0
+    time.sleep(max(0.0, seconds - move_s))
+    sched.stop()
+    stats = sched.stats()
+    fired = sum(t["fired"] for t in stats.values())
+    p99 = sorted(t["late_p99_ms"] for t in stats.values() if t["late_p99_ms"] is not None)
+    return {
+        "fired": fired,
+        "skipped": sum(t["skipped"] for t in stats.values()),
+        "move_us": round(move_s / moves * 1e6, 2),
+        "late_p99_ms_median": p99[len(p99) // 2] if p99 else None,
+        "late_p99_ms_worst": p99[-1] if p99 else None,
+    }
+
+
+@bench
+def bench_rules(rules: int = 48, passes: int = 20_000) -> dict:
+    """Compiling a rules file and evaluating every ``when`` against one state."""
+    from policy import FACTS, Policy
+
+    exprs = (
+        "work_min > 20 and not in_call",
+        "not in_break and (hour >= 9 and hour < 17)",
+        "weekday < 5 and ignored < 3 or fired_today == 0",
+        "work_min - break_min > 45 and not youtube",
+        "absence_min < 30 and work_min % 60 < 5",
+    )
+    spec = {"reminders": [
+        {"name": f"r{i}", "every_min": 5 + i, "window": ("lookfar", "standup")[i % 2],
+         "when": exprs[i % len(exprs)]}
+        for i in range(rules)
+    ]}
+    t0 = time.perf_counter()
+    policy = Policy.from_dict(spec)
+    compile_s = time.perf_counter() - t0
+    facts = dict.fromkeys(FACTS, 0)
+    facts.update(working=True, in_call=False, youtube=False, in_break=False,
+                 work_min=130.0, break_min=12.0, hour=10.5, weekday=2)
+    t0 = time.perf_counter()
+    for _ in range(passes):
+        due = [rule for rule in policy.reminders if rule.check(facts)]
+    eval_s = time.perf_counter() - t0
+    return {
+        "rules": rules,
+        "compile_ms": round(compile_s * 1000, 2),
+        "eval_all_us": round(eval_s / passes * 1e6, 2),
+        "matching": len(due),
+    }
+
+
+@bench
+def bench_metrics(n: int = 200_000, series: int = 50) -> dict:
+    """Instrumentation overhead: one histogram observation, a timed call and
+    rendering /metrics with ``series`` label sets."""
+    import metrics
+
+    registry = metrics.Registry()
+    hist = registry.histogram("bench_seconds", "Bench.", ("route",))
+    timed = hist.timed("/status")(lambda: None)
+    labels = [f"/r{i}" for i in range(series)]
+    for label in labels:
+        hist.observe(0.001, label)
+    observe_s = _best_of(lambda: [hist.observe(0.0003, "/status") for _ in range(n)])
+    timed_s = _best_of(lambda: [timed() for _ in range(n)])
+    bare_s = _best_of(lambda: [(lambda: None)() for _ in range(n)])
+    return {
+        "observe_ns": round(observe_s / n * 1e9),
+        "timed_call_overhead_ns": round((timed_s - bare_s) / n * 1e9),
+        "render_ms": round(_best_of(registry.render) * 1000, 2),
+    }
+
+
+@bench
+def bench_export(rows: int = 120_000, months: int = 24, new: int = 100) -> dict:
+    """Monthly XLSX export: the first full build, then exporting ``new``
+    rows into a full current month with ``rows`` and with twice as many rows
+    of history (should take the same time), against one pandas rewrite of
+    the whole history, which is what every export cost before."""
+    from datetime import date, datetime, timedelta
+    from pathlib import Path
+
+    from journal import Journal
+    from storage import ACTIVITY_COLUMNS
+    from xlsx_export import MonthlyExport
+
+    root = Path(os.environ["DESKTOP_DIR"]) / "bench-export"
+    root.mkdir(exist_ok=True)
+    journal = Journal(root / "aktywnosc.jsonl")
+    journal.truncate()
+    per_month = rows // months
+    total = 0
+
+    def add(month: int, count: int, offset: int = 0) -> None:
+        nonlocal total
+        first = datetime.combine(date(2020 + month // 12, month % 12 + 1, 1), datetime.min.time())
+        step = timedelta(days=27) / per_month
+        journal.append_many(
+            {"timestamp": (first + step * (offset + i)).isoformat(timespec="seconds"), "event": "lock",
+             "details": "windows", "work_minutes_today": 123.4, "break_minutes_today": 12.0,
+             "absence_minutes_today": 0.0}
+            for i in range(count)
+        )
+        total += count
+
+    for month in range(months):
+        add(month, per_month)
+    export = MonthlyExport(journal, root / "aktywnosc.xlsx", ACTIVITY_COLUMNS, root / "state.json")
+    t0 = time.perf_counter()
+    export.export()
+    full_s = time.perf_counter() - t0
+
+    def incremental(month: int) -> float:
+        best = float("inf")
+        for i in range(3):
+            add(month, new, per_month + i * new)
+            t0 = time.perf_counter()
+            export.export()
+            best = min(best, time.perf_counter() - t0)
+        return best
+
+    small = incremental(months - 1)
+    for month in range(months, 2 * months):
+        add(month, per_month)
+    export.export()
+    large = incremental(2 * months - 1)
+
+    import pandas as pd
+
+    t0 = time.perf_counter()
+    pd.DataFrame(list(journal.read()), columns=ACTIVITY_COLUMNS).to_excel(root / "all.xlsx", index=False)
+    pandas_s = time.perf_counter() - t0
+    return {
+        "rows": total,
+        "rows_per_month": per_month,
+        "full_build_s": round(full_s, 2),
+        "export_new_s": round(small, 3),
+        "export_new_2x_history_s": round(large, 3),
+        "pandas_full_rewrite_s": round(pandas_s, 2),
+    }
+
+
+@bench
+def bench_session(breaks: int = 2000, seed: int = 1) -> dict:
+    """Lock/unlock pipeline: the window procedure's cost (one enqueue), the
+    consumer's throughput, and coalescing of a trace where every real break
+    is surrounded by bursts of sub-second flaps (RDP reconnects, user
+    switching). Raises AssertionError unless exactly the real breaks are
+    applied."""
+    import random
+    from datetime import datetime, timedelta
+
+    from clock import Stamp
+    from session import SessionPipeline
+
+    rnd = random.Random(seed)
+    base = datetime(2030, 1, 7, 8)
+    trace = []
+    t = 0.0
+    for _ in range(breaks):
+        for state in ("lock", "unlock"):
+            t += rnd.uniform(60, 3600)
+            other = "unlock" if state == "lock" else "lock"
+            for _ in range(rnd.randint(0, 3)):  # ``state`` undone within a second
+                trace += [(state, t), (other, t + rnd.uniform(0.05, 0.9))]
+                t += 1.5
+            trace.append((state, t))
+    applied = []
+    pipeline = SessionPipeline(lambda at: applied.append(at), lambda at: applied.append(at))
+    t0 = time.perf_counter()
+    for kind, at in trace:
+        pipeline.expire(at)
+        pipeline.accept(kind, Stamp(base + timedelta(seconds=at), at))
+    pipeline.expire(t + 60)
+    accept_s = time.perf_counter() - t0
+    assert len(applied) == 2 * breaks, (len(applied), pipeline.stats())
+
+    threaded = SessionPipeline(lambda at: None, lambda at: None)
+    threaded.start()
+    n = 20_000
+    t0 = time.perf_counter()
+    for i in range(n // 2):
+        threaded.lock()
+        threaded.unlock()
+    enqueue_s = time.perf_counter() - t0
+    threaded.stop()
+    total_s = time.perf_counter() - t0
+    return {
+        "raw": len(trace),
+        "applied": len(applied),
+        "flaps": pipeline.flaps,
+        "accept_us": round(accept_s / len(trace) * 1e6, 2),
+        "enqueue_us": round(enqueue_s / n * 1e6, 2),
+        "consumer_events_per_s": int(n / total_s),
+    }
+
+
+# Simulated dates, later than anything the other benchmarks record, so each
+# simulation's agent restores an older tracker state and never a newer one
+SIM_START = {"simulation": "2030-01-07", "logging": "2030-03-04", "memory": "2030-06-03"}
+
+
+@bench
+def bench_simulation(days: int = 28, seed: int = 1) -> dict:
+    """A simulated month through minute_tick, tracker, reminders and storage.
+
+    ``speedup`` is simulated over elapsed time; tick latency is compared
+    between the first and the last week to show it does not grow with history.
+    """
+    from datetime import datetime
+
+    from simulation import Simulation, _ms
+
+    sim = Simulation(datetime.fromisoformat(SIM_START["simulation"]))
+    t0 = time.perf_counter()
+    sim.run_days(7, seed=seed)
+    first_week = len(sim.tick_s)
+    sim.run_days(days - 14, seed=seed + 1)
+    last_week = len(sim.tick_s)
+    sim.run_days(7, seed=seed + 2)
+    elapsed = time.perf_counter() - t0
+    stats = sim.stats()
+    return {
+        "days": days,
+        "elapsed_s": round(elapsed, 2),
+        "speedup": round(days * 86400 / elapsed),
+        "tick_p50_ms": stats["tick_p50_ms"],
+        "tick_p99_ms_week1": _ms(sim.tick_s[:first_week], 0.99),
+        "tick_p99_ms_week4": _ms(sim.tick_s[last_week:], 0.99),
+        "tick_max_ms": stats["tick_max_ms"],
+        "shown": stats["shown"],
+    }
+
+
+@bench
+def bench_logging(sizes: tuple = (0, 100_000, 400_000), n: int = 2000) -> dict:
+    """Cost of logging one row, and of the late-event history lookup, as the
+    journals grow. ``row_us`` covers ``log_activity`` plus its share of the
+    write; ``late_lookup_ms`` is ``tracker_events_on`` for one day."""
+    from datetime import datetime, timedelta
+
+    import storage
+
+    day = datetime.fromisoformat(SIM_START["logging"])
+    out = {}
+    grown = 0
+    for size in sizes:
+        rows = [
+            {"timestamp": (day - timedelta(minutes=size - i)).isoformat(timespec="seconds"),
+             "event": "lock", "details": "bench", "work_minutes_today": 0.0,
+             "break_minutes_today": 0.0, "absence_minutes_today": 0.0}
+            for i in range(grown, size)
+        ]
+        for i in range(0, len(rows), 5000):
+            storage.log_activity_rows(rows[i:i + 5000])
+            for row in rows[i:i + 5000]:
+                storage.log_tracker_event("active", datetime.fromisoformat(row["timestamp"]), 1.0)
+            storage.flush()
+        grown = size
+
+        def write() -> None:
+            for _ in range(n):
+                storage.log_activity("lock", "bench", 1.0, 1.0, 1.0, at=day)
+            storage.flush()
+
+        out[size] = {
+            "row_us": round(_best_of(write) / n * 1e6, 2),
+            "late_lookup_ms": round(_best_of(lambda: list(storage.tracker_events_on(day.date())), 1) * 1000, 1),
+        }
+    return out
+
+
+@bench
+def bench_memory(days: int = 28, seed: int = 1) -> dict:
+    """Traced allocations held by the agent over a simulated month; growth
+    per week after the first should stay near zero."""
+    import tracemalloc
+    from datetime import datetime
+
+    from simulation import Simulation
+
+    sim = Simulation(datetime.fromisoformat(SIM_START["memory"]))
+    sim.run_days(1, seed=seed)  # first-day caches and imports are not growth
+    ignore = [tracemalloc.Filter(False, "*simulation.py"), tracemalloc.Filter(False, tracemalloc.__file__)]
+
+    def held() -> int:  # without the harness' own records of ticks and shows
+        snapshot = tracemalloc.take_snapshot().filter_traces(ignore)
+        return sum(stat.size for stat in snapshot.statistics("filename"))
+
+    tracemalloc.start()
+    weekly = []
+    base = held()
+    for week in range(days // 7):
+        sim.run_days(7, seed=seed + week)
+        weekly.append(round((held() - base) / 1024))
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return {
+        "held_kb_by_week": weekly,
+        "peak_mb": round(peak / 2**20, 1),
+    }
+
+
+@bench
+def bench_startup(timeout: float = 30.0) -> dict:
+    """Cold start: ``-X importtime`` of app.py and time to the first /status.
+
+    ``import_ms`` is the cumulative import time of ``app``; ``heavy_at_import``
+    lists deferred dependencies that were imported anyway (should be empty).
+    ``first_status_ms`` is from process spawn to a 200 from /status and
+    ``warm_ms`` until the background warmup has finished.
+    """
+    import http.client
+    import json
+    import socket
+    import subprocess
+
+    here = os.path.dirname(os.path.abspath(__file__))
+    heavy = ("pandas", "numpy", "requests", "pynput", "tkinter")
+    probe = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c",
+         f"import sys, app; print([m for m in {heavy!r} if m in sys.modules])"],
+        cwd=here, capture_output=True, text=True, check=True,
+    )
+    import_us = 0
+    for line in probe.stderr.splitlines():
+        parts = [p.strip() for p in line.split("|")]
+        if len(parts) == 3 and parts[2] == "app":
+            import_us = int(parts[1])
+
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+
+    def get(path: str) -> object:
+        conn = http.client.HTTPConnection("127.0.0.1", port, timeout=1)
+        try:
+            conn.request("GET", path)
+            resp = conn.getresponse()
+            return json.loads(resp.read()) if resp.status == 200 else None
+        except OSError:
+            return None
+        finally:
+            conn.close()
+
+    t0 = time.perf_counter()
+    proc = subprocess.Popen(
+        [sys.executable, "app.py", "--host", "127.0.0.1", "--port", str(port)],
+        cwd=here, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    first = warm = None
+    try:
+        while time.perf_counter() - t0 < timeout:
+            if first is None and get("/status") is not None:
+                first = time.perf_counter() - t0
+            if first is not None:
+                stats = get("/stats")
+                if isinstance(stats, dict) and stats.get("warmup_s") is not None:
+                    warm = time.perf_counter() - t0
+                    break
+            time.sleep(0.01)
+    finally:
+        proc.terminate()
+        proc.wait(timeout=10)
+    return {
+        "import_ms": round(import_us / 1000, 1),
+        "heavy_at_import": probe.stdout.strip(),
+        "first_status_ms": None if first is None else round(first * 1000),
+        "warm_ms": None if warm is None else round(warm * 1000),
+    }
+
+
+def main(argv: list) -> int:
+    names = argv or list(BENCHES)
+    for name in names:
+        if name not in BENCHES:
+            print(f"unknown benchmark: {name} (have: {', '.join(BENCHES)})")
+            return 2
+        print(f"{name}: {BENCHES[name]()}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
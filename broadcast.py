@@ -0,0 +1,101 @@
+from __future__ import annotations
+
+import json
+import threading
+from typing import Dict, Iterator, List, Optional
+
+
+class Subscription:
+    """One subscriber's pending delta.
+
+    Backpressure is by coalescing: a slow reader never builds a queue, it
+    just receives the merged changes since its last read.
+    """
+
+    def __init__(self) -> None:
+        self._pending: Dict = {}
+        self._cond = threading.Condition()
+        self.closed = False
+
+    def offer(self, delta: Dict) -> None:
+        with self._cond:
+            self._pending.update(delta)
+            self._cond.notify()
+
+    def get(self, timeout: Optional[float] = None) -> Optional[Dict]:
+        """Wait for changes; None on timeout or close."""
+        with self._cond:
+            if not self._pending and not self.closed:
+                self._cond.wait(timeout)
+            if not self._pending:
+                return None
+            delta, self._pending = self._pending, {}
+            return delta
+
+    def close(self) -> None:
+        with self._cond:
+            self.closed = True
+            self._cond.notify()
+
+
+class StatusBroadcaster:
+    """Fans status deltas out to subscribers; publishing costs one dict
+    diff plus one merge per subscriber, and nothing when nothing changed."""
+
+    def __init__(self) -> None:
+        self._current: Dict = {}
+        self._subs: List[Subscription] = []
+        self._lock = threading.Lock()
+        self.published = 0
+
+    def current(self) -> Dict:
+        with self._lock:
+            return dict(self._current)
+
+    def subscribers(self) -> int:
+        with self._lock:
+            return len(self._subs)
+
+    def publish(self, status: Dict) -> None:
+        # Offered under the lock: deltas reach every subscriber in the order
+        # they were applied to ``_current``, so a later one is never undone
+        with self._lock:
+            delta = {k: v for k, v in status.items() if self._current.get(k, object()) != v}
+            if not delta:
+                return
+            self._current.update(delta)
+            self.published += 1
+            for sub in self._subs:
+                sub.offer(delta)
+
+    def subscribe(self, limit: Optional[int] = None) -> Optional[Subscription]:
+        """A new subscription primed with the full status; None if ``limit``
+        subscribers are already connected."""
+        sub = Subscription()
+        with self._lock:
+            if limit is not None and len(self._subs) >= limit:
+                return None
+            self._subs.append(sub)
+            sub.offer(dict(self._current))
+        return sub
+
+    def unsubscribe(self, sub: Subscription) -> None:
+        sub.close()
+        with self._lock:
+            if sub in self._subs:
+                self._subs.remove(sub)
+
+    def sse(self, sub: Optional[Subscription] = None, keepalive_s: float = 25.0) -> Iterator[str]:
+        """Server-Sent Events stream: the full status first, then deltas."""
+        sub = sub or self.subscribe()
+        assert sub is not None
+        try:
+            yield "retry: 3000\n\n"
+            while not sub.closed:
+                delta = sub.get(timeout=keepalive_s)
+                if delta is None:
+                    yield ": keepalive\n\n"
+                    continue
+                yield f"data: {json.dumps(delta)}\n\n"
+        finally:
+            self.unsubscribe(sub)
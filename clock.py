@@ -0,0 +1,79 @@
+"""Event timestamps on a wall clock and monotonic clock pair.
+
+A ``Stamp`` is taken where something happens (a window procedure, an HTTP
+handler) and converted to a tracker time later. ``EventClock`` derives wall
+times from the monotonic reading, so events keep their order and spacing
+when the wall clock is stepped (NTP, DST, a manual change) between them.
+"""
+
+from __future__ import annotations
+
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Callable, NamedTuple, Optional, Union
+
+
+class Stamp(NamedTuple):
+    wall: datetime  # naive local time, as read
+    mono: float  # time.monotonic() at the same moment
+
+
+When = Union[Stamp, datetime, None]
+
+
+class EventClock:
+    """Wall times computed as ``anchor.wall + (mono - anchor.mono)``.
+
+    The anchor is re-taken when that drifts more than ``max_skew`` seconds
+    from the real wall clock, i.e. after the wall clock was changed or the
+    machine slept; stamps are then mapped on the new anchor, which keeps them
+    consistent with each other.
+    """
+
+    def __init__(
+        self,
+        wall: Callable[[], datetime] = datetime.now,
+        mono: Callable[[], float] = time.monotonic,
+        max_skew: float = 2.0,
+    ) -> None:
+        self._wall = wall
+        self._mono = mono
+        self.max_skew = max_skew
+        self._anchor: Optional[Stamp] = None
+        self._lock = threading.Lock()
+        self.reanchors = 0
+
+    def stamp(self) -> Stamp:
+        stamp = Stamp(self._wall(), self._mono())
+        self._check(stamp)
+        return stamp
+
+    def _check(self, stamp: Stamp) -> datetime:
+        """Re-anchor on ``stamp`` if needed; returns its tracker time."""
+        anchor = self._anchor  # replaced, never mutated: no lock needed to read
+        if anchor is not None:
+            wall = anchor.wall + timedelta(seconds=stamp.mono - anchor.mono)
+            if abs((wall - stamp.wall).total_seconds()) <= self.max_skew:
+                return wall
+        with self._lock:
+            self.reanchors += self._anchor is not None
+            self._anchor = stamp
+        return stamp.wall
+
+    def to_wall(self, stamp: Stamp) -> datetime:
+        anchor = self._anchor
+        if anchor is None:
+            return stamp.wall
+        return anchor.wall + timedelta(seconds=stamp.mono - anchor.mono)
+
+    def now(self) -> datetime:
+        return self._check(Stamp(self._wall(), self._mono()))
+
+    def resolve(self, when: When) -> datetime:
+        """Tracker time of ``when``: a stamp, an explicit wall time, or now."""
+        if when is None:
+            return self.now()
+        if isinstance(when, Stamp):
+            return self.to_wall(when)
+        return when
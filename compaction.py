@@ -0,0 +1,156 @@
+"""Folding legacy ``.csv`` sidecars into the journals.
+
+Before the journals existed, rows that could not be written to a locked
+XLSX went to a ``.csv`` file next to it. ``merged`` streams the journal and
+its sidecar as one time-ordered view with bounded memory;
+``fold_sidecar`` rewrites the journal from that view and retires the
+sidecar. ``LockRetry`` reruns a job that failed on a file lock (Excel) with
+growing delays instead of waiting for its next regular run.
+"""
+
+from __future__ import annotations
+
+import csv
+import heapq
+import os
+import threading
+from datetime import datetime
+from itertools import count
+from pathlib import Path
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+from journal import Journal
+
+Row = Dict[str, object]
+
+
+def _key(row: Row) -> datetime:
+    try:
+        return datetime.fromisoformat(str(row.get("timestamp")))
+    except ValueError:
+        return datetime.min
+
+
+def iter_csv(path: Path) -> Iterator[Row]:
+    """Rows of a CSV sidecar, streamed; nothing if it does not exist."""
+    try:
+        f = path.open("r", encoding="utf-8", newline="")
+    except FileNotFoundError:
+        return
+    with f:
+        yield from csv.DictReader(f)
+
+
+def ordered(rows: Iterable[Row], window: int = 1024) -> Iterator[Row]:
+    """Sort rows that are at most ``window`` positions out of time order.
+
+    Journals are appended in submission order, which batched client events
+    can make slightly non-monotonic; this fixes that in O(window) memory.
+    """
+    heap: List[Tuple[datetime, int, Row]] = []
+    seq = count()
+    for row in rows:
+        heapq.heappush(heap, (_key(row), next(seq), row))
+        if len(heap) > window:
+            yield heapq.heappop(heap)[2]
+    while heap:
+        yield heapq.heappop(heap)[2]
+
+
+def _normalize(row: Row, columns: List[str], numeric: Set[str]) -> Row:
+    out: Row = {}
+    for c in columns:
+        v = row.get(c)
+        if v is None or v != v:  # missing or NaN
+            v = 0.0 if c in numeric else ""
+        elif c in numeric:
+            try:
+                v = float(v)  # type: ignore[arg-type]
+            except (TypeError, ValueError):
+                v = 0.0
+        out[c] = v
+    ts = _key(row)
+    if ts != datetime.min:
+        out["timestamp"] = ts.isoformat(timespec="seconds")
+    return out
+
+
+def merged(
+    sources: Iterable[Iterable[Row]], columns: List[str], numeric: Set[str] = frozenset()
+) -> Iterator[Row]:
+    """Time-ordered union of ``sources``, rows normalized to ``columns``
+    (``numeric`` ones as floats, ISO timestamps).
+
+    Every row is kept, including identical ones: two events can share a
+    second. A sidecar is only ever read by the fold, so its rows are not in
+    the journal already.
+    """
+    streams = [(_normalize(r, columns, numeric) for r in ordered(src)) for src in sources]
+    return heapq.merge(*streams, key=_key)
+
+
+def _fold(journal: Journal, source: Path, columns: List[str], numeric: Set[str]) -> int:
+    before = sum(1 for _ in journal.read())
+    after = journal.rewrite(merged([journal.read(), iter_csv(source)], columns, numeric))
+    os.replace(source, source.with_name(f"{source.stem}.{datetime.now():%Y%m%d%H%M%S}.merged.csv"))
+    return after - before
+
+
+def fold_sidecar(
+    journal: Journal, sidecar: Path, columns: List[str], numeric: Set[str]
+) -> Optional[int]:
+    """Merge ``sidecar`` into ``journal`` in time order and retire it.
+
+    Returns the number of rows the journal gained, or None if the sidecar
+    is locked (by Excel) and was left untouched; retry later. The sidecar
+    is renamed to ``*.merging`` before the journal is rewritten and kept as
+    ``*.<time>.merged.csv`` after, so an interrupted fold resumes next time.
+    """
+    merging = sidecar.with_suffix(".merging")
+    added = 0
+    if merging.exists():
+        added += _fold(journal, merging, columns, numeric)
+    if sidecar.exists():
+        try:
+            os.replace(sidecar, merging)
+        except PermissionError:
+            return None
+        added += _fold(journal, merging, columns, numeric)
+    return added
+
+
+class LockRetry:
+    """Runs ``job``; while it returns False (a file was locked), reschedules
+    itself through ``schedule(delay_s, fn)`` with doubling delays from
+    ``first`` up to ``max_delay`` seconds. Calls do not overlap: one made
+    while another runs returns False without running ``job``."""
+
+    def __init__(
+        self,
+        job: Callable[[], bool],
+        schedule: Callable[[float, Callable[[], bool]], None],
+        first: float = 15.0,
+        max_delay: float = 600.0,
+    ) -> None:
+        self.job = job
+        self.schedule = schedule
+        self.first = first
+        self.max_delay = max_delay
+        self.delay = 0.0
+        self.retries = 0
+        self._lock = threading.Lock()
+
+    def __call__(self) -> bool:
+        if not self._lock.acquire(blocking=False):
+            return False  # the running call reschedules if it fails
+        try:
+            if self.job():
+                self.delay = 0.0
+                return True
+            self.delay = min(self.max_delay, max(self.first, self.delay * 2))
+            self.retries += 1
+            delay = self.delay
+        finally:
+            self._lock.release()
+        self.schedule(delay, self)
+        return False
@@ -8,6 +8,27 @@ DESKTOP_DIR.mkdir(parents=True, exist_ok=True)
 # Files
 ACTIVITY_XLSX = DESKTOP_DIR / "aktywnosc.xlsx"
 LOOK_FAR_XLSX = DESKTOP_DIR / "popatrz_w_dal.xlsx"
+ACTIVITY_JOURNAL = DESKTOP_DIR / "aktywnosc.jsonl"
+LOOK_FAR_JOURNAL = DESKTOP_DIR / "popatrz_w_dal.jsonl"
+EXPORT_EVERY_MIN = int(os.environ.get("EXPORT_EVERY_MIN", 10))
+
+# Internal state (tracker snapshot + transition tail)
+STATE_DIR = Path(os.environ.get("STATE_DIR", DESKTOP_DIR / ".wwa")).expanduser()
+STATE_DIR.mkdir(parents=True, exist_ok=True)
+TRACKER_SNAPSHOT = STATE_DIR / "tracker_state.json"
+TRACKER_TAIL = STATE_DIR / "tracker_tail.jsonl"
+TRACKER_EVENTS = STATE_DIR / "tracker_events.jsonl"  # full event history for replay
+STATE_COMPACT_EVERY = int(os.environ.get("STATE_COMPACT_EVERY", 64))
+TRACKER_REORDER_S = float(os.environ.get("TRACKER_REORDER_S", 2.0))  # events are ordered within this
+INGEST_IDS = STATE_DIR / "ingest_ids.jsonl"  # ids of applied /events, so retries after a restart are skipped
+INGEST_MAX_AHEAD_S = float(os.environ.get("INGEST_MAX_AHEAD_S", 300))  # later client timestamps are rejected
+HISTORY_DIR = STATE_DIR / "history"  # columnar rows + daily/weekly rollups
+EXPORT_STATE_DIR = STATE_DIR / "export"  # journal offsets covered by the monthly XLSX files
+
+# Background log writer
+LOG_QUEUE_MAX = int(os.environ.get("LOG_QUEUE_MAX", 10000))
+LOG_BATCH_SIZE = int(os.environ.get("LOG_BATCH_SIZE", 256))
+LOG_FLUSH_S = float(os.environ.get("LOG_FLUSH_S", 1.0))
 
 # Time rules
 WORK_TARGET_MIN = int(os.environ.get("WORK_TARGET_MIN", 480))  # 8h
@@ -17,9 +38,37 @@ LOOK_FAR_UNCLOSEABLE_S = int(os.environ.get("LOOK_FAR_UNCLOSEABLE_S", 20))
 STAND_UP_EVERY_MIN = int(os.environ.get("STAND_UP_EVERY_MIN", 60))
 BREAK_FREE_MIN = int(os.environ.get("BREAK_FREE_MIN", 30))  # free portion per break
 STANDUP_RESET_IDLE_MIN = int(os.environ.get("STANDUP_RESET_IDLE_MIN", 2))  # idle -> stood up
+# Reminder rules file (.json or .toml); the settings above are its defaults
+REMINDER_RULES = Path(os.environ.get("REMINDER_RULES", STATE_DIR / "reminders.json")).expanduser()
+RULES_RELOAD_S = float(os.environ.get("RULES_RELOAD_S", 5))  # how often the file is checked
+
+# Input activity: "auto" (OS idle query, else listeners), "idle" or "listener"
+ACTIVITY_BACKEND = os.environ.get("ACTIVITY_BACKEND", "auto")
+ACTIVITY_SAMPLE_S = float(os.environ.get("ACTIVITY_SAMPLE_S", 1.0))
+IDLE_BREAK_S = int(os.environ.get("IDLE_BREAK_S", 60))  # no input this long -> break
+LOCK_DEBOUNCE_S = float(os.environ.get("LOCK_DEBOUNCE_S", 2.0))  # shorter lock/unlock flaps cancel out
 
 # Microsoft Graph presence
 GRAPH_TOKEN = os.environ.get("GRAPH_TOKEN")
-GRAPH_PRESENCE_URL = "https://graph.microsoft.com/v1.0/me/presence"
+GRAPH_PRESENCE_URL = os.environ.get(
+    "GRAPH_PRESENCE_URL", "https://graph.microsoft.com/v1.0/me/presence"
+)
+PRESENCE_POLL_S = float(os.environ.get("PRESENCE_POLL_S", 30))
+PRESENCE_TTL_S = float(os.environ.get("PRESENCE_TTL_S", 120))
 
 SERVER_PORT = int(os.environ.get("SERVER_PORT", 5600))
+SERVER_HOST = os.environ.get("SERVER_HOST", "127.0.0.1")
+SERVER_MODE = os.environ.get("SERVER_MODE", "auto")  # auto (waitress if installed), waitress, dev
+SERVER_THREADS = int(os.environ.get("SERVER_THREADS", 32))
+SERVER_STREAMS = int(os.environ.get("SERVER_STREAMS", 8))  # open /stream connections; each holds a thread
+
+# Team aggregation: the server (team_server.py) and the agent's uplink to it
+TEAM_SERVER_URL = os.environ.get("TEAM_SERVER_URL", "")  # empty: agent does not report
+TEAM_USER = os.environ.get("TEAM_USER") or os.environ.get("USERNAME") or os.environ.get("USER", "")
+TEAM_PUSH_S = float(os.environ.get("TEAM_PUSH_S", 30))
+TEAM_QUEUE_MAX = int(os.environ.get("TEAM_QUEUE_MAX", 50000))
+TEAM_DB = Path(os.environ.get("TEAM_DB", STATE_DIR / "team.sqlite3")).expanduser()
+TEAM_SHARDS = int(os.environ.get("TEAM_SHARDS", 16))
+TEAM_PORT = int(os.environ.get("TEAM_PORT", 5700))
+TEAM_TOKEN = os.environ.get("TEAM_TOKEN")  # shared secret agents send as a Bearer token
+TEAM_CORS_ORIGINS = [o.strip() for o in os.environ.get("TEAM_CORS_ORIGINS", "").split(",") if o.strip()]
@@ -0,0 +1,274 @@
+"""Event-sourced accounting core.
+
+``DayState`` is never mutated directly by callers: it is the fold of a stream
+of timestamped events through ``apply_event``. The same fold drives the live
+``WorkTracker`` (O(1) per event) and ``replay`` over stored history, so past
+days can be recomputed whenever ``Rules`` change. ``replay_arrays`` is a
+vectorized equivalent for bulk recomputation over many users.
+
+Days are partitioned strictly by calendar date: the first event of a new day
+starts a fresh ``DayState`` and anything still open from the previous day is
+dropped, exactly as the live tracker's rollover does.
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from datetime import date, datetime, timedelta
+from typing import Dict, Iterable, Iterator, NamedTuple, Optional, Tuple
+
+from config import BREAK_FREE_MIN
+
+
+def _ts(value: Optional[datetime]) -> Optional[str]:
+    return value.isoformat() if value else None
+
+
+def _parse_ts(value: Optional[str]) -> Optional[datetime]:
+    return datetime.fromisoformat(value) if value else None
+
+
+@dataclass
+class DayState:
+    day: datetime.date
+    start_ts: Optional[datetime] = None
+    end_ts: Optional[datetime] = None
+    work_effective: timedelta = timedelta(0)
+    break_total: timedelta = timedelta(0)
+    absence_total: timedelta = timedelta(0)
+    in_break: bool = False
+    break_started: Optional[datetime] = None
+    youtube_on: bool = False
+    yt_started: Optional[datetime] = None
+
+    @staticmethod
+    def _minutes(td: timedelta) -> float:
+        return td.total_seconds() / 60.0
+
+    def snapshot(self) -> dict:
+        return {
+            "work_minutes": round(self._minutes(self.work_effective), 1),
+            "break_minutes": round(self._minutes(self.break_total), 1),
+            "absence_minutes": round(self._minutes(self.absence_total), 1),
+        }
+
+    def to_dict(self) -> dict:
+        """Lossless JSON-friendly form used for persistence."""
+        return {
+            "day": self.day.isoformat(),
+            "start_ts": _ts(self.start_ts),
+            "end_ts": _ts(self.end_ts),
+            "work_s": self.work_effective.total_seconds(),
+            "break_s": self.break_total.total_seconds(),
+            "absence_s": self.absence_total.total_seconds(),
+            "in_break": self.in_break,
+            "break_started": _ts(self.break_started),
+            "youtube_on": self.youtube_on,
+            "yt_started": _ts(self.yt_started),
+        }
+
+    @classmethod
+    def from_dict(cls, d: dict) -> "DayState":
+        return cls(
+            day=date.fromisoformat(d["day"]),
+            start_ts=_parse_ts(d.get("start_ts")),
+            end_ts=_parse_ts(d.get("end_ts")),
+            work_effective=timedelta(seconds=d.get("work_s", 0)),
+            break_total=timedelta(seconds=d.get("break_s", 0)),
+            absence_total=timedelta(seconds=d.get("absence_s", 0)),
+            in_break=bool(d.get("in_break")),
+            break_started=_parse_ts(d.get("break_started")),
+            youtube_on=bool(d.get("youtube_on")),
+            yt_started=_parse_ts(d.get("yt_started")),
+        )
+
+
+@dataclass(frozen=True)
+class Rules:
+    """Accounting rules applied while folding events."""
+
+    break_free: timedelta = field(default_factory=lambda: timedelta(minutes=BREAK_FREE_MIN))
+
+
+class Event(NamedTuple):
+    ts: datetime
+    kind: str
+    value: float = 0.0  # seconds, for "active"
+
+
+# Canonical event kinds and their compact codes for replay_arrays
+KINDS: Dict[str, int] = {
+    "start_work": 0,
+    "end_work": 1,
+    "active_minute": 2,
+    "break_start": 3,
+    "break_end": 4,
+    "youtube_start": 5,
+    "youtube_stop": 6,
+    "active": 7,
+}
+
+ALIASES: Dict[str, str] = {
+    "start": "start_work",
+    "end": "end_work",
+    "lock": "break_start",
+    "unlock": "break_end",
+}
+
+
+def canonical(kind: str) -> str:
+    kind = ALIASES.get(kind, kind)
+    if kind not in KINDS:
+        raise ValueError(f"unknown event: {kind}")
+    return kind
+
+
+def _finish(state: DayState, started: datetime, end: datetime, rules: Rules) -> None:
+    dur = end - started
+    state.break_total += dur
+    if dur > rules.break_free:
+        state.absence_total += (dur - rules.break_free)
+        state.work_effective += rules.break_free
+    else:
+        state.work_effective += dur
+
+
+def apply_event(
+    state: DayState, kind: str, ts: datetime, rules: Rules, value: float = 0.0
+) -> Tuple[DayState, bool]:
+    """Fold one event into ``state``.
+
+    Returns the (possibly new, after a day rollover) state and whether the
+    event changed anything. ``kind`` must be canonical. ``active`` credits
+    ``value`` seconds of input activity; ``active_minute`` is a fixed 60.
+    """
+    if state.day != ts.date():
+        state = DayState(day=ts.date())
+    s = state
+    if kind == "start_work":
+        if s.start_ts:
+            return s, False
+        s.start_ts = ts
+    elif kind == "end_work":
+        if s.in_break and s.break_started:
+            _finish(s, s.break_started, ts, rules)
+            s.in_break, s.break_started = False, None
+        if s.youtube_on and s.yt_started:
+            _finish(s, s.yt_started, ts, rules)
+            s.youtube_on, s.yt_started = False, None
+        s.end_ts = ts
+    elif kind in ("active", "active_minute"):
+        if not s.start_ts or s.in_break or s.youtube_on:
+            return s, False
+        s.work_effective += timedelta(seconds=60 if kind == "active_minute" else value)
+    elif kind == "break_start":
+        if s.in_break:
+            return s, False
+        s.in_break, s.break_started = True, ts
+    elif kind == "break_end":
+        if not (s.in_break and s.break_started):
+            return s, False
+        _finish(s, s.break_started, ts, rules)
+        s.in_break, s.break_started = False, None
+    elif kind == "youtube_start":
+        if s.youtube_on:
+            return s, False
+        s.youtube_on, s.yt_started = True, ts
+    elif kind == "youtube_stop":
+        if not (s.youtube_on and s.yt_started):
+            return s, False
+        _finish(s, s.yt_started, ts, rules)
+        s.youtube_on, s.yt_started = False, None
+    else:
+        raise ValueError(f"unknown event: {kind}")
+    return s, True
+
+
+def replay(events: Iterable[Event], rules: Optional[Rules] = None) -> Iterator[DayState]:
+    """Stream time-ordered events and yield one final DayState per day."""
+    rules = rules or Rules()
+    state: Optional[DayState] = None
+    for ts, kind, value in events:
+        if state is not None and state.day != ts.date():
+            yield state
+            state = None
+        state, _ = apply_event(
+            state or DayState(day=ts.date()), canonical(kind), ts, rules, value
+        )
+    if state is not None:
+        yield state
+
+
+def replay_arrays(group, ts, kind, value=None, rules: Optional[Rules] = None) -> dict:
+    """Vectorized replay over many independent streams.
+
+    ``group`` identifies one (user, day) stream, ``ts`` is epoch seconds,
+    ``kind`` holds ``KINDS`` codes and ``value`` the seconds of ``active``
+    events (may be omitted if there are none). Input that is already ordered by
+    (group, ts), as history read from a journal is, skips the sort. Returns
+    per group totals in seconds, matching ``apply_event`` folded per group.
+    """
+    import numpy as np
+
+    rules = rules or Rules()
+    free = rules.break_free.total_seconds()
+    group = np.asarray(group)
+    ts = np.asarray(ts, dtype=np.float64)
+    kind = np.asarray(kind, dtype=np.int8)
+    value = np.zeros(len(kind)) if value is None else np.asarray(value, dtype=np.float64)
+    same = group[1:] == group[:-1]
+    if not np.all((group[1:] > group[:-1]) | (same & (ts[1:] >= ts[:-1]))):
+        order = np.lexsort((ts, group))
+        group, ts, kind, value = group[order], ts[order], kind[order], value[order]
+    n = len(kind)
+    first = np.ones(n, dtype=bool)
+    first[1:] = group[1:] != group[:-1]
+    idx = np.arange(n)
+
+    def state_before(on: int, off: int):
+        # State after each event: 1/0 where the event sets it, carried forward
+        # otherwise; streams start closed. Shift by one for the state before.
+        setter = (kind == on) | (kind == off) | (kind == KINDS["end_work"]) | first
+        value = np.where(kind == on, 1, 0).astype(np.int8)
+        after = value[np.maximum.accumulate(np.where(setter, idx, 0))]
+        before = np.zeros(n, dtype=np.int8)
+        before[1:] = after[:-1]
+        before[first] = 0
+        return before
+
+    def durations(on: int, off: int):
+        before = state_before(on, off)
+        opened = (kind == on) & (before == 0)
+        closed = ((kind == off) | (kind == KINDS["end_work"])) & (before == 1)
+        open_idx = np.maximum.accumulate(np.where(opened, idx, 0))
+        dur = np.where(closed, ts - ts[open_idx], 0.0)
+        return before, dur
+
+    in_break, brk = durations(KINDS["break_start"], KINDS["break_end"])
+    in_yt, yt = durations(KINDS["youtube_start"], KINDS["youtube_stop"])
+
+    starts = kind == KINDS["start_work"]
+    start_seen = np.maximum.accumulate(np.where(starts | first, idx, 0))
+    started_before = starts[start_seen] & (start_seen < idx)
+    counted = started_before & (in_break == 0) & (in_yt == 0)
+    credit = np.where(kind == KINDS["active"], value, 0.0)
+    credit[kind == KINDS["active_minute"]] = 60.0
+
+    gid = np.cumsum(first) - 1
+    keys = group[first]
+    m = len(keys)
+    work = np.where(counted, credit, 0.0)
+    absence = np.zeros(n)
+    for dur in (brk, yt):
+        work += np.minimum(dur, free)
+        absence += np.maximum(dur - free, 0.0)
+    s_idx = np.flatnonzero(starts)
+    first_start = np.full(m, np.inf)
+    np.minimum.at(first_start, gid[s_idx], ts[s_idx])
+    return {
+        "group": keys,
+        "work_s": np.bincount(gid, weights=work, minlength=m),
+        "break_s": np.bincount(gid, weights=brk + yt, minlength=m),
+        "absence_s": np.bincount(gid, weights=absence, minlength=m),
+        "start_ts": np.where(np.isinf(first_start), np.nan, first_start),
+    }
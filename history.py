@@ -0,0 +1,448 @@
+"""Columnar history of activity and look-far rows with daily/weekly rollups.
+
+Rows are stored as fixed-width NumPy columns, one raw file per column in
+monthly partitions (``history/activity/2024-05/ts.f8``), so a date range
+is read with ``np.memmap`` and nothing else is parsed. Report queries read
+only ``rollups.json``: per-day and per-ISO-week totals that are updated as
+rows are appended.
+
+Both ``History.activity_sink`` and ``History.lookfar_sink`` have the
+``append_many``/``sync`` interface of ``Journal``, so the ``LogWriter``
+feeds them next to the JSON-lines journals.
+
+    python history.py rebuild [--from-xlsx]
+
+rebuilds the history from the journals (or from the XLSX/CSV sidecars).
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import shutil
+import sys
+from datetime import date, datetime, timedelta
+from pathlib import Path
+from threading import Lock, RLock
+from typing import TYPE_CHECKING, BinaryIO, Dict, Iterable, List, Optional, Sequence, Tuple
+
+if TYPE_CHECKING:
+    import numpy as np
+
+ACTIVITY_SCHEMA: Dict[str, str] = {
+    "ts": "<f8",  # epoch seconds, local time
+    "event": "<i2",  # code into events.json
+    "work_min": "<f4",
+    "break_min": "<f4",
+    "absence_min": "<f4",
+}
+LOOKFAR_SCHEMA: Dict[str, str] = {"ts": "<f8", "reaction_s": "<f4"}
+
+WEEKDAYS = ["Mon", "Tue", "Wed", "Thu", "Fri", "Sat", "Sun"]
+
+
+def _to_datetime(value: object) -> Optional[datetime]:
+    if isinstance(value, datetime):
+        return value
+    try:
+        return datetime.fromisoformat(str(value))
+    except ValueError:
+        return None
+
+
+def _float(value: object) -> float:
+    try:
+        f = float(value)  # type: ignore[arg-type]
+    except (TypeError, ValueError):
+        return 0.0
+    return 0.0 if f != f else f  # NaN from empty spreadsheet cells
+
+
+def _totals(row: Dict) -> Optional[Tuple[float, float, float]]:
+    """The day's running totals a row carries; None for rows that carry
+    none (blank cells, or the 0/0/0 that standup_close rows used to log)."""
+    values = []
+    for key in ("work_minutes_today", "break_minutes_today", "absence_minutes_today"):
+        value = row.get(key)
+        if value is None or value == "":
+            return None
+        values.append(_float(value))
+    if not any(values):
+        return None
+    return values[0], values[1], values[2]
+
+
+def _month(ts: datetime) -> str:
+    return f"{ts.year:04d}-{ts.month:02d}"
+
+
+def _months(start: date, end: date) -> List[str]:
+    out, y, m = [], start.year, start.month
+    while (y, m) <= (end.year, end.month):
+        out.append(f"{y:04d}-{m:02d}")
+        y, m = (y + 1, 1) if m == 12 else (y, m + 1)
+    return out
+
+
+class ColumnTable:
+    """Append-only table of fixed-width columns in monthly partitions.
+
+    Each column is a raw little-endian file; a partition's row count is the
+    shortest column, so a crash between column writes only hides the torn
+    row.
+    """
+
+    def __init__(self, root: Path, schema: Dict[str, str]) -> None:
+        self.root = root
+        self.schema = dict(schema)
+        self._handles: Dict[Tuple[str, str], BinaryIO] = {}
+        self._lock = Lock()
+
+    def _path(self, month: str, column: str) -> Path:
+        return self.root / month / f"{column}.{self.schema[column][1:]}"
+
+    def append(self, months: List[str], columns: Dict[str, Sequence]) -> None:
+        """Append rows; ``months`` holds each row's partition key."""
+        import numpy as np
+
+        keys = np.asarray(months)
+        with self._lock:
+            for month in dict.fromkeys(months):
+                mask = keys == month
+                for name, dt in self.schema.items():
+                    fh = self._handles.get((month, name))
+                    if fh is None:
+                        path = self._path(month, name)
+                        path.parent.mkdir(parents=True, exist_ok=True)
+                        fh = self._handles[(month, name)] = path.open("ab")
+                    np.asarray(columns[name], dtype=dt)[mask].tofile(fh)
+                    fh.flush()
+
+    def sync(self) -> None:
+        with self._lock:
+            for fh in self._handles.values():
+                os.fsync(fh.fileno())
+
+    def close(self) -> None:
+        with self._lock:
+            for fh in self._handles.values():
+                fh.close()
+            self._handles.clear()
+
+    def partitions(self) -> List[str]:
+        if not self.root.exists():
+            return []
+        return sorted(p.name for p in self.root.iterdir() if p.is_dir())
+
+    def read_partition(self, month: str) -> Dict[str, np.ndarray]:
+        """Memory-mapped columns of one partition (empty arrays if none)."""
+        import numpy as np
+
+        paths = {name: self._path(month, name) for name in self.schema}
+        sizes = {
+            name: (p.stat().st_size // np.dtype(self.schema[name]).itemsize if p.exists() else 0)
+            for name, p in paths.items()
+        }
+        n = min(sizes.values())
+        if n == 0:
+            return {name: np.empty(0, dtype=dt) for name, dt in self.schema.items()}
+        return {
+            name: np.memmap(paths[name], dtype=self.schema[name], mode="r", shape=(n,))
+            for name in self.schema
+        }
+
+    def read(self, start: date, end: date) -> Dict[str, np.ndarray]:
+        """Rows with ``start <= day <= end``, in append order per partition."""
+        import numpy as np
+
+        lo = datetime.combine(start, datetime.min.time()).timestamp()
+        hi = datetime.combine(end + timedelta(days=1), datetime.min.time()).timestamp()
+        parts = []
+        for month in _months(start, end):
+            cols = self.read_partition(month)
+            mask = (cols["ts"] >= lo) & (cols["ts"] < hi)
+            parts.append({name: np.asarray(col[mask]) for name, col in cols.items()})
+        if not parts:
+            return {name: np.empty(0, dtype=dt) for name, dt in self.schema.items()}
+        return {name: np.concatenate([p[name] for p in parts]) for name in self.schema}
+
+
+class Rollups:
+    """Per-day and per-ISO-week aggregates, updated row by row.
+
+    Activity rows carry the day's running totals, so a day's totals are
+    those of its newest row and a week moves by the difference. Totals from
+    a row older than the newest applied one (a late row) are ignored.
+    """
+
+    def __init__(self, path: Path) -> None:
+        self.path = path
+        self.daily: Dict[str, dict] = {}
+        self.weekly: Dict[str, dict] = {}
+        self.dirty = False
+        try:
+            with path.open("r", encoding="utf-8") as f:
+                doc = json.load(f)
+            self.daily, self.weekly = doc["daily"], doc["weekly"]
+        except (FileNotFoundError, json.JSONDecodeError, KeyError, TypeError):
+            pass
+
+    @staticmethod
+    def _empty() -> dict:
+        return {
+            "days": 0, "work_min": 0.0, "break_min": 0.0, "absence_min": 0.0,
+            "events": {}, "lookfar_n": 0, "lookfar_s": 0.0, "lookfar_max_s": 0.0,
+        }
+
+    def _buckets(self, day: date) -> Tuple[dict, dict]:
+        week = (day - timedelta(days=day.weekday())).isoformat()
+        d = self.daily.get(day.isoformat())
+        if d is None:
+            d = self.daily[day.isoformat()] = self._empty()
+            d["days"] = 1
+            self.weekly.setdefault(week, self._empty())["days"] += 1
+        self.dirty = True
+        return d, self.weekly[week]
+
+    def add_activity(
+        self, ts: datetime, event: str, totals: Optional[Tuple[float, float, float]]
+    ) -> None:
+        d, w = self._buckets(ts.date())
+        if totals is not None and ts.timestamp() >= d.get("totals_ts", float("-inf")):
+            d["totals_ts"] = ts.timestamp()
+            for key, value in zip(("work_min", "break_min", "absence_min"), totals):
+                w[key] += value - d[key]
+                d[key] = value
+        for bucket in (d, w):
+            bucket["events"][event] = bucket["events"].get(event, 0) + 1
+
+    def add_lookfar(self, day: date, reaction_s: float) -> None:
+        for bucket in self._buckets(day):
+            bucket["lookfar_n"] += 1
+            bucket["lookfar_s"] += reaction_s
+            bucket["lookfar_max_s"] = max(bucket["lookfar_max_s"], reaction_s)
+
+    def save(self) -> None:
+        if not self.dirty:
+            return
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_suffix(".tmp")
+        with tmp.open("w", encoding="utf-8") as f:
+            json.dump({"daily": self.daily, "weekly": self.weekly}, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self.path)
+        self.dirty = False
+
+    @staticmethod
+    def view(key: str, bucket: dict) -> dict:
+        n = bucket["lookfar_n"]
+        return {
+            "start": key,
+            "days": bucket["days"],
+            "work_minutes": round(bucket["work_min"], 1),
+            "break_minutes": round(bucket["break_min"], 1),
+            "absence_minutes": round(bucket["absence_min"], 1),
+            "events": dict(bucket["events"]),
+            "lookfar_count": n,
+            "lookfar_avg_s": round(bucket["lookfar_s"] / n, 1) if n else None,
+            "lookfar_max_s": round(bucket["lookfar_max_s"], 1) if n else None,
+        }
+
+
+class _Sink:
+    """``Journal``-shaped adapter the LogWriter writes rows into."""
+
+    def __init__(self, history: "History", kind: str) -> None:
+        self._history = history
+        self._kind = kind
+
+    def append_many(self, rows: Iterable[Dict]) -> None:
+        self._history.append(self._kind, rows)
+
+    def sync(self) -> None:
+        self._history.sync()
+
+
+class History:
+    def __init__(self, root: Path) -> None:
+        self.root = root
+        self.activity = ColumnTable(root / "activity", ACTIVITY_SCHEMA)
+        self.lookfar = ColumnTable(root / "lookfar", LOOKFAR_SCHEMA)
+        self.rollups = Rollups(root / "rollups.json")
+        self._codes_path = root / "events.json"
+        try:
+            self.event_names: List[str] = json.loads(self._codes_path.read_text(encoding="utf-8"))
+        except (FileNotFoundError, json.JSONDecodeError):
+            self.event_names = []
+        self._codes = {name: i for i, name in enumerate(self.event_names)}
+        self._lock = RLock()
+        self.activity_sink = _Sink(self, "activity")
+        self.lookfar_sink = _Sink(self, "lookfar")
+
+    def exists(self) -> bool:
+        return self.rollups.path.exists()
+
+    def _code(self, event: str) -> int:
+        code = self._codes.get(event)
+        if code is None:
+            code = self._codes[event] = len(self.event_names)
+            self.event_names.append(event)
+            tmp = self._codes_path.with_suffix(".tmp")
+            self.root.mkdir(parents=True, exist_ok=True)
+            tmp.write_text(json.dumps(self.event_names), encoding="utf-8")
+            os.replace(tmp, self._codes_path)
+        return code
+
+    # Writing
+    def append(self, kind: str, rows: Iterable[Dict]) -> None:
+        with self._lock:
+            if kind == "activity":
+                self._append_activity(rows)
+            else:
+                self._append_lookfar(rows)
+
+    def _append_activity(self, rows: Iterable[Dict]) -> None:
+        months, cols = [], {name: [] for name in ACTIVITY_SCHEMA}
+        for row in rows:
+            ts = _to_datetime(row.get("timestamp"))
+            if ts is None:
+                continue
+            event = str(row.get("event") or "")
+            totals = _totals(row)
+            work, brk, absence = totals or (0.0, 0.0, 0.0)
+            months.append(_month(ts))
+            for name, value in zip(ACTIVITY_SCHEMA, (ts.timestamp(), self._code(event), work, brk, absence)):
+                cols[name].append(value)
+            self.rollups.add_activity(ts, event, totals)
+        if months:
+            self.activity.append(months, cols)
+
+    def _append_lookfar(self, rows: Iterable[Dict]) -> None:
+        months, ts_col, reaction_col = [], [], []
+        for row in rows:
+            ts = _to_datetime(row.get("timestamp"))
+            if ts is None:
+                continue
+            reaction = _float(row.get("reaction_seconds"))
+            months.append(_month(ts))
+            ts_col.append(ts.timestamp())
+            reaction_col.append(reaction)
+            self.rollups.add_lookfar(ts.date(), reaction)
+        if months:
+            self.lookfar.append(months, {"ts": ts_col, "reaction_s": reaction_col})
+
+    def sync(self) -> None:
+        with self._lock:
+            self.activity.sync()
+            self.lookfar.sync()
+            self.rollups.save()
+
+    def rebuild(self, activity_rows: Iterable[Dict], lookfar_rows: Iterable[Dict]) -> None:
+        """Replace the whole history with the given rows (in time order).
+
+        Concurrent appends wait until the rebuild is done.
+        """
+        with self._lock:
+            self.activity.close()
+            self.lookfar.close()
+            if self.root.exists():
+                shutil.rmtree(self.root)
+            self.rollups = Rollups(self.root / "rollups.json")
+            self.event_names, self._codes = [], {}
+            self.append("activity", activity_rows)
+            self.append("lookfar", lookfar_rows)
+            self.rollups.dirty = True
+            self.sync()
+
+    # Queries (rollups only)
+    def daily(self, start: date, end: date) -> List[dict]:
+        with self._lock:
+            items = [(k, dict(v)) for k, v in self.rollups.daily.items() if start.isoformat() <= k <= end.isoformat()]
+        out = []
+        for key, bucket in sorted(items):
+            row = Rollups.view(key, bucket)
+            row["weekday"] = WEEKDAYS[date.fromisoformat(key).weekday()]
+            out.append(row)
+        return out
+
+    def weekly(self, start: date, end: date) -> List[dict]:
+        first = (start - timedelta(days=start.weekday())).isoformat()
+        with self._lock:
+            items = [(k, dict(v)) for k, v in self.rollups.weekly.items() if first <= k <= end.isoformat()]
+        return [Rollups.view(key, bucket) for key, bucket in sorted(items)]
+
+    def weekdays(self, start: date, end: date) -> List[dict]:
+        """Average minutes per weekday over days with activity."""
+        acc = {i: [0, 0.0, 0.0, 0.0] for i in range(7)}
+        for row in self.daily(start, end):
+            a = acc[WEEKDAYS.index(row["weekday"])]
+            a[0] += 1
+            a[1] += row["work_minutes"]
+            a[2] += row["break_minutes"]
+            a[3] += row["absence_minutes"]
+        return [
+            {
+                "weekday": WEEKDAYS[i],
+                "days": n,
+                "avg_work_minutes": round(w / n, 1) if n else None,
+                "avg_break_minutes": round(b / n, 1) if n else None,
+                "avg_absence_minutes": round(a / n, 1) if n else None,
+            }
+            for i, (n, w, b, a) in acc.items()
+        ]
+
+    # Raw columns for ad-hoc analysis
+    def activity_columns(self, start: date, end: date) -> Dict[str, np.ndarray]:
+        return self.activity.read(start, end)
+
+    def lookfar_columns(self, start: date, end: date) -> Dict[str, np.ndarray]:
+        return self.lookfar.read(start, end)
+
+
+def _xlsx_rows(path: Path, columns: List[str]) -> List[Dict]:
+    """Rows of ``path`` and its ``.csv`` sidecar, in time order."""
+    import pandas as pd
+
+    frames = []
+    if path.exists():
+        frames.append(pd.read_excel(path))
+    if path.with_suffix(".csv").exists():
+        frames.append(pd.read_csv(path.with_suffix(".csv")))
+    if not frames:
+        return []
+    df = pd.concat(frames, ignore_index=True).reindex(columns=columns)
+    df["timestamp"] = df["timestamp"].astype(str)
+    return df.sort_values("timestamp", kind="stable").to_dict(orient="records")
+
+
+def main(argv: List[str]) -> int:
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Rebuild the columnar history")
+    parser.add_argument("command", choices=["rebuild"])
+    parser.add_argument(
+        "--from-xlsx", action="store_true",
+        help="import aktywnosc/popatrz_w_dal .xlsx + .csv instead of the journals",
+    )
+    args = parser.parse_args(argv)
+
+    import storage
+
+    storage.flush()
+    if args.from_xlsx:
+        from config import ACTIVITY_XLSX, LOOK_FAR_XLSX
+
+        activity = _xlsx_rows(ACTIVITY_XLSX, storage.ACTIVITY_COLUMNS)
+        lookfar = _xlsx_rows(LOOK_FAR_XLSX, storage.LOOKFAR_COLUMNS)
+    else:
+        activity = storage.activity_journal.read()
+        lookfar = storage.lookfar_journal.read()
+    storage.history.rebuild(activity, lookfar)
+    days = len(storage.history.rollups.daily)
+    print(f"history rebuilt in {storage.history.root}: {days} days")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,138 @@
+from __future__ import annotations
+
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from threading import Lock
+from typing import Callable, Dict, List, Optional, Tuple
+
+from journal import Journal
+from tracker import WorkTracker
+
+# Client event type -> (tracker transition, payload field logged as details)
+EVENT_TYPES: Dict[str, Tuple[str, str]] = {
+    "youtube_start": ("youtube_start", "url"),
+    "youtube_stop": ("youtube_stop", "url"),
+    "break_start": ("break_start", "reason"),
+    "break_end": ("break_end", "reason"),
+    "start_work": ("start_work", "reason"),
+    "end_work": ("end_work", "reason"),
+}
+
+RowSink = Callable[[List[Dict]], None]
+
+
+def parse_ts(value: object, default: datetime) -> Optional[datetime]:
+    """ISO-8601 string or epoch milliseconds (as sent by Date.now())."""
+    if value is None:
+        return default
+    try:
+        if isinstance(value, (int, float)):
+            return datetime.fromtimestamp(value / 1000.0)
+        ts = datetime.fromisoformat(str(value).replace("Z", "+00:00"))
+    except (ValueError, OverflowError, OSError):
+        return None
+    # Tracker timestamps are naive local time
+    return ts.astimezone().replace(tzinfo=None) if ts.tzinfo else ts
+
+
+class EventIngestor:
+    """Applies batches of client events exactly once.
+
+    Event ids seen recently (bounded LRU of ``max_ids``) are skipped, so a
+    client may retry a whole batch safely. With an ``ids`` journal the ids
+    of applied events are also appended there and loaded again on start,
+    so a batch re-sent after a restart is skipped too (ids of a batch the
+    tracker failed to apply are released again); the journal is
+    rewritten with the newest ``max_ids`` when it holds twice as many.
+    Events stamped more than ``max_ahead_s`` seconds in the future (a
+    client with a wrong clock) are rejected. Accepted events are applied to
+    the tracker in timestamp order under one lock acquisition and their log
+    rows are handed to ``log_rows`` in one call.
+    """
+
+    def __init__(
+        self,
+        tracker: WorkTracker,
+        log_rows: RowSink,
+        max_ids: int = 10000,
+        ids: Optional[Journal] = None,
+        max_ahead_s: float = 300.0,
+    ) -> None:
+        self.tracker = tracker
+        self.log_rows = log_rows
+        self.max_ids = max_ids
+        self.max_ahead = timedelta(seconds=max_ahead_s)
+        self._seen: "OrderedDict[str, None]" = OrderedDict()
+        self._ids = ids
+        self._persisted = 0  # records in the ids journal
+        self._lock = Lock()
+        if ids is not None:
+            for rec in ids.read():
+                self._persisted += 1
+                if isinstance(rec, dict) and "id" in rec:
+                    self._claim(str(rec["id"]))
+
+    def _claim(self, event_id: str) -> bool:
+        """False if the id was already ingested."""
+        if event_id in self._seen:
+            self._seen.move_to_end(event_id)
+            return False
+        self._seen[event_id] = None
+        if len(self._seen) > self.max_ids:
+            self._seen.popitem(last=False)
+        return True
+
+    def _persist(self, event_ids: List[str]) -> None:
+        """Record applied ids. Caller holds the lock."""
+        if self._ids is None or not event_ids:
+            return
+        if self._persisted + len(event_ids) > 2 * self.max_ids:
+            self._persisted = self._ids.rewrite({"id": i} for i in self._seen)
+        else:
+            self._ids.append_many({"id": i} for i in event_ids)
+            self._persisted += len(event_ids)
+
+    def ingest(self, items: List[Dict]) -> Dict:
+        now = self.tracker.clock.now()
+        accepted: List[Tuple[datetime, str, str, str]] = []
+        claimed: List[str] = []
+        duplicates = rejected = 0
+        with self._lock:
+            for item in items:
+                if not isinstance(item, dict) or item.get("type") not in EVENT_TYPES:
+                    rejected += 1
+                    continue
+                ts = parse_ts(item.get("ts"), now)
+                if ts is None or ts - now > self.max_ahead:
+                    rejected += 1
+                    continue
+                event_id = item.get("id")
+                if event_id is not None:
+                    if not self._claim(str(event_id)):
+                        duplicates += 1
+                        continue
+                    claimed.append(str(event_id))
+                kind, detail_field = EVENT_TYPES[item["type"]]
+                accepted.append((ts, kind, item["type"], str(item.get(detail_field, ""))))
+            accepted.sort(key=lambda e: e[0])
+            try:
+                snaps = self.tracker.apply_events([(ts, kind) for ts, kind, _, _ in accepted])
+            except Exception:
+                for event_id in claimed:  # not applied: a retry must not be taken for a duplicate
+                    self._seen.pop(event_id, None)
+                raise
+            self._persist(claimed)
+        self.log_rows(
+            [
+                {
+                    "timestamp": ts.isoformat(timespec="seconds"),
+                    "event": event,
+                    "details": details,
+                    "work_minutes_today": snap["work_minutes"],
+                    "break_minutes_today": snap["break_minutes"],
+                    "absence_minutes_today": snap["absence_minutes"],
+                }
+                for (ts, _, event, details), snap in zip(accepted, snaps)
+            ]
+        )
+        return {"accepted": len(accepted), "duplicates": duplicates, "rejected": rejected}
@@ -0,0 +1,120 @@
+from __future__ import annotations
+
+import json
+import os
+from pathlib import Path
+from threading import Lock
+from typing import Dict, Iterable, Iterator, List, Optional, TextIO, Tuple
+
+
+class Journal:
+    """Append-only JSON-lines file, one record per line.
+
+    Appends are O(1) regardless of history size. A torn last line left by a
+    crash is skipped on read instead of failing the whole file.
+    """
+
+    def __init__(self, path: Path) -> None:
+        self.path = path
+        self._lock = Lock()
+        self._fh: Optional[TextIO] = None
+
+    def _handle(self) -> TextIO:
+        if self._fh is None or self._fh.closed:
+            self._fh = self.path.open("a", encoding="utf-8")
+        return self._fh
+
+    def append(self, row: Dict) -> None:
+        self.append_many([row])
+
+    def append_many(self, rows: Iterable[Dict]) -> None:
+        data = "".join(json.dumps(r, ensure_ascii=False, default=str) + "\n" for r in rows)
+        if not data:
+            return
+        with self._lock:
+            fh = self._handle()
+            fh.write(data)
+            fh.flush()
+
+    def sync(self) -> None:
+        """Force appended data to disk."""
+        with self._lock:
+            if self._fh is not None and not self._fh.closed:
+                self._fh.flush()
+                os.fsync(self._fh.fileno())
+
+    def truncate(self) -> None:
+        with self._lock:
+            if self._fh is not None:
+                self._fh.close()
+                self._fh = None
+            self.path.open("w", encoding="utf-8").close()
+
+    def rewrite(self, rows: Iterable[Dict]) -> int:
+        """Atomically replace the contents with ``rows``; returns the count.
+
+        Holds the lock throughout, so concurrent appends land after the new
+        contents rather than in the replaced file.
+        """
+        tmp = self.path.with_suffix(self.path.suffix + ".tmp")
+        n = 0
+        with self._lock:
+            with tmp.open("w", encoding="utf-8") as f:
+                for r in rows:
+                    f.write(json.dumps(r, ensure_ascii=False, default=str) + "\n")
+                    n += 1
+                f.flush()
+                os.fsync(f.fileno())
+            if self._fh is not None:
+                self._fh.close()
+                self._fh = None
+            os.replace(tmp, self.path)
+        return n
+
+    def close(self) -> None:
+        with self._lock:
+            if self._fh is not None:
+                self._fh.close()
+                self._fh = None
+
+    def exists(self) -> bool:
+        return self.path.exists()
+
+    def size(self) -> int:
+        try:
+            return self.path.stat().st_size
+        except FileNotFoundError:
+            return 0
+
+    def tail(self, offset: int) -> Tuple[List[Tuple[Dict, int]], int]:
+        """Complete records after byte ``offset``, each with the offset just
+        past it, and the offset to continue from next time."""
+        try:
+            with self.path.open("rb") as f:
+                f.seek(offset)
+                data = f.read()
+        except FileNotFoundError:
+            return [], offset
+        end = data.rfind(b"\n") + 1
+        out = []
+        pos = offset
+        for line in data[:end].splitlines(keepends=True):
+            pos += len(line)
+            try:
+                out.append((json.loads(line), pos))
+            except json.JSONDecodeError:
+                continue
+        return out, offset + end
+
+    def read(self) -> Iterator[Dict]:
+        if not self.path.exists():
+            return
+        with self.path.open("r", encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    yield json.loads(line)
+                except json.JSONDecodeError:
+                    continue
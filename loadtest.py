@@ -0,0 +1,143 @@
+"""HTTP load test for the agent's /status and /event endpoints.
+
+    python loadtest.py --self --clients 200 --duration 10
+    python loadtest.py --url http://localhost:5600 --clients 100
+
+``--self`` serves a fresh, unstarted ``Agent`` with waitress on a free port
+in this process, using a temporary DESKTOP_DIR. Otherwise the target agent
+must already be running. Each client thread keeps one keep-alive
+connection and alternates requests according to ``--event-ratio``.
+"""
+
+from __future__ import annotations
+
+import argparse
+import http.client
+import json
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import urlparse
+
+EVENT_TYPES = ["youtube_start", "youtube_stop", "break_start", "break_end"]
+
+
+def _percentile(sorted_values: List[float], q: float) -> float:
+    if not sorted_values:
+        return 0.0
+    idx = min(len(sorted_values) - 1, int(round(q * (len(sorted_values) - 1))))
+    return sorted_values[idx]
+
+
+def _client(
+    host: str,
+    port: int,
+    deadline: float,
+    event_ratio: float,
+    out: Dict[str, List[float]],
+    errors: List[int],
+    lock: threading.Lock,
+) -> None:
+    rng = random.Random()
+    conn = http.client.HTTPConnection(host, port, timeout=30)
+    local: Dict[str, List[float]] = {"/status": [], "/event": []}
+    failed = 0
+    while time.perf_counter() < deadline:
+        if rng.random() < event_ratio:
+            path, method = "/event", "POST"
+            body: Optional[str] = json.dumps({"type": rng.choice(EVENT_TYPES), "reason": "loadtest"})
+            headers = {"Content-Type": "application/json"}
+        else:
+            path, method, body, headers = "/status", "GET", None, {}
+        t0 = time.perf_counter()
+        try:
+            conn.request(method, path, body=body, headers=headers)
+            resp = conn.getresponse()
+            resp.read()
+            ok = resp.status == 200
+        except (OSError, http.client.HTTPException):
+            ok = False
+            conn.close()
+            conn = http.client.HTTPConnection(host, port, timeout=30)
+        if ok:
+            local[path].append(time.perf_counter() - t0)
+        else:
+            failed += 1
+    conn.close()
+    with lock:
+        for path, values in local.items():
+            out[path].extend(values)
+        errors.append(failed)
+
+
+def run(url: str, clients: int, duration: float, event_ratio: float) -> Dict:
+    parsed = urlparse(url)
+    host, port = parsed.hostname or "127.0.0.1", parsed.port or 80
+    out: Dict[str, List[float]] = {"/status": [], "/event": []}
+    errors: List[int] = []
+    lock = threading.Lock()
+    deadline = time.perf_counter() + duration
+    threads = [
+        threading.Thread(
+            target=_client, args=(host, port, deadline, event_ratio, out, errors, lock), daemon=True
+        )
+        for _ in range(clients)
+    ]
+    t0 = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - t0
+    report: Dict = {"clients": clients, "seconds": round(elapsed, 2), "errors": sum(errors)}
+    for path, values in out.items():
+        values.sort()
+        report[path] = {
+            "requests": len(values),
+            "rps": round(len(values) / elapsed, 1),
+            "p50_ms": round(_percentile(values, 0.50) * 1000, 2),
+            "p99_ms": round(_percentile(values, 0.99) * 1000, 2),
+        }
+    return report
+
+
+def _serve_self(threads: int) -> Tuple[str, object]:
+    os.environ.setdefault("DESKTOP_DIR", tempfile.mkdtemp(prefix="wwa-loadtest-"))
+    import waitress
+
+    from agent import Agent
+    from app import create_app
+
+    server = waitress.create_server(
+        create_app(Agent()), host="127.0.0.1", port=0, threads=threads
+    )
+    threading.Thread(target=server.run, name="wwa-loadtest-server", daemon=True).start()
+    return f"http://127.0.0.1:{server.effective_port}", server
+
+
+def main(argv: Optional[list] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default="http://localhost:5600")
+    parser.add_argument("--self", dest="serve_self", action="store_true")
+    parser.add_argument("--server-threads", type=int, default=32)
+    parser.add_argument("--clients", type=int, default=200)
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--event-ratio", type=float, default=0.2)
+    args = parser.parse_args(argv)
+
+    url = args.url
+    server = None
+    if args.serve_self:
+        url, server = _serve_self(args.server_threads)
+    print(json.dumps(run(url, args.clients, args.duration, args.event_ratio), indent=2))
+    if server is not None:
+        server.close()  # type: ignore[attr-defined]
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
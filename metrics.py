@@ -0,0 +1,301 @@
+"""In-process metrics and an opt-in sampling profiler.
+
+Counters and latency histograms are plain Python objects updated under a
+per-metric lock (about a microsecond per observation), so they stay on in
+production; gauges are callbacks read only when ``render`` produces the
+Prometheus text format for ``GET /metrics``. ``profiler`` samples the
+stacks of all threads while switched on (``POST /profile``) and reports the
+hottest ones.
+"""
+
+from __future__ import annotations
+
+import functools
+import os
+import sys
+import threading
+import time
+from bisect import bisect_left
+from collections import Counter as _Tally
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Optional, Tuple, Union
+
+# Seconds; wide enough for a dict lookup and for an XLSX export
+LATENCY_BUCKETS = (
+    0.00001, 0.000025, 0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005,
+    0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0,
+)
+
+Labels = Tuple[str, ...]
+GaugeValue = Union[float, Dict[Labels, float]]
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(names: Labels, values: Labels, extra: str = "") -> str:
+    pairs = [f'{n}="{_escape(str(v))}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _num(v: float) -> str:
+    return repr(float(v)) if v != int(v) else str(int(v))
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, help: str, labelnames: Labels = ()) -> None:
+        self.name = name
+        self.help = help
+        self.labelnames = labelnames
+        self._lock = threading.Lock()
+
+    def header(self) -> List[str]:
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+
+    def render(self) -> List[str]:
+        raise NotImplementedError
+
+
+class CounterMetric(_Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, help: str, labelnames: Labels = ()) -> None:
+        super().__init__(name, help, labelnames)
+        self._values: Dict[Labels, float] = {}
+
+    def inc(self, *labels: str, amount: float = 1.0) -> None:
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0.0) + amount
+
+    def value(self, *labels: str) -> float:
+        return self._values.get(labels, 0.0)
+
+    def render(self) -> List[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        return self.header() + [
+            f"{self.name}{_labels(self.labelnames, k)} {_num(v)}" for k, v in items
+        ]
+
+
+class HistogramMetric(_Metric):
+    kind = "histogram"
+
+    def __init__(
+        self, name: str, help: str, labelnames: Labels = (), buckets: Tuple[float, ...] = LATENCY_BUCKETS
+    ) -> None:
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._series: Dict[Labels, List[float]] = {}  # bucket counts..., +Inf count, sum
+
+    def observe(self, value: float, *labels: str) -> None:
+        i = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [0.0] * (len(self.buckets) + 2)
+            series[i] += 1
+            series[-1] += value
+
+    @contextmanager
+    def time(self, *labels: str) -> Iterator[None]:
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - t0, *labels)
+
+    def timed(self, *labels: str) -> Callable:
+        """Decorator form of ``time``."""
+
+        def wrap(fn: Callable) -> Callable:
+            @functools.wraps(fn)
+            def timed_fn(*args, **kwargs):
+                t0 = time.perf_counter()
+                try:
+                    return fn(*args, **kwargs)
+                finally:
+                    self.observe(time.perf_counter() - t0, *labels)
+
+            return timed_fn
+
+        return wrap
+
+    def count(self, *labels: str) -> int:
+        series = self._series.get(labels)
+        return int(sum(series[:-1])) if series else 0
+
+    def render(self) -> List[str]:
+        with self._lock:
+            items = sorted((k, list(v)) for k, v in self._series.items())
+        lines = self.header()
+        for labels, series in items:
+            cumulative = 0.0
+            for bound, n in zip(self.buckets + (float("inf"),), series):
+                cumulative += n
+                le = 'le="+Inf"' if bound == float("inf") else f'le="{bound!r}"'
+                lines.append(f"{self.name}_bucket{_labels(self.labelnames, labels, le)} {_num(cumulative)}")
+            lines.append(f"{self.name}_sum{_labels(self.labelnames, labels)} {repr(series[-1])}")
+            lines.append(f"{self.name}_count{_labels(self.labelnames, labels)} {_num(cumulative)}")
+        return lines
+
+
+class GaugeMetric(_Metric):
+    """Value read from ``fn`` at render time: a number, or {labels: number}."""
+
+    kind = "gauge"
+
+    def __init__(self, name: str, help: str, fn: Callable[[], GaugeValue], labelnames: Labels = ()) -> None:
+        super().__init__(name, help, labelnames)
+        self.fn = fn
+
+    def render(self) -> List[str]:
+        try:
+            value = self.fn()
+        except Exception:  # a broken gauge must not break /metrics
+            return []
+        items = sorted(value.items()) if isinstance(value, dict) else [((), value)]
+        return self.header() + [
+            f"{self.name}{_labels(self.labelnames, k)} {_num(v)}" for k, v in items
+        ]
+
+
+class Registry:
+    def __init__(self) -> None:
+        self._metrics: Dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+
+    def _add(self, metric: _Metric, replace: bool = False) -> _Metric:
+        with self._lock:
+            existing = self._metrics.get(metric.name)
+            if existing is not None and not replace:
+                return existing
+            self._metrics[metric.name] = metric
+            return metric
+
+    def counter(self, name: str, help: str, labelnames: Labels = ()) -> CounterMetric:
+        return self._add(CounterMetric(name, help, labelnames))  # type: ignore[return-value]
+
+    def histogram(
+        self, name: str, help: str, labelnames: Labels = (), buckets: Tuple[float, ...] = LATENCY_BUCKETS
+    ) -> HistogramMetric:
+        return self._add(HistogramMetric(name, help, labelnames, buckets))  # type: ignore[return-value]
+
+    def gauge(
+        self, name: str, help: str, fn: Callable[[], GaugeValue], labelnames: Labels = ()
+    ) -> GaugeMetric:
+        """Gauges are bound to live objects, so registering a name again replaces it."""
+        return self._add(GaugeMetric(name, help, fn, labelnames), replace=True)  # type: ignore[return-value]
+
+    def render(self) -> str:
+        with self._lock:
+            metrics = [self._metrics[k] for k in sorted(self._metrics)]
+        lines: List[str] = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+counter = REGISTRY.counter
+histogram = REGISTRY.histogram
+gauge = REGISTRY.gauge
+render = REGISTRY.render
+
+
+class Profiler:
+    """Sampling profiler over ``sys._current_frames``.
+
+    While running, a thread records the stack of every other thread each
+    ``interval`` seconds; ``top`` returns the most frequent stacks in folded
+    form (``root;...;leaf``, as flame graph tools read). Costs nothing when
+    stopped; when running, one stack walk per thread per sample.
+    """
+
+    MIN_INTERVAL = 0.001  # shorter sampling would keep a core busy walking stacks
+
+    def __init__(self, interval: float = 0.01, max_depth: int = 48) -> None:
+        self.interval = interval
+        self.max_depth = max_depth
+        self.samples = 0
+        self._stacks: _Tally = _Tally()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.started_at: Optional[float] = None
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None
+
+    def start(self, interval: Optional[float] = None, reset: bool = True) -> None:
+        """``interval`` is clamped to at least ``MIN_INTERVAL``; a value that
+        is not a positive number raises ValueError."""
+        if interval is not None:
+            if not 0 < interval < float("inf"):
+                raise ValueError("interval must be a positive number of seconds")
+            interval = max(interval, self.MIN_INTERVAL)
+        with self._lock:
+            if self._thread is not None:
+                return
+            if interval is not None:
+                self.interval = interval
+            if reset:
+                self._stacks.clear()
+                self.samples = 0
+            self._stop.clear()
+            self.started_at = time.time()
+            self._thread = threading.Thread(target=self._run, name="wwa-profiler", daemon=True)
+            self._thread.start()
+
+    def stop(self) -> None:
+        with self._lock:
+            thread, self._thread = self._thread, None
+        if thread is not None:
+            self._stop.set()
+            thread.join(timeout=1)
+
+    def _sample(self, skip: int) -> None:
+        names = {t.ident: t.name for t in threading.enumerate()}
+        for ident, frame in sys._current_frames().items():
+            if ident == skip:
+                continue
+            parts: List[str] = []
+            f = frame
+            while f is not None and len(parts) < self.max_depth:
+                code = f.f_code
+                parts.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{f.f_lineno})")
+                f = f.f_back
+            parts.append(names.get(ident, str(ident)))
+            self._stacks[";".join(reversed(parts))] += 1
+        self.samples += 1
+
+    def _run(self) -> None:
+        me = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            with self._lock:
+                self._sample(me)
+
+    def top(self, n: int = 20) -> List[Tuple[str, int]]:
+        with self._lock:
+            return self._stacks.most_common(n)
+
+    def folded(self) -> str:
+        with self._lock:
+            return "".join(f"{stack} {count}\n" for stack, count in self._stacks.most_common())
+
+    def stats(self) -> dict:
+        return {
+            "running": self.running,
+            "interval_s": self.interval,
+            "samples": self.samples,
+            "stacks": len(self._stacks),
+        }
+
+
+profiler = Profiler()
@@ -2,14 +2,91 @@ from __future__ import annotations
 
 import threading
 import time
-import tkinter as tk
-from typing import Callable, Optional
+from typing import Callable, ClassVar, Dict, List, Optional, Tuple
 
+import metrics
 from config import LOOK_FAR_UNCLOSEABLE_S
 from storage import log_activity, log_lookfar
+from ui import ui
+
+
+Predicate = Callable[[], bool]
+
+SHOWN = metrics.counter("wwa_reminders_shown_total", "Reminder windows shown.", ("window",))
+REACTION_SECONDS = metrics.histogram(
+    "wwa_reminder_reaction_seconds", "Time from showing a reminder to closing it.", ("window",),
+    buckets=(1, 2, 5, 10, 20, 30, 60, 120, 300, 600, 1800),
+)
+
+
+class RevealDispatcher:
+    """Reveals minimized reminder windows once their predicate holds.
+
+    Windows register instead of running their own polling thread. ``check``
+    evaluates all pending predicates at once; it is called on presence
+    transitions and from the periodic tick.
+    """
+
+    def __init__(self) -> None:
+        self._pending: Dict[int, Tuple["_BaseWindow", Predicate]] = {}
+        self._lock = threading.Lock()
+
+    def register(self, window: "_BaseWindow", predicate: Predicate) -> None:
+        with self._lock:
+            self._pending[id(window)] = (window, predicate)
+
+    def unregister(self, window: "_BaseWindow") -> None:
+        with self._lock:
+            self._pending.pop(id(window), None)
+
+    def pending(self) -> int:
+        with self._lock:
+            return len(self._pending)
+
+    def check(self) -> int:
+        """Reveal every window whose predicate is true. Returns how many."""
+        with self._lock:
+            items = list(self._pending.items())
+        ready = []
+        for key, (window, predicate) in items:
+            try:
+                if predicate():
+                    ready.append((key, window))
+            except Exception:  # a broken predicate must not block the others
+                continue
+        with self._lock:
+            for key, _ in ready:
+                self._pending.pop(key, None)
+        for _, window in ready:
+            ui.submit(window.reveal)
+        return len(ready)
+
+
+dispatcher = RevealDispatcher()
 
 
 class _BaseWindow:
+    """Reminder window built once as a Toplevel of the UI root and reused.
+
+    Instances live on the UI thread. ``fire`` may be called from any thread:
+    it takes an idle window from the class pool, shows it, and returns it to
+    the pool when closed. At most ``pool_size`` windows of a type are built;
+    firing while all of them are still showing brings the longest-shown one
+    to the front again.
+    """
+
+    pool_size: ClassVar[int] = 1
+    _idle: ClassVar[List["_BaseWindow"]]
+    _open: ClassVar[List["_BaseWindow"]]
+    _built: ClassVar[int]
+    live: ClassVar[int] = 0
+
+    def __init_subclass__(cls, **kwargs: object) -> None:
+        super().__init_subclass__(**kwargs)
+        cls._idle = []
+        cls._open = []
+        cls._built = 0
+
     def __init__(
         self,
         title: str,
@@ -21,11 +98,16 @@ class _BaseWindow:
         uncloseable_seconds: int,
     ) -> None:
         self.reaction_start = time.time()
-        self.closed = False
+        self.closed = True
         self._uncloseable_seconds = max(0, int(uncloseable_seconds))
-        self.root = tk.Tk()
+        import tkinter as tk
+
+        self.root = tk.Toplevel(ui.root)
+        self.root.withdraw()
         self._init_root(title, w, h, bg)
         self._init_body(text, bg, text_fg)
+        _BaseWindow.live += 1
+        type(self)._built += 1
 
     def _init_root(self, title: str, w: int, h: int, bg: str) -> None:
         self.root.title(title)
@@ -35,19 +117,52 @@ class _BaseWindow:
         self.root.protocol("WM_DELETE_WINDOW", lambda: None)
 
     def _init_body(self, text: str, bg: str, text_fg: str) -> None:
+        import tkinter as tk
+
         tk.Label(
             self.root, text=text, bg=bg, fg=text_fg, font=("Arial", 48, "bold")
         ).pack(expand=True, fill=tk.BOTH)
-        state = tk.DISABLED if self._uncloseable_seconds > 0 else tk.NORMAL
-        self.btn = tk.Button(self.root, text="Close", state=state, command=self._close)
+        self.btn = tk.Button(self.root, text="Close", command=self._close)
         self.btn.pack(pady=12)
         tk.Button(self.root, text="Minimize", command=self._minimize).pack(pady=4)
 
+    @classmethod
+    def fire(
+        cls, minimized: bool = False, reveal_when: Optional[Predicate] = None
+    ) -> None:
+        """Show a pooled window of this type; safe from any thread."""
+        ui.submit(cls._fire_on_ui, minimized, reveal_when)
+
+    @classmethod
+    def _fire_on_ui(cls, minimized: bool, reveal_when: Optional[Predicate]) -> None:
+        if cls._idle:
+            window = cls._idle.pop()
+        elif cls._built < cls.pool_size:
+            window = cls()
+        else:
+            window = cls._open[0]
+        window.show(minimized=minimized, reveal_when=reveal_when)
+        SHOWN.inc(cls.__name__)
+
+    @classmethod
+    def showing(cls) -> int:
+        """Windows of this type shown (possibly minimized) and not yet closed."""
+        return len(cls._open)
+
     def _close(self) -> None:
         if self.closed:
             return
         self.closed = True
-        self.root.destroy()
+        dispatcher.unregister(self)
+        self.root.withdraw()
+        type(self)._open.remove(self)
+        type(self)._idle.append(self)
+        reaction = time.time() - self.reaction_start
+        REACTION_SECONDS.observe(reaction, type(self).__name__)
+        self.on_closed(reaction)
+
+    def on_closed(self, reaction: float) -> None:
+        """Hook for subclasses; runs on the UI thread."""
 
     def _minimize(self) -> None:
         self.root.iconify()
@@ -57,34 +172,32 @@ class _BaseWindow:
 
     def _delayed_enable(self) -> None:
         if self._uncloseable_seconds <= 0:
+            self.btn.config(state="normal")
             return
+        self.btn.config(state="disabled")
         self.root.after(
-            self._uncloseable_seconds * 1000, lambda: self.btn.config(state=tk.NORMAL)
+            self._uncloseable_seconds * 1000, lambda: self.btn.config(state="normal")
         )
 
-    def show(
-        self, minimized: bool = False, reveal_when: Optional[Callable[[], bool]] = None
-    ) -> threading.Thread:
-        t = threading.Thread(target=self._run_mainloop, daemon=True)
-        t.start()
+    def show(self, minimized: bool = False, reveal_when: Optional[Predicate] = None) -> None:
+        """Show this window. Must run on the UI thread; use ``fire`` elsewhere.
+
+        Showing a window that is already open raises it again; its reaction
+        time still counts from the first show.
+        """
+        if self.closed:
+            self.closed = False
+            self.reaction_start = time.time()
+            type(self)._open.append(self)
+            self._delayed_enable()
+        self.root.deiconify()
+        self.root.lift()
         if minimized:
-            threading.Timer(0.05, self._minimize).start()
+            self.root.after(50, self._minimize)
         if reveal_when is not None:
-            threading.Thread(
-                target=self._watch_and_reveal, args=(reveal_when,), daemon=True
-            ).start()
-        return t
-
-    def _watch_and_reveal(self, reveal_when: Callable[[], bool]) -> None:
-        while True:
-            time.sleep(2)
-            if reveal_when():
-                self.root.after(0, self.reveal)
-                return
-
-    def _run_mainloop(self) -> None:
-        self._delayed_enable()
-        self.root.mainloop()
+            dispatcher.register(self, reveal_when)
+        else:
+            dispatcher.unregister(self)
 
 
 class LookFarWindow(_BaseWindow):
@@ -99,15 +212,8 @@ class LookFarWindow(_BaseWindow):
             uncloseable_seconds=LOOK_FAR_UNCLOSEABLE_S,
         )
 
-    def show_and_log(self, minimized: bool = False, reveal_when=None) -> None:
-        t = super().show(minimized=minimized, reveal_when=reveal_when)
-
-        def waiter() -> None:
-            t.join()
-            reaction = time.time() - self.reaction_start
-            log_lookfar(reaction_seconds=reaction, comment="closed/minimized")
-
-        threading.Thread(target=waiter, daemon=True).start()
+    def on_closed(self, reaction: float) -> None:
+        log_lookfar(reaction_seconds=reaction, comment="closed/minimized")
 
 
 class StandUpWindow(_BaseWindow):
@@ -122,18 +228,49 @@ class StandUpWindow(_BaseWindow):
             uncloseable_seconds=0,  # can be closed immediately
         )
 
-    def show_and_log(self, minimized: bool = False, reveal_when=None) -> None:
-        t = super().show(minimized=minimized, reveal_when=reveal_when)
-
-        def waiter() -> None:
-            t.join()
-            reaction = time.time() - self.reaction_start
-            log_activity(
-                "standup_close",
-                details=f"reaction={reaction:.1f}s",
-                work_min=0,
-                break_min=0,
-                absence_min=0,
-            )
-
-        threading.Thread(target=waiter, daemon=True).start()
+    def on_closed(self, reaction: float) -> None:
+        log_activity(
+            "standup_close",
+            details=f"reaction={reaction:.1f}s",
+            work_min=None,
+            break_min=None,
+            absence_min=None,
+        )
+
+
+def window_stats() -> dict:
+    """Reminder windows ever built and those idle in the pools."""
+    return {
+        "live": _BaseWindow.live,
+        "idle": sum(len(cls._idle) for cls in (LookFarWindow, StandUpWindow)),
+        "ui_queue": ui.pending(),
+    }
+
+
+metrics.gauge(
+    "wwa_reminder_windows", "Reminder windows built, idle in the pools and showing.",
+    lambda: {
+        **{(cls.__name__, "showing"): cls.showing() for cls in (LookFarWindow, StandUpWindow)},
+        **{(cls.__name__, "idle"): len(cls._idle) for cls in (LookFarWindow, StandUpWindow)},
+    },
+    ("window", "state"),
+)
+metrics.gauge("wwa_ui_queue", "Calls waiting for the Tk UI thread.", ui.pending)
+
+
+def ask_yes_no(
+    title: str, message: str, on_answer: Callable[[bool], None], default: bool = False
+) -> None:
+    """Modal yes/no dialog on the UI thread; ``on_answer`` runs there too.
+
+    Without a usable Tk the question is answered ``default`` right away.
+    """
+    if not ui.available():
+        on_answer(default)
+        return
+    from tkinter import messagebox
+
+    def _ask() -> None:
+        on_answer(bool(messagebox.askyesno(title=title, message=message, parent=ui.root)))
+
+    ui.submit(_ask)
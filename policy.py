@@ -0,0 +1,232 @@
+"""Reminder policy loaded from a rules file.
+
+The file (JSON, or TOML on Python 3.11+) lists reminders and the break
+accounting setting::
+
+    {
+      "break_free_min": 30,
+      "reminders": [
+        {"name": "lookfar", "every_min": 20, "clock": "work",
+         "when": "not youtube", "in_call": "minimize", "escalate_after": 3},
+        {"name": "standup", "every_min": 60, "when": "not in_break",
+         "reset_after_break_min": 2}
+      ]
+    }
+
+``when`` is a Python-like boolean expression over the names in ``FACTS``;
+it is parsed once at load time into a lambda over a facts dict, so unknown
+names and unsupported syntax are reported when the file is loaded, not
+when a reminder is due. Without a file the policy comes from the
+``LOOK_FAR_*``/``STAND_UP_*`` settings in config.py.
+"""
+
+from __future__ import annotations
+
+import ast
+import json
+import os
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Callable, Dict, Optional, Tuple
+
+from config import (
+    BREAK_FREE_MIN,
+    LOOK_FAR_EVERY_MIN,
+    STAND_UP_EVERY_MIN,
+    STANDUP_RESET_IDLE_MIN,
+)
+
+Facts = Dict[str, object]
+Predicate = Callable[[Facts], bool]
+
+# Names a ``when`` expression may use; the agent computes them once per check
+FACTS = (
+    "working",  # started and not ended today
+    "in_break",
+    "in_call",  # Teams presence, see presence.py
+    "youtube",
+    "work_min",  # effective work today
+    "break_min",
+    "absence_min",
+    "hour",  # local time as a float, 13.5 is 13:30
+    "weekday",  # 0 is Monday
+    "ignored",  # consecutive times this reminder fired while still showing
+    "fired_today",
+)
+WINDOWS = ("lookfar", "standup")
+CLOCKS = ("wall", "work")
+IN_CALL = ("minimize", "defer", "show")
+
+_NODES = (
+    ast.Expression, ast.BoolOp, ast.And, ast.Or, ast.UnaryOp, ast.Not, ast.USub,
+    ast.Compare, ast.Eq, ast.NotEq, ast.Lt, ast.LtE, ast.Gt, ast.GtE, ast.In, ast.NotIn,
+    ast.BinOp, ast.Add, ast.Sub, ast.Mult, ast.Div, ast.Mod,
+    ast.Name, ast.Load, ast.Constant, ast.Tuple, ast.IfExp,
+)
+
+
+class PolicyError(ValueError):
+    pass
+
+
+class _Facts(ast.NodeTransformer):
+    def visit_Name(self, node: ast.Name) -> ast.AST:
+        return ast.copy_location(
+            ast.Subscript(ast.Name("f", ast.Load()), ast.Constant(node.id), ast.Load()), node
+        )
+
+
+def compile_when(source: str) -> Predicate:
+    """``"work_min > 60 and not in_call"`` -> ``lambda f: f["work_min"] > 60 and not f["in_call"]``.
+
+    An expression that fails on the facts at hand (``work_min / absence_min``
+    with no absence yet, a string compared to a number) evaluates to False.
+    """
+    try:
+        tree = ast.parse(source.strip() or "True", mode="eval")
+    except SyntaxError as exc:
+        raise PolicyError(f"invalid expression {source!r}: {exc.msg}") from None
+    for node in ast.walk(tree):
+        if not isinstance(node, _NODES):
+            raise PolicyError(f"{type(node).__name__} not allowed in {source!r}")
+        if isinstance(node, ast.Name) and node.id not in FACTS:
+            raise PolicyError(f"unknown name {node.id!r} in {source!r} (have: {', '.join(FACTS)})")
+    body = _Facts().visit(tree).body
+    fn = ast.Expression(ast.Lambda(
+        ast.arguments(posonlyargs=[], args=[ast.arg("f")], kwonlyargs=[], kw_defaults=[], defaults=[]),
+        body,
+    ))
+    ast.fix_missing_locations(fn)
+    expr = eval(compile(fn, f"<when {source}>", "eval"), {"__builtins__": {}})
+
+    def check(facts: Facts) -> bool:
+        try:
+            return bool(expr(facts))
+        except (ArithmeticError, TypeError):
+            return False
+
+    return check
+
+
+@dataclass(frozen=True)
+class ReminderRule:
+    """One reminder: due ``every_min`` minutes after its anchor (the last
+    time it was shown, the start of work or a long enough break), shown only
+    if ``when`` holds then."""
+
+    name: str
+    every_min: float
+    window: str = "lookfar"
+    clock: str = "wall"  # "work": minutes of effective work, not of wall time
+    when: str = "True"
+    in_call: str = "minimize"  # or "defer" (wait for the call to end) or "show"
+    at_start: bool = False  # also due right when work starts
+    reset_after_break_min: Optional[float] = None
+    escalate_after: Optional[int] = None  # ignored this often -> shown even in a call
+    recheck_min: float = 1.0  # retry interval while ``when`` is false
+    check: Predicate = field(default=lambda f: True, compare=False, repr=False)
+
+    @classmethod
+    def from_dict(cls, d: dict) -> "ReminderRule":
+        d = dict(d)
+        name = str(d.pop("name", "") or "")
+        if not name:
+            raise PolicyError("reminder without a name")
+        d.setdefault("window", name if name in WINDOWS else "lookfar")
+        try:
+            rule = cls(name=name, **d)
+        except TypeError as exc:
+            raise PolicyError(f"{name}: {exc}") from None
+        for key, allowed in (("window", WINDOWS), ("clock", CLOCKS), ("in_call", IN_CALL)):
+            if getattr(rule, key) not in allowed:
+                raise PolicyError(f"{name}: {key} must be one of {', '.join(allowed)}")
+        if not rule.every_min > 0 or not rule.recheck_min > 0:
+            raise PolicyError(f"{name}: every_min and recheck_min must be positive")
+        try:
+            check = compile_when(rule.when)
+        except PolicyError as exc:
+            raise PolicyError(f"{name}: {exc}") from None
+        object.__setattr__(rule, "check", check)
+        return rule
+
+
+@dataclass(frozen=True)
+class Policy:
+    reminders: Tuple[ReminderRule, ...]
+    break_free_min: float = BREAK_FREE_MIN
+
+    @classmethod
+    def from_dict(cls, d: dict) -> "Policy":
+        rules = tuple(ReminderRule.from_dict(r) for r in d.get("reminders", ()))
+        names = [r.name for r in rules]
+        if len(set(names)) != len(names):
+            raise PolicyError("reminder names must be unique")
+        return cls(reminders=rules, break_free_min=float(d.get("break_free_min", BREAK_FREE_MIN)))
+
+
+def default_policy() -> Policy:
+    """The built-in reminders, configured by the environment."""
+    return Policy.from_dict({
+        "break_free_min": BREAK_FREE_MIN,
+        "reminders": [
+            {"name": "lookfar", "every_min": LOOK_FAR_EVERY_MIN, "at_start": True},
+            {"name": "standup", "every_min": STAND_UP_EVERY_MIN, "when": "not in_break",
+             "reset_after_break_min": STANDUP_RESET_IDLE_MIN},
+        ],
+    })
+
+
+def load(path: Path) -> Policy:
+    text = path.read_text(encoding="utf-8")
+    if path.suffix == ".toml":
+        import tomllib
+
+        try:
+            data = tomllib.loads(text)
+        except tomllib.TOMLDecodeError as exc:
+            raise PolicyError(f"{path.name}: {exc}") from None
+    else:
+        try:
+            data = json.loads(text)
+        except json.JSONDecodeError as exc:
+            raise PolicyError(f"{path.name}: {exc}") from None
+    if not isinstance(data, dict):
+        raise PolicyError(f"{path.name}: expected an object")
+    return Policy.from_dict(data)
+
+
+class PolicyFile:
+    """The policy in ``path``, reloaded when the file changes.
+
+    ``reload`` only stats the file unless it changed. A file that fails to
+    load keeps the previous policy in effect and sets ``error``; deleting
+    the file returns to the default policy.
+    """
+
+    def __init__(self, path: Path) -> None:
+        self.path = path
+        self.policy = default_policy()
+        self.error: Optional[str] = None
+        self.loads = 0
+        self._stamp: Optional[Tuple[int, int]] = None
+        self.reload()
+
+    def reload(self) -> bool:
+        """Returns True if a different policy is now in effect."""
+        try:
+            st = os.stat(self.path)
+            stamp: Optional[Tuple[int, int]] = (st.st_mtime_ns, st.st_size)
+        except FileNotFoundError:
+            stamp = None
+        if stamp == self._stamp:
+            return False
+        self._stamp = stamp
+        try:
+            policy = default_policy() if stamp is None else load(self.path)
+        except (OSError, PolicyError) as exc:
+            self.error = str(exc)
+            return False
+        self.error = None
+        self.loads += 1
+        changed, self.policy = policy != self.policy, policy
+        return changed
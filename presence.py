@@ -1,31 +1,218 @@
 from __future__ import annotations
 
+import threading
+import time
 from json import JSONDecodeError
+from typing import TYPE_CHECKING, Callable, List, Optional
 
-import requests
+if TYPE_CHECKING:
+    import requests
 
-from config import GRAPH_PRESENCE_URL, GRAPH_TOKEN
+import metrics
+from config import GRAPH_PRESENCE_URL, GRAPH_TOKEN, PRESENCE_POLL_S, PRESENCE_TTL_S
 
+CALL_ACTIVITIES = {"InACall", "InAMeeting"}
 
+Listener = Callable[[bool], None]
+
+FETCH_SECONDS = metrics.histogram(
+    "wwa_presence_fetch_seconds", "Graph presence request latency.", ("outcome",)
+)
+CHECK_SECONDS = metrics.histogram(
+    "wwa_presence_check_seconds", "Latency of in_call_via_graph (a cached read)."
+)
+
+
+class PresenceService:
+    """Single background poller of Microsoft Graph presence.
+
+    Keeps one pooled ``requests.Session``, caches the latest activity for
+    ``ttl`` seconds and backs off exponentially on 429/5xx (honouring
+    ``Retry-After``) and on a rejected token (401/403), which also drops the
+    cached activity. Callers read the cached value with ``in_call()`` or
+    ``subscribe`` to in-call/out-of-call transitions; a call whose cached
+    activity expires ends with a transition too.
+    """
+
+    def __init__(
+        self,
+        url: str,
+        token: Optional[str],
+        interval: float = 30.0,
+        ttl: float = 120.0,
+        timeout: float = 3.0,
+        max_backoff: float = 600.0,
+        session: Optional[requests.Session] = None,
+    ) -> None:
+        self.url = url
+        self.token = token
+        self.interval = interval
+        self.ttl = ttl
+        self.timeout = timeout
+        self.max_backoff = max_backoff
+        self._session = session
+        self._activity: Optional[str] = None
+        self._fetched_at: Optional[float] = None
+        self._backoff = 0.0
+        self._in_call = False
+        self._listeners: List[Listener] = []
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.polls = 0
+        self.failures = 0
+
+    # Public API
+    def start(self) -> None:
+        if self._thread is not None or not self.token:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="wwa-presence", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self.timeout + 1)
+            self._thread = None
+
+    def refresh(self) -> None:
+        """Poll as soon as possible instead of waiting for the interval."""
+        self._wake.set()
+
+    def activity(self) -> Optional[str]:
+        """Latest Graph activity, or None if unknown or older than the TTL."""
+        with self._lock:
+            if self._fetched_at is None or time.monotonic() - self._fetched_at > self.ttl:
+                return None
+            return self._activity
+
+    def in_call(self) -> bool:
+        return self.activity() in CALL_ACTIVITIES
+
+    def subscribe(self, listener: Listener) -> Callable[[], None]:
+        """Call ``listener(in_call)`` on every transition. Returns unsubscribe."""
+        with self._lock:
+            self._listeners.append(listener)
+
+        def unsubscribe() -> None:
+            with self._lock:
+                if listener in self._listeners:
+                    self._listeners.remove(listener)
+
+        return unsubscribe
+
+    # Internals
+    def _fetch(self) -> Optional[float]:
+        """One request. Returns a delay override (backoff) or None."""
+        import requests  # deferred: ~100 ms, only needed once polling starts
+
+        if self._session is None:
+            self._session = requests.Session()
+        self.polls += 1
+        t0 = time.perf_counter()
+        try:
+            r = self._session.get(
+                self.url,
+                headers={"Authorization": f"Bearer {self.token}"},
+                timeout=self.timeout,
+            )
+        except requests.RequestException:
+            FETCH_SECONDS.observe(time.perf_counter() - t0, "error")
+            self.failures += 1
+            return self._next_backoff(None)
+        FETCH_SECONDS.observe(time.perf_counter() - t0, str(r.status_code))
+        if r.status_code == 429 or r.status_code >= 500:
+            self.failures += 1
+            return self._next_backoff(r.headers.get("Retry-After"))
+        if r.status_code in (401, 403):  # bad or expired token: presence unknown
+            self.failures += 1
+            self._update(None)
+            return self._next_backoff(None)
+        self._backoff = 0.0
+        activity = ""
+        if r.status_code == 200:
+            try:
+                activity = str(r.json().get("activity", ""))
+            except (JSONDecodeError, ValueError, AttributeError):
+                activity = ""
+        self._update(activity)
+        return None
+
+    def _next_backoff(self, retry_after: Optional[str]) -> float:
+        self._backoff = min(self.max_backoff, max(self.interval, self._backoff * 2))
+        try:
+            return max(self._backoff, float(retry_after)) if retry_after else self._backoff
+        except ValueError:
+            return self._backoff
+
+    def _update(self, activity: Optional[str]) -> None:
+        """Cache ``activity`` (None: unknown) and notify on a transition."""
+        with self._lock:
+            self._activity = activity
+            self._fetched_at = None if activity is None else time.monotonic()
+            listeners, in_call = self._transition(), self._in_call
+        self._notify(listeners, in_call)
+
+    def _expire(self) -> Optional[float]:
+        """End a call whose cached activity passed the TTL; otherwise the
+        seconds until it will (None if there is no call to expire)."""
+        with self._lock:
+            if not self._in_call:
+                return None
+            left = (self._fetched_at or 0.0) + self.ttl - time.monotonic()
+            if left > 0:
+                return left
+            self._activity = self._fetched_at = None
+            listeners, in_call = self._transition(), self._in_call
+        self._notify(listeners, in_call)
+        return None
+
+    def _transition(self) -> List[Listener]:
+        """Listeners to notify if the in-call state changed. Caller holds the lock."""
+        in_call = self._activity in CALL_ACTIVITIES
+        if in_call == self._in_call:
+            return []
+        self._in_call = in_call
+        return list(self._listeners)
+
+    def _notify(self, listeners: List[Listener], in_call: bool) -> None:
+        for listener in listeners:
+            try:
+                listener(in_call)
+            except Exception:  # a faulty subscriber must not stop polling
+                pass
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            delay = self._fetch()
+            due = time.monotonic() + (self.interval if delay is None else delay)
+            while not self._stop.is_set():
+                expires = self._expire()
+                left = due - time.monotonic()
+                if left <= 0 or self._wake.wait(left if expires is None else min(left, expires)):
+                    break
+            self._wake.clear()
+
+
+service = PresenceService(
+    GRAPH_PRESENCE_URL, GRAPH_TOKEN, interval=PRESENCE_POLL_S, ttl=PRESENCE_TTL_S
+)
+metrics.gauge(
+    "wwa_presence", "Presence polls, failures and whether a call is on.",
+    lambda: {("polls",): service.polls, ("failures",): service.failures,
+             ("in_call",): float(service.in_call())},
+    ("stat",),
+)
+
+
+@CHECK_SECONDS.timed()
 def in_call_via_graph() -> bool:
     """
     True if Microsoft Graph presence indicates a call or meeting.
     Requires GRAPH_TOKEN env var with Presence.Read permission.
+    Reads the cached value of the background ``service``; never blocks.
     """
-    token = GRAPH_TOKEN
-    if not token:
-        return False
-    try:
-        r = requests.get(
-            GRAPH_PRESENCE_URL,
-            headers={"Authorization": f"Bearer {token}"},
-            timeout=3,
-        )
-        if r.status_code != 200:
-            return False
-        data = r.json()
-    except (requests.RequestException, JSONDecodeError):
-        return False
-
-    activity = str(data.get("activity", ""))
-    return activity in {"InACall", "InAMeeting"}
+    return service.in_call()
@@ -0,0 +1,236 @@
+"""Deadline timers on a monotonic clock.
+
+Every job (a reminder type, the activity tick, maintenance) is a named
+``Timer`` with at most one pending deadline in a heap. Owners move a
+deadline whenever the state it depends on changes (``at``/``after``) instead
+of polling for it. Recurring timers keep a fixed phase: the next deadline is
+the previous one plus the interval, not "now plus the interval", so the
+time a job takes does not shift later runs. A recurring timer that fell
+behind by several intervals runs once and counts the runs it skipped; a
+timer that comes due while its previous run is still going is skipped too.
+"""
+
+from __future__ import annotations
+
+import heapq
+import threading
+import time
+import traceback
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Deque, Dict, List, Optional, Tuple
+
+import metrics
+
+JOB_SECONDS = metrics.histogram("wwa_job_seconds", "Run time of scheduled jobs.", ("job",))
+JOB_LATENESS = metrics.histogram(
+    "wwa_job_lateness_seconds", "Time from a job's deadline to its start.", ("job",)
+)
+
+Clock = Callable[[], float]
+
+
+class Timer:
+    def __init__(
+        self, name: str, fn: Callable[[], object], interval: Optional[float], blocking: bool
+    ) -> None:
+        self.name = name
+        self.fn = fn
+        self.interval = interval
+        self.blocking = blocking
+        self.deadline: Optional[float] = None
+        self.seq = 0
+        self.running = False
+        self.fired = 0
+        self.skipped = 0
+        self.errors = 0
+        self.lateness: Deque[float] = deque(maxlen=256)
+
+    def stats(self, now: float) -> dict:
+        late = sorted(self.lateness)
+        return {
+            "due_in_s": None if self.deadline is None else round(self.deadline - now, 3),
+            "fired": self.fired,
+            "skipped": self.skipped,
+            "errors": self.errors,
+            "late_p50_ms": round(late[len(late) // 2] * 1000, 2) if late else None,
+            "late_p99_ms": round(late[int(0.99 * (len(late) - 1))] * 1000, 2) if late else None,
+            "late_max_ms": round(late[-1] * 1000, 2) if late else None,
+        }
+
+
+class Scheduler:
+    """Heap of named timers served by one thread.
+
+    Callbacks run on the scheduler thread, except ``blocking`` ones (disk,
+    network) which go to a small pool so they cannot delay other timers.
+    Lateness (fire time minus deadline) is kept per timer for ``stats()``.
+    With ``workers=0`` blocking callbacks run inline too, and without
+    ``start()`` nothing fires except through ``run_due`` (simulation.py).
+    """
+
+    def __init__(self, clock: Clock = time.monotonic, workers: int = 2) -> None:
+        self.clock = clock
+        self._timers: Dict[str, Timer] = {}
+        self._heap: List[Tuple[float, int, str]] = []
+        self._seq = 0
+        self._cond = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+        self._stop = False
+        self._workers = workers
+        self._pool: Optional[ThreadPoolExecutor] = None
+
+    # Registration and deadlines
+    def add(
+        self,
+        name: str,
+        fn: Callable[[], object],
+        interval: Optional[float] = None,
+        blocking: bool = False,
+        first: Optional[float] = None,
+    ) -> None:
+        """Register ``fn``. Recurring with ``interval`` seconds; the first run
+        is ``first`` seconds from now (default: one interval). One-shot
+        timers stay idle until ``at``/``after``."""
+        with self._cond:
+            self._timers[name] = Timer(name, fn, interval, blocking)
+        if first is not None or interval is not None:
+            self.after(name, interval if first is None else first)
+
+    def at(self, name: str, deadline: Optional[float]) -> None:
+        """Set (or with None, clear) the deadline on this scheduler's clock."""
+        with self._cond:
+            timer = self._timers[name]
+            self._seq += 1
+            timer.seq = self._seq
+            timer.deadline = deadline
+            if deadline is not None:
+                heapq.heappush(self._heap, (deadline, self._seq, name))
+                if len(self._heap) > 64 + 4 * len(self._timers):
+                    self._compact()
+            self._cond.notify()
+
+    def after(self, name: str, delay: float) -> None:
+        self.at(name, self.clock() + max(0.0, delay))
+
+    def cancel(self, name: str) -> None:
+        self.at(name, None)
+
+    def remove(self, name: str) -> None:
+        with self._cond:
+            self._timers.pop(name, None)
+
+    def due_in(self, name: str) -> Optional[float]:
+        with self._cond:
+            deadline = self._timers[name].deadline
+        return None if deadline is None else deadline - self.clock()
+
+    def _compact(self) -> None:
+        """Drop superseded heap entries. Caller holds the lock."""
+        self._heap = [e for e in self._heap if self._live(e[1], e[2])]
+        heapq.heapify(self._heap)
+
+    def _live(self, seq: int, name: str) -> bool:
+        timer = self._timers.get(name)
+        return timer is not None and timer.seq == seq
+
+    # Running
+    def start(self) -> None:
+        with self._cond:
+            if self._thread is not None:
+                return
+            self._stop = False
+            self._thread = threading.Thread(target=self._run, name="wwa-scheduler", daemon=True)
+            self._thread.start()
+
+    def stop(self, timeout: float = 5.0) -> None:
+        with self._cond:
+            self._stop = True
+            self._cond.notify()
+            thread, self._thread = self._thread, None
+        if thread is not None:
+            thread.join(timeout)
+        if self._pool is not None:
+            self._pool.shutdown(wait=False)
+            self._pool = None
+
+    def _next_wait(self) -> Optional[float]:
+        """Seconds until the earliest live deadline. Caller holds the lock."""
+        while self._heap:
+            deadline, seq, name = self._heap[0]
+            if not self._live(seq, name):
+                heapq.heappop(self._heap)
+                continue
+            return deadline - self.clock()
+        return None
+
+    def next_deadline(self) -> Optional[float]:
+        """The earliest pending deadline on this scheduler's clock."""
+        with self._cond:
+            wait = self._next_wait()
+            return None if wait is None else self._heap[0][0]
+
+    def run_due(self) -> int:
+        """Fire every timer whose deadline has passed; returns how many."""
+        due: List[Timer] = []
+        with self._cond:
+            now = self.clock()
+            while self._heap and self._heap[0][0] <= now:
+                deadline, seq, name = heapq.heappop(self._heap)
+                if not self._live(seq, name):
+                    continue
+                timer = self._timers[name]
+                if timer.interval:
+                    behind = int((now - deadline) // timer.interval)
+                    timer.skipped += behind
+                    self._seq += 1
+                    timer.seq = self._seq
+                    timer.deadline = deadline + (behind + 1) * timer.interval
+                    heapq.heappush(self._heap, (timer.deadline, self._seq, name))
+                else:
+                    timer.deadline = None
+                if timer.running:  # still busy with the previous run (on the pool)
+                    timer.skipped += 1
+                    continue
+                timer.lateness.append(now - deadline)
+                JOB_LATENESS.observe(now - deadline, name)
+                timer.fired += 1
+                timer.running = True
+                due.append(timer)
+        for timer in due:
+            if timer.blocking and self._workers:
+                if self._pool is None:
+                    self._pool = ThreadPoolExecutor(self._workers, thread_name_prefix="wwa-jobs")
+                self._pool.submit(self._call, timer)
+            else:
+                self._call(timer)
+        return len(due)
+
+    def _call(self, timer: Timer) -> None:
+        t0 = time.perf_counter()
+        try:
+            timer.fn()
+        except Exception:  # a failing job must not stop the scheduler
+            timer.errors += 1
+            traceback.print_exc()
+        finally:
+            JOB_SECONDS.observe(time.perf_counter() - t0, timer.name)
+            with self._cond:
+                timer.running = False
+
+    def _run(self) -> None:
+        while True:
+            with self._cond:
+                while not self._stop:
+                    wait = self._next_wait()
+                    if wait is not None and wait <= 0:
+                        break
+                    self._cond.wait(wait)
+                if self._stop:
+                    return
+            self.run_due()
+
+    def stats(self) -> dict:
+        with self._cond:
+            now = self.clock()
+            return {name: t.stats(now) for name, t in self._timers.items()}
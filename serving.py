@@ -0,0 +1,33 @@
+from __future__ import annotations
+
+from datetime import date, timedelta
+from typing import Tuple
+
+from flask import Flask, request
+
+
+def serve(app: Flask, mode: str, host: str, port: int, threads: int) -> None:
+    """Run ``app`` with waitress (production) or the Flask dev server."""
+    if mode in ("auto", "waitress"):
+        try:
+            import waitress
+        except ImportError:
+            if mode == "waitress":
+                raise
+        else:
+            # send_bytes=1: flush every chunk so /stream events go out immediately
+            waitress.serve(app, host=host, port=port, threads=threads, send_bytes=1)
+            return
+    app.run(host=host, port=port, threaded=True)
+
+
+def date_range(default_days: int = 30) -> Tuple[date, date]:
+    """``from``/``to`` query args (ISO dates); defaults to the last N days.
+
+    Raises ValueError on malformed dates.
+    """
+    end = date.fromisoformat(request.args.get("to") or date.today().isoformat())
+    start = date.fromisoformat(
+        request.args.get("from") or (end - timedelta(days=default_days - 1)).isoformat()
+    )
+    return start, end
@@ -0,0 +1,146 @@
+"""Session lock/unlock events between the OS monitor and the tracker.
+
+The monitor's window procedure calls ``lock``/``unlock``, which only take a
+``Stamp`` and enqueue it, so the message pump never waits on the tracker or
+the disk. A consumer thread turns the queue into tracker transitions: a
+change of session state is committed only once it has lasted
+``debounce_s``; a lock undone by an unlock within that time (or the other
+way round), as RDP reconnects and fast user switching produce, cancels out.
+Repeated events for the state already in effect are dropped. Committed
+events keep their original stamps, so the delay does not shift any time.
+"""
+
+from __future__ import annotations
+
+import queue
+import threading
+import traceback
+from collections import Counter
+from typing import Callable, Optional, Tuple
+
+import metrics
+from clock import EventClock, Stamp, When
+
+SESSION_EVENTS = metrics.counter(
+    "wwa_session_events_total",
+    "Session lock/unlock events received (raw) and applied to the tracker.",
+    ("event", "stage"),
+)
+
+Handler = Callable[[When], None]
+Item = Tuple[str, Stamp]
+
+
+class SessionPipeline:
+    """Debounces ``lock``/``unlock`` into ``on_lock(at)``/``on_unlock(at)``.
+
+    ``accept`` and ``expire`` hold the logic and take explicit times; the
+    thread started by ``start`` only feeds them from the queue.
+    """
+
+    def __init__(
+        self,
+        on_lock: Handler,
+        on_unlock: Handler,
+        clock: Optional[EventClock] = None,
+        debounce_s: float = 2.0,
+    ) -> None:
+        self.handlers = {"lock": on_lock, "unlock": on_unlock}
+        self.clock = clock or EventClock()
+        self.debounce_s = debounce_s
+        self.state: Optional[str] = None  # last applied
+        self.pending: Optional[Item] = None
+        self.raw: Counter = Counter()
+        self.applied: Counter = Counter()
+        self.flaps = 0  # lock/unlock pairs cancelled out
+        self.duplicates = 0
+        self.errors = 0
+        self._queue: "queue.Queue[Optional[Item]]" = queue.Queue()
+        self._thread: Optional[threading.Thread] = None
+
+    # Producer side: safe from any thread, never blocks
+    def lock(self) -> None:
+        self._queue.put(("lock", self.clock.stamp()))
+
+    def unlock(self) -> None:
+        self._queue.put(("unlock", self.clock.stamp()))
+
+    # Consumer side
+    def accept(self, kind: str, stamp: Stamp) -> None:
+        self.raw[kind] += 1
+        SESSION_EVENTS.inc(kind, "raw")
+        if self.pending is not None:
+            pending_kind, pending_stamp = self.pending
+            if kind == pending_kind:
+                self.duplicates += 1
+                return
+            if stamp.mono - pending_stamp.mono < self.debounce_s:
+                self.pending = None
+                self.flaps += 1
+                return
+            self._apply()
+        if kind == self.state:
+            self.duplicates += 1
+            return
+        self.pending = (kind, stamp)
+
+    def expire(self, mono: float) -> Optional[float]:
+        """Apply the pending event if it has lasted; seconds until it will."""
+        if self.pending is None:
+            return None
+        left = self.pending[1].mono + self.debounce_s - mono
+        if left > 0:
+            return left
+        self._apply()
+        return None
+
+    def _apply(self) -> None:
+        kind, stamp = self.pending  # type: ignore[misc]
+        self.pending = None
+        self.state = kind
+        self.applied[kind] += 1
+        SESSION_EVENTS.inc(kind, "applied")
+        try:
+            self.handlers[kind](stamp)
+        except Exception:  # keep consuming; the next event may succeed
+            self.errors += 1
+            traceback.print_exc()
+
+    def _run(self) -> None:
+        wait: Optional[float] = None
+        while True:
+            try:
+                item = self._queue.get(timeout=wait)
+            except queue.Empty:
+                pass
+            else:
+                if item is None:
+                    if self.pending is not None:
+                        self._apply()  # it happened; do not lose it on shutdown
+                    return
+                self.accept(*item)
+            wait = self.expire(self.clock.stamp().mono)
+
+    def start(self) -> None:
+        if self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._run, name="wwa-session", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 5.0) -> None:
+        thread, self._thread = self._thread, None
+        if thread is not None:
+            self._queue.put(None)
+            thread.join(timeout)
+
+    def stats(self) -> dict:
+        return {
+            "raw": dict(self.raw),
+            "applied": dict(self.applied),
+            "flaps": self.flaps,
+            "duplicates": self.duplicates,
+            "errors": self.errors,
+            "pending": self.pending[0] if self.pending else None,
+            "queued": self._queue.qsize(),
+            "state": self.state,
+        }
@@ -0,0 +1,298 @@
+"""Deterministic simulation of the agent on a virtual clock.
+
+``Simulation`` runs a real ``Agent`` (tracker, reminders, storage) with a
+``VirtualClock`` in place of the wall and monotonic clocks. Nothing runs on
+background threads: the loop jumps from one timer deadline or trace step to
+the next and fires timers through ``Scheduler.run_due``; lock and unlock go
+through the agent's ``SessionPipeline`` without its thread. A simulated
+work day takes a fraction of a second. Input activity, lock/unlock, Teams
+presence and page events come from a trace (``workday`` generates one);
+reminder windows and the end-of-day question are headless stand-ins that
+record what was shown. Rows go to the journals under ``DESKTOP_DIR``, so
+point it at a scratch directory::
+
+    DESKTOP_DIR=/tmp/wwa-sim python simulation.py --days 30
+
+The XLSX export timer is removed unless ``export=True``; its cost is
+measured separately. ``python bench.py simulation memory`` runs a
+simulated month.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+from collections import deque
+from datetime import date, datetime, timedelta
+from typing import Callable, Deque, Iterable, List, NamedTuple, Optional, Tuple
+
+from clock import EventClock
+from scheduler import Scheduler
+
+Interval = Tuple[datetime, datetime]
+
+
+class Step(NamedTuple):
+    at: datetime
+    kind: str  # "input" (value: active seconds), "lock", "unlock", "call" (value: bool) or an /event type
+    value: object = None
+
+
+class VirtualClock:
+    """Wall and monotonic time that only move when told to."""
+
+    def __init__(self, start: datetime) -> None:
+        self.start = start
+        self._t = 0.0
+
+    def mono(self) -> float:
+        return self._t
+
+    def wall(self) -> datetime:
+        return self.start + timedelta(seconds=self._t)
+
+    def wall_at(self, mono: float) -> datetime:
+        return self.start + timedelta(seconds=mono)
+
+    def advance_to(self, when: datetime) -> None:
+        self._t = max(self._t, (when - self.start).total_seconds())
+
+
+class TraceInput:
+    """Stand-in for ``ActivitySampler``: active intervals taken from a trace."""
+
+    def __init__(self) -> None:
+        self._runs: Deque[Interval] = deque()
+
+    def add(self, a: datetime, b: datetime) -> None:
+        self._runs.append((a, b))
+
+    def runs(self, start: datetime, end: datetime) -> List[Interval]:
+        """Active intervals in [start, end), split at midnight."""
+        while self._runs and self._runs[0][1] <= start:
+            self._runs.popleft()
+        out = []
+        for a, b in self._runs:
+            if a >= end:
+                break
+            a, b = max(a, start), min(b, end)
+            midnight = datetime.combine(a.date() + timedelta(days=1), datetime.min.time())
+            if b > midnight:
+                out.append((a, midnight))
+                a = midnight
+            out.append((a, b))
+        return out
+
+
+class HeadlessWindow:
+    """Stand-in for a reminder window class: records each show; the user
+    closes it ``react_s`` seconds later (never, with None)."""
+
+    def __init__(self, clock: VirtualClock, react_s: Optional[float] = 20.0) -> None:
+        self.clock = clock
+        self.react_s = react_s
+        self.shown: List[Tuple[datetime, bool]] = []
+        self._open_until: Optional[datetime] = None
+
+    def fire(self, minimized: bool = False, reveal_when: Optional[Callable[[], bool]] = None) -> None:
+        now = self.clock.wall()
+        self.shown.append((now, minimized))
+        self._open_until = None if self.react_s is None else now + timedelta(seconds=self.react_s)
+
+    def showing(self) -> int:
+        if not self.shown:
+            return 0
+        return int(self._open_until is None or self._open_until > self.clock.wall())
+
+
+def workday(day: date, rnd: random.Random) -> List[Step]:
+    """A plausible office day: arrival between 8 and 9, input most minutes,
+    short idle gaps, a locked lunch break, a call or two, some YouTube, and
+    locking the screen on leaving; the day is ended by answering the
+    end-of-day question. Weekends are empty."""
+    if day.weekday() >= 5:
+        return []
+    t = datetime.combine(day, datetime.min.time()) + timedelta(hours=8, minutes=rnd.randint(0, 60))
+    leave = t + timedelta(hours=9, minutes=rnd.randint(30, 75))
+    lunch = datetime.combine(day, datetime.min.time()) + timedelta(hours=12, minutes=rnd.randint(0, 60))
+    calls = sorted(t + timedelta(minutes=rnd.randint(30, 480)) for _ in range(rnd.randint(0, 2)))
+    steps = [Step(t, "unlock"), Step(t + timedelta(seconds=5), "start_work")]
+    for start in calls:
+        steps += [Step(start, "call", True), Step(start + timedelta(minutes=rnd.randint(15, 60)), "call", False)]
+    if rnd.random() < 0.3:
+        yt = lunch + timedelta(hours=rnd.randint(1, 4))
+        steps += [Step(yt, "youtube_start"), Step(yt + timedelta(minutes=rnd.randint(3, 20)), "youtube_stop")]
+    while t < leave:
+        if lunch <= t < lunch + timedelta(hours=1):
+            steps.append(Step(t, "lock"))
+            t += timedelta(minutes=rnd.randint(30, 50))
+            steps.append(Step(t, "unlock"))
+            lunch = leave
+        elif rnd.random() < 0.03:
+            t += timedelta(minutes=rnd.randint(3, 12))  # away from the desk, unlocked
+        else:
+            steps.append(Step(t, "input", rnd.randint(40, 60)))
+            t += timedelta(minutes=1)
+    steps.append(Step(t, "lock"))
+    return sorted(steps, key=lambda s: s.at)
+
+
+def _ms(values: List[float], q: float) -> Optional[float]:
+    if not values:
+        return None
+    values = sorted(values)
+    return round(values[int(q * (len(values) - 1))] * 1000, 3)
+
+
+class Simulation:
+    """An ``Agent`` on a virtual clock starting at ``start``.
+
+    ``extend`` is how many times a day the end-of-day question is answered
+    "no" (extend the day) before "yes". Storage is process-wide, so
+    simulations in one process share the journals under ``DESKTOP_DIR``.
+    """
+
+    def __init__(
+        self,
+        start: datetime,
+        react_s: Optional[float] = 20.0,
+        extend: int = 0,
+        export: bool = False,
+    ) -> None:
+        from agent import Agent
+        from policy import WINDOWS
+
+        self.clock = VirtualClock(start)
+        self.sched = Scheduler(clock=self.clock.mono, workers=0)
+        self.in_call = False
+        self.extend = extend
+        self.windows = {name: HeadlessWindow(self.clock, react_s) for name in WINDOWS}
+        self.questions: List[Tuple[datetime, bool]] = []
+        self.input = TraceInput()
+        self.agent = Agent(
+            clock=EventClock(wall=self.clock.wall, mono=self.clock.mono),
+            sched=self.sched,
+            in_call=lambda: self.in_call,
+            windows=self.windows,
+            ask=self._ask,
+        )
+        self.agent.sampler = self.input  # type: ignore[assignment]
+        self.agent.last_tick = start
+        if not export:
+            self.sched.remove("maintenance")
+        self.sched.add("activity", self._tick, interval=60, first=0)
+        self.tick_s: List[float] = []
+        self.days: List[dict] = []
+
+    def _tick(self) -> None:
+        t0 = time.perf_counter()
+        self.agent.minute_tick()
+        self.tick_s.append(time.perf_counter() - t0)
+
+    def _ask(self, title: str, message: str, on_answer: Callable[[bool], None]) -> None:
+        today = self.clock.wall().date()
+        answer = sum(1 for at, _ in self.questions if at.date() == today) >= self.extend
+        self.questions.append((self.clock.wall(), answer))
+        on_answer(answer)
+
+    def _apply(self, step: Step) -> None:
+        if step.kind == "input":
+            self.input.add(step.at, step.at + timedelta(seconds=float(step.value)))  # type: ignore[arg-type]
+        elif step.kind in ("lock", "unlock"):
+            self.agent.session.accept(step.kind, self.agent.clock.stamp())
+        elif step.kind == "call":
+            self.in_call = bool(step.value)
+        else:
+            self.agent.handle_event({"type": step.kind})
+
+    def run(self, steps: Iterable[Step], until: datetime) -> None:
+        """Apply ``steps`` (in time order) and fire timers up to ``until``."""
+        it = iter(steps)
+        step = next(it, None)
+        session = self.agent.session
+        while True:
+            deadline = self.sched.next_deadline()
+            if session.pending is not None:
+                lasted = session.pending[1].mono + session.debounce_s
+                deadline = lasted if deadline is None else min(deadline, lasted)
+            due = until if deadline is None else min(until, self.clock.wall_at(deadline))
+            if step is not None and step.at <= due:
+                self.clock.advance_to(step.at)
+                self._apply(step)
+                step = next(it, None)
+                continue
+            self.clock.advance_to(due)
+            session.expire(self.clock.mono())
+            if due >= until:
+                break
+            self.sched.run_due()
+
+    def run_day(self, steps: Iterable[Step]) -> dict:
+        """Run to the end of the current day; returns its summary."""
+        from storage import flush
+
+        day = self.clock.wall().date()
+        ticks = len(self.tick_s)
+        shown = {n: len(w.shown) for n, w in self.windows.items()}
+        t0 = time.perf_counter()
+        self.run(steps, datetime.combine(day, datetime.max.time().replace(microsecond=0)))
+        flush()
+        status = self.agent.tracker.get_status()
+        summary = {
+            "day": day.isoformat(),
+            "work_minutes": status["work_minutes"],
+            "break_minutes": status["break_minutes"],
+            "absence_minutes": status["absence_minutes"],
+            "shown": {n: len(w.shown) - shown[n] for n, w in self.windows.items()},
+            "tick_p99_ms": _ms(self.tick_s[ticks:], 0.99),
+            "run_s": round(time.perf_counter() - t0, 3),
+        }
+        self.days.append(summary)
+        self.clock.advance_to(datetime.combine(day + timedelta(days=1), datetime.min.time()))
+        return summary
+
+    def run_days(self, days: int, seed: int = 0) -> List[dict]:
+        """``days`` generated work days from the start date."""
+        rnd = random.Random(seed)
+        return [self.run_day(workday(self.clock.wall().date(), rnd)) for _ in range(days)]
+
+    def stats(self) -> dict:
+        return {
+            "days": len(self.days),
+            "ticks": len(self.tick_s),
+            "tick_p50_ms": _ms(self.tick_s, 0.5),
+            "tick_p99_ms": _ms(self.tick_s, 0.99),
+            "tick_max_ms": _ms(self.tick_s, 1.0),
+            "shown": {n: len(w.shown) for n, w in self.windows.items()},
+            "extended": sum(1 for _, yes in self.questions if not yes),
+            "late_events": self.agent.tracker.late_events,
+            "session": self.agent.session.stats(),
+        }
+
+
+def main(argv: List[str]) -> int:
+    parser = argparse.ArgumentParser(description="Simulate work days on a virtual clock.")
+    parser.add_argument("--days", type=int, default=5)
+    parser.add_argument("--start", default="2026-01-05", help="first day (YYYY-MM-DD)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--extend", type=int, default=0, help="end-of-day 'no' answers per day")
+    args = parser.parse_args(argv)
+    os.environ.setdefault("DESKTOP_DIR", tempfile.mkdtemp(prefix="wwa-sim-"))
+
+    sim = Simulation(datetime.fromisoformat(args.start), extend=args.extend)
+    t0 = time.perf_counter()
+    for summary in sim.run_days(args.days, seed=args.seed):
+        print(json.dumps(summary))
+    elapsed = time.perf_counter() - t0
+    print(json.dumps({**sim.stats(), "elapsed_s": round(elapsed, 2),
+                      "speedup": round(args.days * 86400 / elapsed)}))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
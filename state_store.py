@@ -0,0 +1,111 @@
+from __future__ import annotations
+
+import json
+import os
+from datetime import datetime
+from pathlib import Path
+from threading import Lock
+from typing import TYPE_CHECKING, List, Optional, Tuple
+
+from journal import Journal
+
+if TYPE_CHECKING:
+    from writer import LogWriter
+
+TailEntry = Tuple[int, str, datetime, float]
+
+
+class StateStore:
+    """Snapshot plus tail-of-transitions persistence for the tracker.
+
+    Every state transition is appended (and fsynced) to a small tail file.
+    With a ``writer`` the append and fsync happen on its thread, so the
+    caller (the tracker, under its lock) never waits for the disk. After
+    ``compact_every`` transitions the full state is written atomically as a
+    JSON snapshot and the tail is truncated. Entries carry a sequence number,
+    so a crash between the two steps, or a tail entry the writer appends
+    after the truncation, never replays a transition twice. Restoring reads
+    one snapshot and at most ``compact_every`` tail lines.
+    """
+
+    def __init__(
+        self,
+        snapshot_path: Path,
+        tail_path: Path,
+        compact_every: int = 64,
+        writer: Optional["LogWriter"] = None,
+    ) -> None:
+        self.snapshot_path = snapshot_path
+        self.tail = Journal(tail_path)
+        self.writer = writer
+        self.compact_every = max(1, compact_every)
+        self.seq = 0
+        self._tail_len = 0
+        self._lock = Lock()
+
+    def load(self) -> Tuple[Optional[dict], List[TailEntry]]:
+        """Return the last snapshot (or None) and the transitions after it."""
+        snap: Optional[dict] = None
+        snap_seq = 0
+        try:
+            with self.snapshot_path.open("r", encoding="utf-8") as f:
+                doc = json.load(f)
+            snap, snap_seq = doc["state"], int(doc["seq"])
+        except (FileNotFoundError, json.JSONDecodeError, KeyError, TypeError, ValueError):
+            pass
+        entries: List[TailEntry] = []
+        kept: List[dict] = []
+        for rec in self.tail.read():
+            try:
+                seq, kind, ts = int(rec["seq"]), str(rec["kind"]), datetime.fromisoformat(rec["ts"])
+                value = float(rec.get("value", 0.0))
+            except (KeyError, TypeError, ValueError):
+                continue
+            if seq > snap_seq:
+                entries.append((seq, kind, ts, value))
+                kept.append(rec)
+        if self._torn():
+            self.tail.rewrite(kept)  # or the next append would extend the torn line
+        self.seq = max([snap_seq] + [e[0] for e in entries])
+        self._tail_len = len(entries)
+        return snap, entries
+
+    def _torn(self) -> bool:
+        """True if the tail ends in a partial line (a crash mid-append)."""
+        try:
+            with self.tail.path.open("rb") as f:
+                f.seek(-1, os.SEEK_END)
+                return f.read(1) != b"\n"
+        except OSError:  # missing or empty
+            return False
+
+    def append(self, kind: str, ts: datetime, state: dict, value: float = 0.0) -> None:
+        """Record one transition; ``state`` is the serialized result of it."""
+        with self._lock:
+            self.seq += 1
+            rec = {"seq": self.seq, "kind": kind, "ts": ts.isoformat()}
+            if value:
+                rec["value"] = value
+            if self.writer is None or not self.writer.submit(self.tail, rec):
+                self.tail.append(rec)
+                self.tail.sync()
+            else:
+                self.writer.flush(wait=False)  # fsync right after it is written
+            self._tail_len += 1
+            if self._tail_len >= self.compact_every:
+                self._write_snapshot(state)
+
+    def compact(self, state: dict) -> None:
+        with self._lock:
+            self._write_snapshot(state)
+
+    def _write_snapshot(self, state: dict) -> None:
+        self.snapshot_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.snapshot_path.with_suffix(".tmp")
+        with tmp.open("w", encoding="utf-8") as f:
+            json.dump({"seq": self.seq, "state": state}, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self.snapshot_path)
+        self.tail.truncate()
+        self._tail_len = 0
@@ -1,12 +1,30 @@
 from __future__ import annotations
 
-from datetime import datetime
+from datetime import date, datetime
 from pathlib import Path
-from typing import Dict, List
+from threading import Lock
+from typing import Dict, Iterator, List, Optional
 
-import pandas as pd
-
-from config import ACTIVITY_XLSX, LOOK_FAR_XLSX
+import metrics
+from config import (
+    ACTIVITY_JOURNAL,
+    ACTIVITY_XLSX,
+    EXPORT_STATE_DIR,
+    HISTORY_DIR,
+    LOG_BATCH_SIZE,
+    LOG_FLUSH_S,
+    LOG_QUEUE_MAX,
+    LOOK_FAR_JOURNAL,
+    LOOK_FAR_XLSX,
+    STATE_DIR,
+    TRACKER_EVENTS,
+)
+from compaction import fold_sidecar, iter_csv, merged
+from engine import DayState, Event, Rules, replay
+from history import History
+from journal import Journal
+from writer import LogWriter
+from xlsx_export import MonthlyExport
 
 ACTIVITY_COLUMNS: List[str] = [
     "timestamp",
@@ -19,49 +37,264 @@ ACTIVITY_COLUMNS: List[str] = [
 
 LOOKFAR_COLUMNS: List[str] = ["timestamp", "reaction_seconds", "comment"]
 
+ACTIVITY_NUMERIC = {"work_minutes_today", "break_minutes_today", "absence_minutes_today"}
+LOOKFAR_NUMERIC = {"reaction_seconds"}
 
-def _ensure_file(path: Path, columns: List[str]) -> None:
-    if path.exists():
+activity_journal = Journal(ACTIVITY_JOURNAL)
+lookfar_journal = Journal(LOOK_FAR_JOURNAL)
+events_journal = Journal(TRACKER_EVENTS)
+history = History(HISTORY_DIR)
+writer = LogWriter(
+    max_queue=LOG_QUEUE_MAX, batch_size=LOG_BATCH_SIZE, flush_interval=LOG_FLUSH_S
+)
+
+EXPORT_STATE_DIR.mkdir(exist_ok=True)
+activity_export = MonthlyExport(
+    activity_journal, ACTIVITY_XLSX, ACTIVITY_COLUMNS, EXPORT_STATE_DIR / "aktywnosc.json"
+)
+lookfar_export = MonthlyExport(
+    lookfar_journal, LOOK_FAR_XLSX, LOOKFAR_COLUMNS, EXPORT_STATE_DIR / "popatrz_w_dal.json"
+)
+_export_lock = Lock()
+
+LOG_SECONDS = metrics.histogram(
+    "wwa_log_seconds", "Time to hand a row to the log writer.", ("journal",)
+)
+EXPORT_SECONDS = metrics.histogram(
+    "wwa_export_seconds", "XLSX export and sidecar fold run time.", ("job",)
+)
+metrics.gauge(
+    "wwa_log_writer", "Log writer queue depth and totals.",
+    lambda: {(k,): v for k, v in writer.stats().items()}, ("stat",),
+)
+
+
+def _rebuild_history() -> None:
+    """Rebuild the history from the journals on the writer thread, so no
+    row is in a journal but not yet in the history (or the other way round)
+    while they are read."""
+    writer.call(lambda: history.rebuild(activity_journal.read(), lookfar_journal.read()))
+
+
+def _history_marker() -> Path:
+    return STATE_DIR / "history.rebuild-pending"
+
+
+def _seed_marker(journal: Journal) -> Path:
+    return STATE_DIR / f"{journal.path.stem}.seed-pending"
+
+
+def _plan_seed(journal: Journal, path: Path) -> None:
+    """On first start, note that ``path`` is to be imported by
+    ``seed_journals`` and create the journal, so logging can begin."""
+    if journal.exists():
         return
-    df = pd.DataFrame(columns=columns)
-    df.to_excel(path, index=False)
+    if path.exists():
+        _seed_marker(journal).touch()
+    journal.path.touch()
+
 
+def _xlsx_records(path: Path, columns: List[str]) -> List[Dict]:
+    import pandas as pd
 
-def _append_row_xlsx(path: Path, columns: List[str], row: Dict) -> None:
-    """Append a row to XLSX. If file is locked by Excel, write CSV sidecar."""
-    _ensure_file(path, columns)
-    try:
-        old = pd.read_excel(path)
-        new = pd.concat([old, pd.DataFrame([row])], ignore_index=True)
-        new.to_excel(path, index=False)
-    except (PermissionError, OSError):
-        csv_path = path.with_suffix(".csv")
-        pd.DataFrame([row]).to_csv(
-            csv_path, mode="a", header=not csv_path.exists(), index=False
-        )
+    df = pd.read_excel(path).reindex(columns=columns)
+    return df.sort_values("timestamp", kind="stable").fillna("").to_dict(orient="records")
 
 
-def log_activity(event: str, details: str, work_min: float, break_min: float, absence_min: float) -> None:
+@EXPORT_SECONDS.timed("seed")
+def seed_journals() -> bool:
+    """One-time import of the XLSX rows logged before the journals existed,
+    merged in time order with anything logged since. A ``.csv`` sidecar
+    next to it is left to ``compact_sidecars``, the only importer of
+    sidecars.
+
+    False if a workbook is locked (by Excel); the next call retries it.
+    """
+    ok, seeded = True, False
+    for journal, path, columns, numeric in (
+        (activity_journal, ACTIVITY_XLSX, ACTIVITY_COLUMNS, ACTIVITY_NUMERIC),
+        (lookfar_journal, LOOK_FAR_XLSX, LOOKFAR_COLUMNS, LOOKFAR_NUMERIC),
+    ):
+        marker = _seed_marker(journal)
+        if not marker.exists():
+            continue
+        try:
+            rows = _xlsx_records(path, columns) if path.exists() else []
+        except (PermissionError, OSError):
+            ok = False
+            continue
+        writer.flush()
+        with _export_lock:
+            journal.rewrite(merged([rows, journal.read()], columns, numeric))
+        marker.unlink()
+        seeded = True
+    if seeded:
+        _rebuild_history()
+    return ok
+
+
+@EXPORT_SECONDS.timed("export")
+def export_all() -> bool:
+    """Export new journal rows to the monthly aktywnosc-YYYY-MM.xlsx /
+    popatrz_w_dal-YYYY-MM.xlsx files (see xlsx_export.py).
+
+    Returns False if any file was locked; the next call retries it.
+    """
+    writer.flush()
+    with _export_lock:
+        ok = activity_export.export()
+        return lookfar_export.export() and ok
+
+
+@EXPORT_SECONDS.timed("fold")
+def compact_sidecars() -> bool:
+    """Fold legacy ``.csv`` sidecars into the journals in time order.
+
+    False if a sidecar is locked; the next call retries it.
+    """
+    writer.flush()
+    ok, changed = True, False
+    with _export_lock:
+        for journal, path, columns, numeric in (
+            (activity_journal, ACTIVITY_XLSX, ACTIVITY_COLUMNS, ACTIVITY_NUMERIC),
+            (lookfar_journal, LOOK_FAR_XLSX, LOOKFAR_COLUMNS, LOOKFAR_NUMERIC),
+        ):
+            size = journal.size()
+            if fold_sidecar(journal, path.with_suffix(".csv"), columns, numeric) is None:
+                ok = False
+            changed = changed or journal.size() != size
+        if changed:
+            _rebuild_history()
+    return ok
+
+
+def maintain() -> bool:
+    """Periodic job: build a missing history store and import old workbooks
+    (first start), fold sidecars, then export. False if a file was locked."""
+    marker = _history_marker()
+    if marker.exists():
+        _rebuild_history()
+        marker.unlink()
+    seeded = seed_journals()
+    folded = compact_sidecars()
+    return export_all() and folded and seeded
+
+
+def iter_activity() -> Iterator[Dict]:
+    """All activity rows in time order, including any not yet folded sidecar."""
+    flush()
+    return merged(
+        [activity_journal.read(), iter_csv(ACTIVITY_XLSX.with_suffix(".csv"))],
+        ACTIVITY_COLUMNS, ACTIVITY_NUMERIC,
+    )
+
+
+def iter_lookfar() -> Iterator[Dict]:
+    flush()
+    return merged(
+        [lookfar_journal.read(), iter_csv(LOOK_FAR_XLSX.with_suffix(".csv"))],
+        LOOKFAR_COLUMNS, LOOKFAR_NUMERIC,
+    )
+
+
+def flush(wait: bool = True) -> bool:
+    """Write and fsync all queued rows. See LogWriter.flush."""
+    return writer.flush(wait=wait)
+
+
+def writer_stats() -> dict:
+    return writer.stats()
+
+
+def export_stats() -> dict:
+    return {"activity": activity_export.stats(), "lookfar": lookfar_export.stats()}
+
+
+def shutdown() -> None:
+    export_all()
+    writer.stop()
+
+
+@LOG_SECONDS.timed("activity")
+def log_activity(
+    event: str,
+    details: str,
+    work_min: Optional[float],
+    break_min: Optional[float],
+    absence_min: Optional[float],
+    at: Optional[datetime] = None,
+) -> None:
     """
     event: start_work, end_work, lock, unlock, youtube_start, youtube_stop,
             break_start, break_end, lookfar_show, lookfar_close,
             standup_show, standup_close, extend_day
+    *_min: the day's totals so far; None leaves them blank (not known)
+    at: row time, default now
     """
     row = {
-        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "timestamp": (at or datetime.now()).isoformat(timespec="seconds"),
         "event": event,
         "details": details,
-        "work_minutes_today": round(work_min, 1),
-        "break_minutes_today": round(break_min, 1),
-        "absence_minutes_today": round(absence_min, 1),
+        "work_minutes_today": None if work_min is None else round(work_min, 1),
+        "break_minutes_today": None if break_min is None else round(break_min, 1),
+        "absence_minutes_today": None if absence_min is None else round(absence_min, 1),
     }
-    _append_row_xlsx(ACTIVITY_XLSX, ACTIVITY_COLUMNS, row)
+    writer.submit(activity_journal, row)
+    writer.submit(history.activity_sink, row)
+
 
+@LOG_SECONDS.timed("activity_rows")
+def log_activity_rows(rows: List[Dict]) -> None:
+    """Persist ready-made activity rows (ACTIVITY_COLUMNS) in one write."""
+    writer.submit_many(activity_journal, rows)
+    writer.submit_many(history.activity_sink, rows)
 
+
+@LOG_SECONDS.timed("lookfar")
 def log_lookfar(reaction_seconds: float, comment: str) -> None:
     row = {
         "timestamp": datetime.now().isoformat(timespec="seconds"),
         "reaction_seconds": round(reaction_seconds, 1),
         "comment": comment,
     }
-    _append_row_xlsx(LOOK_FAR_XLSX, LOOKFAR_COLUMNS, row)
+    writer.submit(lookfar_journal, row)
+    writer.submit(history.lookfar_sink, row)
+
+
+@LOG_SECONDS.timed("tracker_events")
+def log_tracker_event(kind: str, ts: datetime, value: float = 0.0) -> None:
+    """History sink for WorkTracker: one line per effective event."""
+    rec = {"ts": ts.isoformat(), "kind": kind}
+    if value:
+        rec["value"] = value
+    writer.submit(events_journal, rec)
+
+
+def iter_tracker_events() -> Iterator[Event]:
+    for rec in events_journal.read():
+        try:
+            yield Event(datetime.fromisoformat(rec["ts"]), rec["kind"], float(rec.get("value", 0.0)))
+        except (KeyError, TypeError, ValueError):
+            continue
+
+
+def tracker_events_on(day: date) -> Iterator[Event]:
+    """Recorded tracker events of one day, for WorkTracker's late events."""
+    flush()
+    return (e for e in iter_tracker_events() if e.ts.date() == day)
+
+
+def replay_history(rules: Optional[Rules] = None) -> List[DayState]:
+    """Recompute every recorded day from the event history under ``rules``.
+
+    Late events are appended to the history when they arrive, so it is
+    sorted by time first.
+    """
+    flush()
+    return list(replay(sorted(iter_tracker_events(), key=lambda e: e.ts), rules))
+
+
+_plan_seed(activity_journal, ACTIVITY_XLSX)
+_plan_seed(lookfar_journal, LOOK_FAR_XLSX)
+if not history.exists():
+    _history_marker().touch()  # built by the first maintain()
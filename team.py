@@ -0,0 +1,365 @@
+"""Team-wide aggregation of many agents' tracker events.
+
+Each agent reports its effective tracker events (``kind``/``type``, ``ts``,
+``value`` and an ``id``) in batches. ``ts`` carries the agent's UTC offset;
+each user's days are accounted in their own local time, wherever the server
+runs. ``TeamHub`` keeps one ``WorkTracker``
+per user in a sharded in-memory map, so users in different shards are
+ingested in parallel. ``TeamStore`` persists the raw event stream and one
+rollup row per user and day in SQLite; dashboards only query the rollups,
+which are indexed by day.
+"""
+
+from __future__ import annotations
+
+import json
+import sqlite3
+import threading
+import zlib
+from datetime import date, datetime, timedelta, timezone
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from clock import EventClock
+from engine import KINDS, DayState, Rules, apply_event, canonical
+from ingest import parse_ts
+from tracker import WorkTracker
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS events (
+    user TEXT NOT NULL,
+    eid TEXT,
+    ts REAL NOT NULL,
+    kind INTEGER NOT NULL,
+    value REAL NOT NULL DEFAULT 0,
+    UNIQUE (user, eid)
+);
+CREATE TABLE IF NOT EXISTS daily (
+    user TEXT NOT NULL,
+    day TEXT NOT NULL,
+    work_s REAL NOT NULL,
+    break_s REAL NOT NULL,
+    absence_s REAL NOT NULL,
+    start_ts TEXT,
+    end_ts TEXT,
+    state TEXT NOT NULL,
+    PRIMARY KEY (user, day)
+) WITHOUT ROWID;
+-- Covering: dashboard aggregates over a date range never read the table itself
+CREATE INDEX IF NOT EXISTS daily_by_day ON daily (day, user, work_s, break_s, absence_s);
+"""
+
+# SQLite's default limit on host parameters in one statement
+_MAX_PARAMS = 900
+
+
+class TeamStore:
+    """SQLite backend: raw events plus per-user daily rollups.
+
+    Writes go through one connection under a lock, one transaction per
+    ingested batch. Reads use a connection per thread, which WAL mode lets
+    run concurrently with the writer.
+    """
+
+    def __init__(self, path: Path) -> None:
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._conn = self._connect()
+        self._conn.executescript(SCHEMA)
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(str(self.path), check_same_thread=False, timeout=30)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    def _reader(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._local.conn = self._connect()
+        return conn
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+    # Ingestion
+    def seen(self, user: str, ids: List[str]) -> set:
+        """The subset of ``ids`` already stored for ``user``."""
+        found: set = set()
+        for i in range(0, len(ids), _MAX_PARAMS):
+            chunk = ids[i:i + _MAX_PARAMS]
+            marks = ",".join("?" * len(chunk))
+            rows = self._reader().execute(
+                f"SELECT eid FROM events WHERE user = ? AND eid IN ({marks})", [user, *chunk]
+            )
+            found.update(r[0] for r in rows)
+        return found
+
+    def day_state(self, user: str, day: Optional[date] = None) -> Optional[dict]:
+        """Serialized DayState of ``day``, or of the user's latest day."""
+        if day is None:
+            sql, args = "SELECT state FROM daily WHERE user = ? ORDER BY day DESC LIMIT 1", [user]
+        else:
+            sql, args = "SELECT state FROM daily WHERE user = ? AND day = ?", [user, day.isoformat()]
+        row = self._reader().execute(sql, args).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def write(
+        self, user: str, events: List[Tuple[Optional[str], datetime, str, float]], days: List[dict]
+    ) -> None:
+        """Store accepted events and the resulting day states in one transaction."""
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO events (user, eid, ts, kind, value) VALUES (?, ?, ?, ?, ?)",
+                [(user, eid, ts.timestamp(), KINDS[kind], value) for eid, ts, kind, value in events],
+            )
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO daily"
+                " (user, day, work_s, break_s, absence_s, start_ts, end_ts, state)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                [
+                    (
+                        user, d["day"], d["work_s"], d["break_s"], d["absence_s"],
+                        d["start_ts"], d["end_ts"], json.dumps(d),
+                    )
+                    for d in days
+                ],
+            )
+
+    # Queries
+    def _rows(self, sql: str, args: Iterable) -> List[dict]:
+        return [dict(r) for r in self._reader().execute(sql, list(args))]
+
+    def team_daily(self, start: date, end: date) -> List[dict]:
+        """Per-day team aggregates (minutes) for ``start``..``end`` inclusive."""
+        return self._rows(
+            """
+            SELECT day,
+                   COUNT(*) AS users,
+                   ROUND(AVG(work_s) / 60, 1) AS avg_work_minutes,
+                   ROUND(MAX(work_s) / 60, 1) AS max_work_minutes,
+                   ROUND(AVG(break_s) / 60, 1) AS avg_break_minutes,
+                   ROUND(AVG(absence_s) / 60, 1) AS avg_absence_minutes
+            FROM daily WHERE day BETWEEN ? AND ?
+            GROUP BY day ORDER BY day
+            """,
+            (start.isoformat(), end.isoformat()),
+        )
+
+    def team_summary(self, start: date, end: date) -> List[dict]:
+        """Per-user totals (minutes) for ``start``..``end`` inclusive."""
+        return self._rows(
+            """
+            SELECT user,
+                   COUNT(*) AS days,
+                   ROUND(SUM(work_s) / 60, 1) AS work_minutes,
+                   ROUND(AVG(work_s) / 60, 1) AS avg_work_minutes,
+                   ROUND(SUM(break_s) / 60, 1) AS break_minutes,
+                   ROUND(SUM(absence_s) / 60, 1) AS absence_minutes
+            FROM daily WHERE day BETWEEN ? AND ?
+            GROUP BY user ORDER BY user
+            """,
+            (start.isoformat(), end.isoformat()),
+        )
+
+    def user_days(self, user: str, start: date, end: date) -> List[dict]:
+        return self._rows(
+            """
+            SELECT day,
+                   ROUND(work_s / 60, 1) AS work_minutes,
+                   ROUND(break_s / 60, 1) AS break_minutes,
+                   ROUND(absence_s / 60, 1) AS absence_minutes,
+                   start_ts AS started, end_ts AS ended
+            FROM daily WHERE user = ? AND day BETWEEN ? AND ?
+            ORDER BY day
+            """,
+            (user, start.isoformat(), end.isoformat()),
+        )
+
+
+class _DayLog:
+    """``StateStore`` stand-in for a hub tracker: restores from the team
+    store and collects the state of every day touched since the last drain."""
+
+    def __init__(self, state: Optional[dict]) -> None:
+        self._state = state
+        self.days: Dict[str, dict] = {}
+
+    def load(self) -> Tuple[Optional[dict], list]:
+        return self._state, []
+
+    def append(self, kind: str, ts: datetime, state: dict, value: float = 0.0) -> None:
+        self.days[state["day"]] = state
+
+    def compact(self, state: dict) -> None:
+        self.days[state["day"]] = state
+
+    def drain(self) -> List[dict]:
+        days, self.days = list(self.days.values()), {}
+        return days
+
+
+class _UserTime:
+    """A user's local wall clock, from the UTC offset their agent last sent;
+    the server's own local time until one arrives (older agents)."""
+
+    def __init__(self) -> None:
+        self.offset: Optional[timedelta] = None
+
+    def now(self) -> datetime:
+        if self.offset is None:
+            return datetime.now()
+        return datetime.now(timezone.utc).replace(tzinfo=None) + self.offset
+
+
+def parse_local(value: object, default: datetime) -> Optional[Tuple[datetime, Optional[timedelta]]]:
+    """An event time as the sender's local wall time, plus its UTC offset
+    (None if the sender gave none: then it is taken as server local time)."""
+    if isinstance(value, str):
+        try:
+            ts = datetime.fromisoformat(value.replace("Z", "+00:00"))
+        except ValueError:
+            return None
+        if ts.tzinfo is not None:
+            return ts.replace(tzinfo=None), ts.utcoffset()
+    ts = parse_ts(value, default)
+    return None if ts is None else (ts, None)
+
+
+class _Shard:
+    def __init__(self) -> None:
+        self.lock = threading.Lock()
+        self.trackers: Dict[str, Tuple[WorkTracker, _DayLog, _UserTime]] = {}
+
+
+class TeamHub:
+    """Per-user trackers in ``shards`` independently locked maps.
+
+    A batch for one user is deduplicated against stored ids, ordered by
+    time and folded into the user's tracker; events older than the
+    tracker's current day (an agent catching up after being offline) are
+    folded into that day's stored state instead. Both the events and the
+    touched day rollups are then written in one transaction.
+    """
+
+    def __init__(self, store: TeamStore, shards: int = 16, rules: Optional[Rules] = None) -> None:
+        self.store = store
+        self.rules = rules or Rules()
+        self._shards = [_Shard() for _ in range(max(1, shards))]
+        self._stats_lock = threading.Lock()
+        self.batches = 0
+        self.events = 0
+
+    def _shard(self, user: str) -> _Shard:
+        return self._shards[zlib.crc32(user.encode("utf-8")) % len(self._shards)]
+
+    def _tracker(
+        self, shard: _Shard, user: str, create: bool = True
+    ) -> Optional[Tuple[WorkTracker, _DayLog, _UserTime]]:
+        """Caller holds ``shard.lock``. Without ``create``, None for a user
+        with no tracker in memory and no stored day."""
+        entry = shard.trackers.get(user)
+        if entry is None:
+            stored = self.store.day_state(user)
+            if stored is None and not create:
+                return None
+            log, local = _DayLog(stored), _UserTime()
+            tracker = WorkTracker(store=log, rules=self.rules, clock=EventClock(wall=local.now))  # type: ignore[arg-type]
+            entry = shard.trackers[user] = (tracker, log, local)
+        return entry
+
+    @staticmethod
+    def _parse(item: object, now: datetime, local: _UserTime) -> Optional[Tuple[Optional[str], datetime, str, float]]:
+        if not isinstance(item, dict):
+            return None
+        try:
+            kind = canonical(str(item.get("kind") or item.get("type")))
+            value = float(item.get("value") or 0.0)
+        except (TypeError, ValueError):
+            return None
+        parsed = parse_local(item.get("ts"), now)
+        if parsed is None:
+            return None
+        ts, offset = parsed
+        if offset is not None:
+            local.offset = offset
+        eid = item.get("id")
+        return (None if eid is None else str(eid)), ts, kind, value
+
+    def ingest(self, user: str, items: List[Dict]) -> Dict:
+        shard = self._shard(user)
+        with shard.lock:
+            tracker, log, local = self._tracker(shard, user)  # type: ignore[misc]
+            now, parsed, rejected = local.now(), [], 0
+            for item in items:
+                event = self._parse(item, now, local)
+                if event is None:
+                    rejected += 1
+                else:
+                    parsed.append(event)
+            seen = self.store.seen(user, [e[0] for e in parsed if e[0] is not None])
+            accepted, duplicates = [], 0
+            for event in parsed:
+                if event[0] is not None:
+                    if event[0] in seen:
+                        duplicates += 1
+                        continue
+                    seen.add(event[0])
+                accepted.append(event)
+            accepted.sort(key=lambda e: e[1])
+            current = tracker.state.day
+            late = [e for e in accepted if e[1].date() < current]
+            days = self._fold_late(user, late)
+            tracker.apply_events([(ts, kind, value) for _, ts, kind, value in accepted[len(late):]])
+            days.extend(log.drain())
+            self.store.write(user, accepted, days)
+        with self._stats_lock:
+            self.batches += 1
+            self.events += len(accepted)
+        return {
+            "accepted": len(accepted),
+            "duplicates": duplicates,
+            "rejected": rejected,
+            "late": len(late),
+        }
+
+    def _fold_late(self, user: str, late: List[Tuple[Optional[str], datetime, str, float]]) -> List[dict]:
+        states: Dict[date, DayState] = {}
+        for _, ts, kind, value in late:
+            day = ts.date()
+            state = states.get(day)
+            if state is None:
+                stored = self.store.day_state(user, day)
+                state = DayState.from_dict(stored) if stored else DayState(day=day)
+            states[day], _ = apply_event(state, kind, ts, self.rules, value)
+        return [s.to_dict() for s in states.values()]
+
+    def status(self, user: str) -> Optional[dict]:
+        """None for a user who never reported events."""
+        shard = self._shard(user)
+        with shard.lock:
+            entry = self._tracker(shard, user, create=False)
+        return None if entry is None else entry[0].get_status()
+
+    def live(self) -> List[dict]:
+        """Current status of every user with a tracker in memory."""
+        out = []
+        for shard in self._shards:
+            with shard.lock:
+                entries = list(shard.trackers.items())
+            out.extend({"user": user, **tracker.get_status()} for user, (tracker, _, _) in entries)
+        return sorted(out, key=lambda s: s["user"])
+
+    def stats(self) -> dict:
+        sizes = [len(s.trackers) for s in self._shards]
+        return {
+            "users": sum(sizes),
+            "shards": len(sizes),
+            "largest_shard": max(sizes),
+            "batches": self.batches,
+            "events": self.events,
+        }
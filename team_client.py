@@ -0,0 +1,117 @@
+from __future__ import annotations
+
+import threading
+import uuid
+from collections import deque
+from datetime import datetime
+from typing import TYPE_CHECKING, Deque, Dict, Optional
+
+if TYPE_CHECKING:
+    import requests
+
+
+class TeamUplink:
+    """Reports this agent's tracker events to a team server.
+
+    ``submit`` matches the tracker's ``on_event`` sink and only appends to a
+    bounded queue (oldest events are dropped when it is full). A background
+    thread posts batches every ``interval`` seconds to
+    ``{url}/team/{user}/events``; failed batches stay queued and are retried
+    with exponential backoff. Event ids make retries idempotent.
+    """
+
+    def __init__(
+        self,
+        url: str,
+        user: str,
+        token: Optional[str] = None,
+        interval: float = 30.0,
+        max_queue: int = 50000,
+        batch_size: int = 500,
+        timeout: float = 5.0,
+        max_backoff: float = 600.0,
+        session: Optional[requests.Session] = None,
+    ) -> None:
+        self.endpoint = f"{url.rstrip('/')}/team/{user}/events"
+        self.token = token
+        self.interval = interval
+        self.batch_size = batch_size
+        self.timeout = timeout
+        self.max_backoff = max_backoff
+        self._session = session
+        self._queue: Deque[Dict] = deque(maxlen=max_queue)
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._backoff = 0.0
+        self.sent = 0
+        self.failures = 0
+
+    def submit(self, kind: str, ts: datetime, value: float = 0.0) -> None:
+        # With the UTC offset: the server accounts each user in their own time zone
+        event = {"id": uuid.uuid4().hex, "kind": kind, "ts": ts.astimezone().isoformat()}
+        if value:
+            event["value"] = value
+        with self._lock:
+            self._queue.append(event)
+
+    def start(self) -> None:
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="wwa-team-uplink", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Stop the thread after one last attempt to send what is queued."""
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self.timeout + 1)
+            self._thread = None
+
+    def stats(self) -> dict:
+        with self._lock:
+            queued = len(self._queue)
+        return {"queued": queued, "sent": self.sent, "failures": self.failures}
+
+    def push(self) -> bool:
+        """Send everything queued; False if a batch failed (it stays queued)."""
+        while True:
+            with self._lock:
+                batch = [self._queue[i] for i in range(min(self.batch_size, len(self._queue)))]
+            if not batch:
+                return True
+            if not self._post(batch):
+                return False
+            with self._lock:
+                # The queue may have dropped from the left meanwhile; remove by id
+                sent = {e["id"] for e in batch}
+                while self._queue and self._queue[0]["id"] in sent:
+                    self._queue.popleft()
+            self.sent += len(batch)
+
+    def _post(self, batch: list) -> bool:
+        import requests
+
+        if self._session is None:
+            self._session = requests.Session()
+        headers = {"Authorization": f"Bearer {self.token}"} if self.token else {}
+        try:
+            r = self._session.post(self.endpoint, json=batch, headers=headers, timeout=self.timeout)
+        except requests.RequestException:
+            r = None
+        if r is None or r.status_code != 200:
+            self.failures += 1
+            self._backoff = min(self.max_backoff, max(self.interval, self._backoff * 2))
+            return False
+        self._backoff = 0.0
+        return True
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            self._wake.wait(self._backoff or self.interval)
+            self._wake.clear()
+            self.push()
+        self.push()
@@ -0,0 +1,136 @@
+"""Team aggregation server: ``python team_server.py``.
+
+Agents started with ``TEAM_SERVER_URL`` report their tracker events here;
+``/team`` serves the dashboard over the aggregate queries. Without
+``TEAM_TOKEN`` anyone who can connect may post and read events, so the
+server then only listens on a loopback address.
+"""
+
+from __future__ import annotations
+
+import argparse
+import hmac
+import ipaddress
+import sys
+from typing import List, Optional
+
+from flask import Flask, request, send_from_directory
+from flask_cors import CORS
+
+from config import (
+    SERVER_HOST,
+    SERVER_MODE,
+    SERVER_THREADS,
+    TEAM_CORS_ORIGINS,
+    TEAM_DB,
+    TEAM_PORT,
+    TEAM_SHARDS,
+    TEAM_TOKEN,
+)
+from serving import date_range, serve
+from team import TeamHub, TeamStore
+
+
+def create_team_app(
+    hub: Optional[TeamHub] = None,
+    token: Optional[str] = TEAM_TOKEN,
+    origins: List[str] = TEAM_CORS_ORIGINS,
+) -> Flask:
+    """The dashboard is served from the same origin; other pages may call
+    the JSON endpoints only from ``origins`` (none by default)."""
+    hub = hub or TeamHub(TeamStore(TEAM_DB), shards=TEAM_SHARDS)
+    app = Flask(__name__, static_folder="templates")
+    if origins:
+        CORS(app, origins=origins)
+    app.extensions["wwa_team"] = hub
+
+    @app.errorhandler(ValueError)
+    def bad_request(exc: ValueError) -> tuple[dict, int]:
+        return {"ok": False, "error": str(exc)}, 400
+
+    @app.before_request
+    def authorize() -> Optional[tuple[dict, int]]:
+        """With ``token`` set every JSON endpoint requires it; the dashboard
+        page itself asks for it and sends it along."""
+        if not token or request.method == "OPTIONS" or request.endpoint in ("dashboard", "static"):
+            return None
+        if hmac.compare_digest(request.headers.get("Authorization", ""), f"Bearer {token}"):
+            return None
+        return {"ok": False, "error": "unauthorized"}, 401
+
+    @app.post("/team/<user>/events")
+    def ingest(user: str) -> tuple[dict, int]:
+        """[{"id", "kind"|"type", "ts", "value"}, ...] from one user's agent."""
+        data = request.get_json(force=True, silent=True)
+        items = data.get("events") if isinstance(data, dict) else data
+        if not isinstance(items, list):
+            return {"ok": False, "error": "expected a list of events"}, 400
+        return {"ok": True, **hub.ingest(user, items)}, 200
+
+    @app.get("/team/<user>/status")
+    def user_status(user: str) -> tuple[dict, int]:
+        status = hub.status(user)
+        if status is None:
+            return {"ok": False, "error": f"no events from {user}"}, 404
+        return status, 200
+
+    @app.get("/team/<user>/days")
+    def user_days(user: str) -> tuple[dict, int]:
+        start, end = date_range()
+        return {"user": user, "days": hub.store.user_days(user, start, end)}, 200
+
+    @app.get("/team/daily")
+    def team_daily() -> tuple[dict, int]:
+        start, end = date_range()
+        return {"from": str(start), "to": str(end), "days": hub.store.team_daily(start, end)}, 200
+
+    @app.get("/team/summary")
+    def team_summary() -> tuple[dict, int]:
+        start, end = date_range()
+        return {"from": str(start), "to": str(end), "users": hub.store.team_summary(start, end)}, 200
+
+    @app.get("/team/now")
+    def team_now() -> tuple[dict, int]:
+        return {"users": hub.live()}, 200
+
+    @app.get("/team/stats")
+    def team_stats() -> tuple[dict, int]:
+        return hub.stats(), 200
+
+    @app.get("/")
+    @app.get("/team")
+    def dashboard():
+        return send_from_directory("templates", "team.html")
+
+    return app
+
+
+def _loopback(host: str) -> bool:
+    if host == "localhost":
+        return True
+    try:
+        return ipaddress.ip_address(host).is_loopback
+    except ValueError:
+        return False
+
+
+def main(argv: Optional[list] = None) -> int:
+    parser = argparse.ArgumentParser(description="Work Wellness Assistant team server")
+    parser.add_argument("--server", choices=["auto", "waitress", "dev"], default=SERVER_MODE)
+    parser.add_argument("--host", default=SERVER_HOST)
+    parser.add_argument("--port", type=int, default=TEAM_PORT)
+    parser.add_argument("--threads", type=int, default=SERVER_THREADS)
+    parser.add_argument("--db", default=str(TEAM_DB))
+    parser.add_argument("--shards", type=int, default=TEAM_SHARDS)
+    args = parser.parse_args(argv)
+    if not TEAM_TOKEN and not _loopback(args.host):
+        parser.error(f"set TEAM_TOKEN to listen on {args.host}; without it only a loopback address is allowed")
+
+    hub = TeamHub(TeamStore(args.db), shards=args.shards)
+    print(f"Starting team server on http://{args.host}:{args.port}/team")
+    serve(create_team_app(hub), args.server, args.host, args.port, args.threads)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
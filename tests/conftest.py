@@ -0,0 +1,8 @@
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+# Journals and state go to a scratch directory; config reads it on import
+os.environ.setdefault("DESKTOP_DIR", tempfile.mkdtemp(prefix="wwa-test-"))
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
@@ -0,0 +1,130 @@
+import random
+from datetime import date, datetime, timedelta
+from types import SimpleNamespace
+
+import pytest
+
+import agent as agent_module
+from activity import SECONDS_PER_DAY, ActivitySampler, DayBitmap
+from clock import EventClock
+from engine import Rules
+from tracker import WorkTracker
+
+DAY = date(2026, 3, 2)
+MIDNIGHT = datetime(2026, 3, 3)
+
+
+class StubBackend:
+    def __init__(self) -> None:
+        self.idle = 0.0
+
+    def start(self) -> None:
+        pass
+
+    def stop(self) -> None:
+        pass
+
+    def idle_seconds(self) -> float:
+        return self.idle
+
+
+def brute_runs(active: set, start: int, end: int):
+    out, run = [], None
+    for s in range(max(0, start), min(SECONDS_PER_DAY, end)):
+        if s in active and run is None:
+            run = s
+        elif s not in active and run is not None:
+            out.append((run, s))
+            run = None
+    if run is not None:
+        out.append((run, min(SECONDS_PER_DAY, end)))
+    return out
+
+
+@pytest.mark.parametrize("seed", range(10))
+def test_count_and_runs_match_a_set_of_seconds(seed):
+    rnd = random.Random(seed)
+    active = set()
+    for _ in range(rnd.randint(0, 40)):
+        a = rnd.randrange(SECONDS_PER_DAY)
+        active.update(range(a, min(SECONDS_PER_DAY, a + rnd.randint(1, 300))))
+    active.update(rnd.sample(range(SECONDS_PER_DAY), 200))
+    active.update({0, SECONDS_PER_DAY - 1})
+    bm = DayBitmap(DAY)
+    for s in active:
+        bm.set(s)
+    bm.set(-1)  # out of range: ignored
+    bm.set(SECONDS_PER_DAY)
+    spans = [(0, SECONDS_PER_DAY), (-50, 10), (SECONDS_PER_DAY - 9, SECONDS_PER_DAY + 50), (5, 5), (9, 3)]
+    for _ in range(30):
+        a = rnd.randrange(SECONDS_PER_DAY)
+        spans.append((a, a + rnd.randint(1, 20000)))
+    for start, end in spans:
+        assert bm.count(start, end) == sum(1 for s in active if max(0, start) <= s < min(end, SECONDS_PER_DAY))
+        assert list(bm.runs(start, end)) == brute_runs(active, start, end)
+
+
+def test_ticks_across_midnight_land_in_each_days_bitmap():
+    backend = StubBackend()
+    sampler = ActivitySampler(backend)
+    sampler.bitmap = DayBitmap(DAY)
+    start = MIDNIGHT - timedelta(seconds=5)
+    for s in range(10):
+        sampler.sample(start + timedelta(seconds=s))
+    assert sampler.bitmap.day == DAY + timedelta(days=1)
+    assert sampler.active_seconds(start, start + timedelta(seconds=10)) == 10
+    assert sampler.runs(start, start + timedelta(seconds=10)) == [
+        (start, MIDNIGHT), (MIDNIGHT, MIDNIGHT + timedelta(seconds=5)),
+    ]
+
+    backend.idle = 1.0  # last input a second ago: recorded at that second
+    sampler.sample(MIDNIGHT + timedelta(seconds=20))
+    assert sampler.bitmap.get(19) and not sampler.bitmap.get(20)
+    backend.idle = 5.0  # idle longer than two samples: nothing to record
+    sampler.sample(MIDNIGHT + timedelta(seconds=30))
+    assert sampler.active_seconds(MIDNIGHT, MIDNIGHT + timedelta(minutes=1)) == 6
+
+
+def tracker_at(now: datetime) -> WorkTracker:
+    return WorkTracker(
+        rules=Rules(break_free=timedelta(0)),
+        clock=EventClock(wall=lambda: now, mono=lambda: 0.0),
+        reorder_s=0,
+    )
+
+
+@pytest.mark.parametrize("gap_s, is_break", [(59, False), (61, True)])
+def test_idle_break_threshold(gap_s, is_break):
+    t0 = datetime(2026, 3, 2, 9, 0)
+    backend = StubBackend()
+    sampler = ActivitySampler(backend)
+    sampler.bitmap = DayBitmap(DAY)
+    for s in list(range(0, 30)) + list(range(30 + gap_s, 60 + gap_s)):
+        sampler.sample(t0 + timedelta(seconds=s))
+    end = t0 + timedelta(minutes=5)
+    tracker = tracker_at(end)
+    tracker.start_work(at=t0)
+    tracker.record_activity(end, sampler.runs(t0, end), timedelta(seconds=60))
+    tracker.release(force=True)
+    state = tracker.state
+    assert (state.break_total > timedelta(0)) is is_break
+    expected_work = 60 if is_break else 60 + gap_s
+    assert state.work_effective == timedelta(seconds=expected_work)
+
+
+def test_minute_tick_passes_the_idle_break_setting(monkeypatch):
+    now = datetime(2026, 3, 2, 9, 10)
+    calls = []
+    fake = SimpleNamespace(
+        clock=SimpleNamespace(now=lambda: now),
+        sampler=SimpleNamespace(runs=lambda start, end: [(start, end)]),
+        tracker=SimpleNamespace(record_activity=lambda *args: calls.append(args)),
+        last_tick=now - timedelta(minutes=1),
+        publish_status=lambda: None,
+    )
+    monkeypatch.setattr(agent_module, "IDLE_BREAK_S", 123)
+    agent_module.Agent.minute_tick(fake)
+    ((upto, runs, idle_break),) = calls
+    assert idle_break == timedelta(seconds=123)
+    assert upto == now - timedelta(seconds=2 * agent_module.ACTIVITY_SAMPLE_S) == fake.last_tick
+    assert runs == [(now - timedelta(minutes=1), upto)]
@@ -0,0 +1,32 @@
+"""Benchmarks on the simulation harness (pytest-benchmark).
+
+``python bench.py simulation logging memory`` runs the month-scale
+versions; these keep a smaller run in the test suite.
+"""
+
+import random
+from datetime import datetime, timedelta
+from itertools import count
+
+from simulation import Simulation, workday
+
+START = datetime(2032, 1, 5)
+
+
+def test_bench_simulated_day(benchmark):
+    days = count()
+
+    def setup():
+        start = START + timedelta(weeks=next(days))  # a fresh Monday each round
+        sim = Simulation(start)
+        return (sim, workday(start.date(), random.Random(1))), {}
+
+    summary = benchmark.pedantic(lambda sim, steps: sim.run_day(steps), setup=setup, rounds=3)
+    assert summary["work_minutes"] > 0
+
+
+def test_bench_minute_tick(benchmark):
+    sim = Simulation(START - timedelta(weeks=1))
+    sim.run(workday(sim.clock.wall().date(), random.Random(2)),
+            sim.clock.wall() + timedelta(hours=11))
+    benchmark(sim.agent.minute_tick)
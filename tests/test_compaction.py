@@ -0,0 +1,72 @@
+import csv
+
+import pytest
+
+import storage
+from compaction import fold_sidecar, merged
+from history import History
+from journal import Journal
+from storage import ACTIVITY_COLUMNS, ACTIVITY_NUMERIC
+
+
+def activity(ts: str, event: str, work: float) -> dict:
+    return {"timestamp": ts, "event": event, "details": "", "work_minutes_today": work,
+            "break_minutes_today": 0.0, "absence_minutes_today": 0.0}
+
+
+def test_merged_keeps_identical_rows():
+    a = [activity("2026-03-02T09:00:00", "lookfar_close", 10.0)] * 2
+    b = [activity("2026-03-02T08:59:00", "start_work", 0.0)]
+    rows = list(merged([a, b], ACTIVITY_COLUMNS, ACTIVITY_NUMERIC))
+    assert [r["event"] for r in rows] == ["start_work", "lookfar_close", "lookfar_close"]
+
+
+@pytest.fixture
+def legacy(tmp_path, monkeypatch):
+    """storage pointed at a scratch dir holding an old workbook and sidecar."""
+    from openpyxl import Workbook
+
+    xlsx, sidecar = tmp_path / "aktywnosc.xlsx", tmp_path / "aktywnosc.csv"
+    wb = Workbook()
+    wb.active.append(ACTIVITY_COLUMNS)
+    wb.active.append(list(activity("2026-03-02T09:00:00", "start_work", 0.0).values()))
+    wb.save(xlsx)
+    with sidecar.open("w", newline="", encoding="utf-8") as f:
+        w = csv.DictWriter(f, ACTIVITY_COLUMNS)
+        w.writeheader()
+        w.writerows([activity("2026-03-02T10:00:00", "lock", 60.0)] * 2)  # two locks in one second
+
+    journal = Journal(tmp_path / "aktywnosc.jsonl")
+    monkeypatch.setattr(storage, "ACTIVITY_XLSX", xlsx)
+    monkeypatch.setattr(storage, "LOOK_FAR_XLSX", tmp_path / "popatrz_w_dal.xlsx")
+    monkeypatch.setattr(storage, "STATE_DIR", tmp_path)
+    monkeypatch.setattr(storage, "activity_journal", journal)
+    monkeypatch.setattr(storage, "lookfar_journal", Journal(tmp_path / "popatrz_w_dal.jsonl"))
+    monkeypatch.setattr(storage, "history", History(tmp_path / "history"))
+    storage._plan_seed(journal, xlsx)
+    return journal, xlsx, sidecar
+
+
+def test_seed_runs_later_and_keeps_rows_logged_before_it(legacy):
+    journal, _, sidecar = legacy
+    journal.append(activity("2026-03-03T08:00:00", "unlock", 0.0))  # logged before maintenance ran
+    assert storage.seed_journals()
+    assert [r["event"] for r in journal.read()] == ["start_work", "unlock"]
+    assert storage.seed_journals()  # once only
+    assert sum(1 for _ in journal.read()) == 2
+    assert fold_sidecar(journal, sidecar, ACTIVITY_COLUMNS, ACTIVITY_NUMERIC) == 2
+    assert [r["event"] for r in journal.read()] == ["start_work", "lock", "lock", "unlock"]
+
+
+def test_locked_workbook_is_retried(legacy, monkeypatch):
+    journal, _, _ = legacy
+
+    def locked(path, columns):
+        raise PermissionError(13, "locked by Excel", str(path))
+
+    with monkeypatch.context() as m:
+        m.setattr(storage, "_xlsx_records", locked)
+        assert storage.seed_journals() is False
+    assert list(journal.read()) == []
+    assert storage.seed_journals()
+    assert [r["event"] for r in journal.read()] == ["start_work"]
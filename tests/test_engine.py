@@ -0,0 +1,105 @@
+import random
+from datetime import datetime, timedelta
+from typing import List
+
+import pytest
+
+from engine import KINDS, DayState, Event, Rules, apply_event, replay, replay_arrays
+
+T0 = datetime(2026, 3, 2, 7, 0)
+SEEDS = range(20)
+
+
+def random_stream(rnd: random.Random, day: int) -> List[Event]:
+    """Any mix of event kinds in one day, including repeats and events out
+    of their usual order (active before start, break_end without a break)."""
+    t = T0 + timedelta(days=day, minutes=rnd.randint(0, 120))
+    events = []
+    for _ in range(rnd.randint(1, 60)):
+        t += timedelta(seconds=rnd.randint(1, 1800))
+        if t.date() != (T0 + timedelta(days=day)).date():
+            break
+        kind = rnd.choice(list(KINDS))
+        events.append(Event(t, kind, float(rnd.randint(1, 60)) if kind == "active" else 0.0))
+    return events
+
+
+def fold(events: List[Event], rules: Rules) -> DayState:
+    state = DayState(day=events[0].ts.date())
+    for ts, kind, value in events:
+        state, _ = apply_event(state, kind, ts, rules, value)
+    return state
+
+
+@pytest.mark.parametrize("seed", SEEDS)
+@pytest.mark.parametrize("free_min", [0, 5, 30])
+def test_replay_arrays_matches_the_fold(seed, free_min):
+    rnd = random.Random(seed)
+    rules = Rules(break_free=timedelta(minutes=free_min))
+    streams = [s for s in (random_stream(rnd, d) for d in range(30)) if s]
+    group = [g for g, s in enumerate(streams) for _ in s]
+    ts = [e.ts.timestamp() for s in streams for e in s]
+    kind = [KINDS[e.kind] for s in streams for e in s]
+    value = [e.value for s in streams for e in s]
+    order = list(range(len(kind)))
+    rnd.shuffle(order)  # unordered input takes the sorting path
+    out = replay_arrays(
+        [group[i] for i in order], [ts[i] for i in order], [kind[i] for i in order],
+        [value[i] for i in order], rules=rules,
+    )
+    assert list(out["group"]) == list(range(len(streams)))
+    for g, events in enumerate(streams):
+        state = fold(events, rules)
+        assert out["work_s"][g] == pytest.approx(state.work_effective.total_seconds())
+        assert out["break_s"][g] == pytest.approx(state.break_total.total_seconds())
+        assert out["absence_s"][g] == pytest.approx(state.absence_total.total_seconds())
+        if state.start_ts is None:
+            assert out["start_ts"][g] != out["start_ts"][g]  # NaN
+        else:
+            assert out["start_ts"][g] == state.start_ts.timestamp()
+
+
+@pytest.mark.parametrize("seed", SEEDS)
+def test_replay_yields_one_folded_state_per_day(seed):
+    rnd = random.Random(seed)
+    streams = [s for s in (random_stream(rnd, d) for d in range(5)) if s]
+    rules = Rules(break_free=timedelta(minutes=10))
+    days = list(replay([e for s in streams for e in s], rules))
+    assert days == [fold(s, rules) for s in streams]
+
+
+def test_replay_recomputes_totals_under_new_rules():
+    day = [
+        Event(T0, "start_work"),
+        Event(T0 + timedelta(minutes=30), "active", 1800.0),
+        Event(T0 + timedelta(minutes=30), "lock"),
+        Event(T0 + timedelta(minutes=75), "unlock"),  # a 45 minute break
+        Event(T0 + timedelta(minutes=90), "active", 900.0),
+        Event(T0 + timedelta(hours=2), "end_work"),
+    ]
+    (strict,) = replay(day, Rules(break_free=timedelta(minutes=15)))
+    (lenient,) = replay(day, Rules(break_free=timedelta(minutes=60)))
+    assert strict.break_total == lenient.break_total == timedelta(minutes=45)
+    assert strict.work_effective == timedelta(minutes=30 + 15 + 15)
+    assert strict.absence_total == timedelta(minutes=30)
+    assert lenient.work_effective == timedelta(minutes=30 + 45 + 15)
+    assert lenient.absence_total == timedelta(0)
+
+
+def test_replay_history_rereads_the_recorded_events(tmp_path, monkeypatch):
+    import storage
+    from journal import Journal
+
+    monkeypatch.setattr(storage, "events_journal", Journal(tmp_path / "tracker_events.jsonl"))
+    late_first = [
+        (T0 + timedelta(minutes=75), "break_end", 0.0),  # appended late, as a late event is
+        (T0, "start_work", 0.0),
+        (T0 + timedelta(minutes=30), "break_start", 0.0),
+    ]
+    for ts, kind, value in late_first:
+        storage.log_tracker_event(kind, ts, value)
+    (strict,) = storage.replay_history(Rules(break_free=timedelta(minutes=15)))
+    (lenient,) = storage.replay_history(Rules(break_free=timedelta(minutes=60)))
+    assert strict.absence_total == timedelta(minutes=30)
+    assert lenient.absence_total == timedelta(0)
+    assert lenient.work_effective - strict.work_effective == timedelta(minutes=30)
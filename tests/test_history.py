@@ -0,0 +1,86 @@
+from datetime import date
+
+from history import History
+
+
+def row(ts: str, event: str, work=None, brk=None, absence=None) -> dict:
+    return {
+        "timestamp": ts, "event": event, "details": "",
+        "work_minutes_today": work, "break_minutes_today": brk, "absence_minutes_today": absence,
+    }
+
+
+def test_rows_without_totals_do_not_reset_the_day(tmp_path):
+    history = History(tmp_path)
+    history.activity_sink.append_many([
+        row("2026-03-02T09:00:00", "start_work", 0, 0, 0),
+        row("2026-03-02T10:00:00", "lock", 55.0, 5.0, 0.0),
+        row("2026-03-02T10:01:00", "standup_close"),
+        row("2026-03-02T10:02:00", "standup_close", 0, 0, 0),
+    ])
+    (day,) = history.daily(date(2026, 3, 2), date(2026, 3, 2))
+    assert (day["work_minutes"], day["break_minutes"]) == (55.0, 5.0)
+    assert day["events"]["standup_close"] == 2
+    (week,) = history.weekly(date(2026, 3, 2), date(2026, 3, 2))
+    assert week["work_minutes"] == 55.0
+
+
+def test_late_rows_do_not_overwrite_newer_totals(tmp_path):
+    history = History(tmp_path)
+    history.activity_sink.append_many([
+        row("2026-03-02T12:00:00", "lock", 170.0, 10.0, 0.0),
+        row("2026-03-02T11:00:00", "break_end", 110.0, 10.0, 0.0),  # late
+    ])
+    history.activity_sink.append_many([row("2026-03-03T09:30:00", "unlock", 30.0, 0.0, 0.0)])
+    days = history.daily(date(2026, 3, 2), date(2026, 3, 3))
+    assert [d["work_minutes"] for d in days] == [170.0, 30.0]
+    (week,) = history.weekly(date(2026, 3, 2), date(2026, 3, 3))
+    assert week["work_minutes"] == 200.0
+
+    history.sync()
+    reopened = History(tmp_path)
+    reopened.activity_sink.append_many([row("2026-03-02T11:30:00", "unlock", 140.0, 10.0, 0.0)])
+    assert reopened.daily(date(2026, 3, 2), date(2026, 3, 2))[0]["work_minutes"] == 170.0
+
+
+def test_rebuild_while_rows_are_logged_counts_each_row_once(tmp_path, monkeypatch):
+    import threading
+    import time
+    from datetime import datetime, timedelta
+
+    import storage
+    from journal import Journal
+    from writer import LogWriter
+
+    class SlowJournal(Journal):
+        def append_many(self, rows):
+            super().append_many(rows)
+            time.sleep(0.002)  # rows are in the journal, not yet in the history
+
+    writer = LogWriter(batch_size=7, flush_interval=0.001)
+    monkeypatch.setattr(storage, "writer", writer)
+    monkeypatch.setattr(storage, "STATE_DIR", tmp_path)
+    monkeypatch.setattr(storage, "activity_journal", SlowJournal(tmp_path / "aktywnosc.jsonl"))
+    monkeypatch.setattr(storage, "lookfar_journal", Journal(tmp_path / "popatrz_w_dal.jsonl"))
+    monkeypatch.setattr(storage, "history", History(tmp_path / "history"))
+    storage._history_marker().touch()  # a first start: the store is missing
+
+    t0 = datetime(2026, 3, 2, 9, 0)
+
+    def log():
+        for i in range(1000):
+            storage.log_activity("lookfar_show", "", None, None, None, at=t0 + timedelta(seconds=i))
+            time.sleep(0.0002)
+
+    logger = threading.Thread(target=log)
+    logger.start()
+    try:
+        assert storage.maintain()
+        while logger.is_alive():
+            storage._rebuild_history()
+    finally:
+        logger.join()
+        writer.stop()
+    assert not storage._history_marker().exists()
+    (day,) = storage.history.daily(date(2026, 3, 2), date(2026, 3, 2))
+    assert day["events"]["lookfar_show"] == sum(1 for _ in storage.activity_journal.read()) == 1000
@@ -0,0 +1,63 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from clock import EventClock
+from ingest import EventIngestor
+from journal import Journal
+from tracker import WorkTracker
+
+NOW = datetime(2026, 3, 2, 12, 0)
+
+
+def ingestor(path, max_ids=10000) -> EventIngestor:
+    tracker = WorkTracker(clock=EventClock(wall=lambda: NOW, mono=lambda: 0.0))
+    return EventIngestor(tracker, lambda rows: None, max_ids=max_ids, ids=Journal(path))
+
+
+def event(i: int, kind: str = "break_start", ts: datetime = NOW) -> dict:
+    return {"id": f"e{i}", "type": kind, "ts": ts.isoformat()}
+
+
+def test_batch_resent_after_a_restart_is_skipped(tmp_path):
+    batch = [event(1, "start_work", NOW - timedelta(hours=3)), event(2, ts=NOW - timedelta(hours=1))]
+    assert ingestor(tmp_path / "ids.jsonl").ingest(batch)["accepted"] == 2
+    restarted = ingestor(tmp_path / "ids.jsonl")
+    assert restarted.ingest(batch) == {"accepted": 0, "duplicates": 2, "rejected": 0}
+
+
+def test_ids_journal_keeps_the_newest(tmp_path):
+    first = ingestor(tmp_path / "ids.jsonl", max_ids=10)
+    for i in range(50):
+        first.ingest([event(i, ts=NOW - timedelta(minutes=60 - i))])
+    assert sum(1 for _ in Journal(tmp_path / "ids.jsonl").read()) <= 20
+    restarted = ingestor(tmp_path / "ids.jsonl", max_ids=10)
+    assert restarted.ingest([event(49, ts=NOW - timedelta(minutes=11))])["duplicates"] == 1
+
+
+def test_far_future_events_are_rejected(tmp_path):
+    ingest = ingestor(tmp_path / "ids.jsonl")
+    result = ingest.ingest([
+        event(1, "start_work", NOW + timedelta(seconds=30)),
+        event(2, ts=NOW + timedelta(days=1)),
+    ])
+    assert result == {"accepted": 1, "duplicates": 0, "rejected": 1}
+    # Not claimed: the same event with a corrected time is accepted
+    assert ingest.ingest([event(2, ts=NOW)])["accepted"] == 1
+
+
+def test_a_batch_the_tracker_failed_to_apply_is_accepted_on_retry(tmp_path, monkeypatch):
+    ingest = ingestor(tmp_path / "ids.jsonl")
+    batch = [event(1, "start_work", NOW - timedelta(hours=1)), event(2, ts=NOW - timedelta(minutes=5))]
+
+    def broken(events):
+        raise OSError("disk full")
+
+    monkeypatch.setattr(ingest.tracker, "apply_events", broken)
+    with pytest.raises(OSError):
+        ingest.ingest(batch)
+    assert list(Journal(tmp_path / "ids.jsonl").read()) == []
+    monkeypatch.undo()
+    assert ingest.ingest(batch)["accepted"] == 2
+    assert ingest.tracker.state.in_break
+    assert ingestor(tmp_path / "ids.jsonl").ingest(batch)["duplicates"] == 2
@@ -0,0 +1,125 @@
+import threading
+import time
+from types import SimpleNamespace
+
+import pytest
+
+import metrics
+from app import create_app
+
+
+def test_render_prometheus_text():
+    registry = metrics.Registry()
+    hits = registry.counter("t_hits_total", "Hits.", ("path",))
+    hits.inc("/a")
+    hits.inc("/a", amount=2)
+    hits.inc('/"b"')
+    latency = registry.histogram("t_seconds", "Latency.", ("op",), buckets=(0.1, 1.0))
+    latency.observe(0.05, "read")
+    latency.observe(0.5, "read")
+    latency.observe(3.0, "read")
+    registry.gauge("t_depth", "Depth.", lambda: 7)
+    registry.gauge("t_broken", "Broken.", lambda: 1 / 0)
+
+    assert registry.render().splitlines() == [
+        "# HELP t_depth Depth.",
+        "# TYPE t_depth gauge",
+        "t_depth 7",
+        "# HELP t_hits_total Hits.",
+        "# TYPE t_hits_total counter",
+        't_hits_total{path="/\\"b\\""} 1',
+        't_hits_total{path="/a"} 3',
+        "# HELP t_seconds Latency.",
+        "# TYPE t_seconds histogram",
+        't_seconds_bucket{op="read",le="0.1"} 1',
+        't_seconds_bucket{op="read",le="1.0"} 2',
+        't_seconds_bucket{op="read",le="+Inf"} 3',
+        't_seconds_sum{op="read"} 3.55',
+        't_seconds_count{op="read"} 3',
+    ]
+
+
+def test_gauges_replace_and_counters_keep_their_registration():
+    registry = metrics.Registry()
+    first = registry.counter("t_total", "Total.")
+    assert registry.counter("t_total", "Total.") is first
+    registry.gauge("t_g", "G.", lambda: 1)
+    registry.gauge("t_g", "G.", lambda: {("x",): 2}, ("k",))
+    assert 't_g{k="x"} 2' in registry.render()
+
+
+def _busy(stop: threading.Event) -> None:
+    while not stop.is_set():
+        sum(range(1000))
+
+
+def test_profiler_samples_other_threads():
+    profiler = metrics.Profiler()
+    stop = threading.Event()
+    worker = threading.Thread(target=_busy, args=(stop,), name="t-busy")
+    worker.start()
+    try:
+        profiler.start(interval=0.002)
+        assert profiler.running
+        deadline = time.monotonic() + 5
+        while profiler.samples < 20 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        profiler.stop()
+    finally:
+        stop.set()
+        worker.join()
+    assert not profiler.running
+    samples = profiler.samples
+    time.sleep(0.02)
+    assert profiler.samples == samples
+    top = profiler.top(50)
+    assert top and all(n > 0 for _, n in top)
+    assert any(stack.startswith("t-busy;") and "_busy (test_metrics.py:" in stack for stack, _ in top)
+    folded = profiler.folded().splitlines()
+    assert len(folded) == profiler.stats()["stacks"]
+    stack, count = folded[0].rsplit(" ", 1)
+    assert (stack, int(count)) == top[0]
+
+
+def test_profiler_keeps_or_resets_samples():
+    profiler = metrics.Profiler()
+    profiler.start(interval=0.002)
+    time.sleep(0.05)
+    profiler.stop()
+    before = profiler.samples
+    assert before > 0
+    profiler.start(interval=0.002, reset=False)
+    profiler.stop()
+    assert profiler.samples >= before
+    profiler.start(interval=1)
+    profiler.stop()
+    assert profiler.samples == 0
+
+
+@pytest.mark.parametrize("interval", [0, -1, float("nan"), float("inf")])
+def test_profiler_rejects_bad_intervals(interval):
+    profiler = metrics.Profiler()
+    with pytest.raises(ValueError):
+        profiler.start(interval=interval)
+    assert not profiler.running
+
+
+def test_profiler_clamps_tiny_intervals():
+    profiler = metrics.Profiler()
+    profiler.start(interval=1e-9)
+    profiler.stop()
+    assert profiler.interval == metrics.Profiler.MIN_INTERVAL
+
+
+def test_profile_endpoint_validates_the_interval():
+    client = create_app(SimpleNamespace()).test_client()
+    for body in ('{"on": true, "interval": -1}', '{"on": true, "interval": 0}', '{"on": true, "interval": "x"}', "[1]"):
+        reply = client.post("/profile", data=body, content_type="text/plain")
+        assert reply.status_code == 400, body
+        assert not metrics.profiler.running
+    try:
+        reply = client.post("/profile", json={"on": True, "interval": 1e-9})
+        assert reply.status_code == 200
+        assert reply.get_json()["interval_s"] == metrics.Profiler.MIN_INTERVAL
+    finally:
+        assert client.post("/profile", json={"on": False}).get_json()["running"] is False
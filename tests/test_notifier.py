@@ -0,0 +1,124 @@
+import pytest
+
+import notifier
+from notifier import RevealDispatcher, _BaseWindow
+
+
+class FakeRoot:
+    """The Toplevel calls a reminder window makes, recorded instead of drawn."""
+
+    def __init__(self) -> None:
+        self.calls = []
+
+    def __getattr__(self, name):
+        return lambda *args, **kwargs: self.calls.append(name)
+
+    def after(self, ms, fn) -> None:
+        self.calls.append("after")
+        fn()
+
+
+class HeadlessReminder(_BaseWindow):
+    def __init__(self) -> None:
+        self.closed = True
+        self.reaction_start = 0.0
+        self._uncloseable_seconds = 0
+        self.root = FakeRoot()
+        self.btn = FakeRoot()
+        type(self)._built += 1
+
+
+def fresh(pool_size: int = 1):
+    return type("Reminder", (HeadlessReminder,), {"pool_size": pool_size})
+
+
+def test_firing_while_showing_reuses_the_open_window():
+    cls = fresh()
+    for _ in range(50):
+        cls._fire_on_ui(False, None)
+    assert cls._built == 1
+    assert cls.showing() == 1
+    (window,) = cls._open
+    window._close()
+    assert cls.showing() == 0 and cls._idle == [window]
+    cls._fire_on_ui(False, None)
+    assert cls._built == 1 and cls._open == [window]
+
+
+def test_pool_is_capped_at_pool_size():
+    cls = fresh(pool_size=2)
+    for _ in range(5):
+        cls._fire_on_ui(False, None)
+    assert cls._built == 2
+    assert cls.showing() == 2
+
+
+def test_reaction_time_counts_from_the_first_show():
+    cls = fresh()
+    cls._fire_on_ui(False, None)
+    (window,) = cls._open
+    first = window.reaction_start
+    window.reaction_start = first - 60
+    cls._fire_on_ui(False, None)
+    assert window.reaction_start == first - 60
+
+
+class InlineUi:
+    """Runs submitted calls at once, as if already on the UI thread."""
+
+    def submit(self, fn, *args):
+        fn(*args)
+
+
+@pytest.fixture
+def dispatcher(monkeypatch):
+    d = RevealDispatcher()
+    monkeypatch.setattr(notifier, "dispatcher", d)
+    monkeypatch.setattr(notifier, "ui", InlineUi())
+    return d
+
+
+def test_a_minimized_reminder_is_revealed_when_the_call_ends(dispatcher):
+    in_call = True
+    cls = fresh()
+    cls._fire_on_ui(True, lambda: not in_call)
+    (window,) = cls._open
+    assert window.root.calls.count("iconify") == 1
+    assert dispatcher.check() == 0
+    assert dispatcher.pending() == 1
+
+    in_call = False
+    deiconified = window.root.calls.count("deiconify")
+    assert dispatcher.check() == 1
+    assert window.root.calls.count("deiconify") == deiconified + 1
+    assert dispatcher.pending() == 0
+    assert dispatcher.check() == 0  # revealed once, not on every tick
+
+
+def test_repeated_fires_queue_a_single_reveal(dispatcher):
+    cls = fresh()
+    for _ in range(20):
+        cls._fire_on_ui(True, lambda: False)
+    assert dispatcher.pending() == 1
+    cls._fire_on_ui(False, None)  # shown normally: nothing left to reveal
+    assert dispatcher.pending() == 0
+
+
+def test_closing_drops_the_queued_reveal(dispatcher):
+    cls = fresh()
+    cls._fire_on_ui(True, lambda: True)
+    (window,) = cls._open
+    window._close()
+    assert dispatcher.pending() == 0
+    assert dispatcher.check() == 0
+
+
+def test_a_failing_predicate_does_not_block_the_others(dispatcher):
+    def broken():
+        raise RuntimeError("presence backend gone")
+
+    first, second = fresh(), fresh()
+    first._fire_on_ui(True, broken)
+    second._fire_on_ui(True, lambda: True)
+    assert dispatcher.check() == 1
+    assert dispatcher.pending() == 1  # the broken one is retried on the next check
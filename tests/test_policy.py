@@ -0,0 +1,80 @@
+import json
+import os
+
+import pytest
+
+from policy import FACTS, PolicyError, PolicyFile, compile_when, default_policy
+
+
+def facts(**values):
+    f = dict.fromkeys(FACTS, 0)
+    f.update(values)
+    return f
+
+
+@pytest.mark.parametrize("source", [
+    "__import__('os')",
+    "work_min.__class__",
+    "(lambda: 1)()",
+    "[x for x in (1, 2)]",
+    "open('/etc/passwd')",
+])
+def test_calls_attributes_and_other_syntax_are_rejected(source):
+    with pytest.raises(PolicyError, match="not allowed"):
+        compile_when(source)
+
+
+def test_unknown_names_are_rejected():
+    with pytest.raises(PolicyError, match="unknown name 'minutes'"):
+        compile_when("minutes > 5")
+
+
+def test_expressions_see_the_facts():
+    check = compile_when("work_min > 60 and not in_call or hour >= 13")
+    assert check(facts(work_min=61, in_call=False))
+    assert not check(facts(work_min=61, in_call=True, hour=9))
+    assert compile_when("")(facts())
+
+
+def test_an_expression_that_fails_on_the_facts_is_false():
+    assert compile_when("work_min / absence_min > 2")(facts(work_min=10, absence_min=0)) is False
+    assert compile_when("work_min % absence_min == 0")(facts(work_min=10, absence_min=0)) is False
+    assert compile_when("work_min > 'x'")(facts(work_min=10)) is False
+    assert compile_when("work_min / absence_min > 2")(facts(work_min=10, absence_min=2)) is True
+
+
+def write(path, data) -> None:
+    path.write_text(json.dumps(data) if isinstance(data, dict) else data, encoding="utf-8")
+    st = os.stat(path)
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000_000))  # a visible change
+
+
+def test_reload_picks_up_changes_and_keeps_rules_on_errors(tmp_path):
+    path = tmp_path / "reminders.json"
+    rules = PolicyFile(path)
+    assert rules.policy == default_policy() and rules.error is None
+
+    write(path, {"break_free_min": 10, "reminders": [{"name": "lookfar", "every_min": 25}]})
+    assert rules.reload()
+    assert rules.policy.break_free_min == 10
+    assert [r.every_min for r in rules.policy.reminders] == [25]
+    assert not rules.reload()  # unchanged file: only a stat
+    good = rules.policy
+
+    write(path, {"reminders": [{"name": "lookfar", "every_min": 25, "when": "bogus > 1"}]})
+    assert not rules.reload()
+    assert rules.policy is good
+    assert "unknown name 'bogus'" in rules.error
+
+    write(path, "{not json")
+    assert not rules.reload()
+    assert rules.policy is good and rules.error
+
+    write(path, {"reminders": [{"name": "standup", "every_min": 45}]})
+    assert rules.reload()
+    assert rules.error is None
+    assert [r.name for r in rules.policy.reminders] == ["standup"]
+
+    path.unlink()
+    assert rules.reload()
+    assert rules.policy == default_policy()
@@ -0,0 +1,108 @@
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from presence import PresenceService
+
+
+class StubGraph:
+    """Serves scripted (status, headers, body) responses in turn; the last repeats."""
+
+    def __init__(self, *responses):
+        self.responses = list(responses)
+        self.auth = []
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                stub.auth.append(self.headers.get("Authorization"))
+                status, headers, body = stub.responses.pop(0) if len(stub.responses) > 1 else stub.responses[0]
+                data = json.dumps(body).encode()
+                self.send_response(status)
+                for k, v in headers.items():
+                    self.send_header(k, v)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_port}/me/presence"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+IN_CALL = (200, {}, {"activity": "InACall"})
+AVAILABLE = (200, {}, {"activity": "Available"})
+
+
+@pytest.fixture
+def graph():
+    stubs = []
+
+    def make(*responses):
+        stubs.append(StubGraph(*responses))
+        return stubs[-1]
+
+    yield make
+    for stub in stubs:
+        stub.close()
+
+
+def wait_for(predicate, timeout=3.0):
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.01)
+
+
+def test_call_ends_with_a_transition_when_the_cache_expires(graph):
+    stub = graph(IN_CALL, (503, {}, {}))
+    service = PresenceService(stub.url, "tok", interval=0.05, ttl=0.3, max_backoff=0.1)
+    seen = []
+    service.subscribe(seen.append)
+    service.start()
+    try:
+        wait_for(lambda: seen == [True])
+        assert service.in_call()
+        wait_for(lambda: seen == [True, False])
+        assert not service.in_call()
+        assert service.failures >= 1
+    finally:
+        service.stop()
+
+
+def test_backoff_doubles_honours_retry_after_and_resets(graph):
+    stub = graph((429, {"Retry-After": "7"}, {}), (503, {}, {}), (500, {}, {}), AVAILABLE)
+    service = PresenceService(stub.url, "tok", interval=1.0, max_backoff=3.0)
+    assert service._fetch() == 7.0
+    assert service._fetch() == 2.0
+    assert service._fetch() == 3.0  # capped
+    assert service._fetch() is None
+    assert service.activity() == "Available"
+    assert service._fetch() is None
+    assert service.failures == 3
+    assert stub.auth == ["Bearer tok"] * 5
+
+
+def test_rejected_token_drops_the_cached_call(graph):
+    stub = graph(IN_CALL, (401, {}, {"error": {"code": "InvalidAuthenticationToken"}}))
+    service = PresenceService(stub.url, "expired", interval=1.0, max_backoff=4.0)
+    seen = []
+    service.subscribe(seen.append)
+    assert service._fetch() is None
+    assert service.in_call()
+    assert service._fetch() == 1.0
+    assert service._fetch() == 2.0  # keeps backing off while the token is rejected
+    assert service.activity() is None
+    assert seen == [True, False]
+    assert service.failures == 2
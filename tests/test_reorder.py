@@ -0,0 +1,134 @@
+"""Property tests for WorkTracker's reorder buffer and late-event refold.
+
+Each test folds a random day in time order for the expected state, then
+feeds the same events to a tracker in a seeded random arrival order and
+checks that it ends in exactly that state.
+"""
+
+import random
+from datetime import datetime, timedelta
+from typing import List, Tuple
+
+import pytest
+
+from clock import EventClock
+from engine import DayState, Rules, apply_event
+from ingest import EventIngestor
+from tracker import WorkTracker
+
+T0 = datetime(2026, 3, 2, 8, 0)
+SEEDS = range(25)
+Event = Tuple[datetime, str, float]
+TRANSITIONS = ("start_work", "break_start", "break_end", "youtube_start", "youtube_stop")
+
+
+class ManualClock:
+    def __init__(self, now: datetime) -> None:
+        self.now = now
+
+    def event_clock(self) -> EventClock:
+        return EventClock(wall=lambda: self.now, mono=lambda: (self.now - T0).total_seconds())
+
+
+def random_day(rnd: random.Random) -> List[Event]:
+    """Start, input runs, breaks and YouTube in between, end; at most one
+    event per second, all before midnight."""
+    t = T0 + timedelta(minutes=rnd.randint(0, 60))
+    events: List[Event] = [(t, "start_work", 0.0)]
+    for _ in range(rnd.randint(20, 80)):
+        if t.hour >= 20:
+            break
+        t += timedelta(seconds=rnd.randint(1, 900))
+        r = rnd.random()
+        if r < 0.6:
+            events.append((t, "active", float(rnd.randint(1, 60))))
+        elif r < 0.85:
+            events.append((t, "break_start", 0.0))
+            t += timedelta(seconds=rnd.randint(1, 3600))
+            events.append((t, "break_end", 0.0))
+        else:
+            events.append((t, "youtube_start", 0.0))
+            t += timedelta(seconds=rnd.randint(1, 1200))
+            events.append((t, "youtube_stop", 0.0))
+    events.append((t + timedelta(seconds=1), "end_work", 0.0))
+    return events
+
+
+def fold(events: List[Event], rules: Rules) -> DayState:
+    state = DayState(day=T0.date())
+    for ts, kind, value in sorted(events, key=lambda e: e[0]):
+        state, _ = apply_event(state, kind, ts, rules, value)
+    return state
+
+
+def deliver(events: List[Event], rnd: random.Random, max_delay_s: float, reorder_s: float) -> WorkTracker:
+    """Each event arrives up to ``max_delay_s`` after it happened."""
+    clock = ManualClock(T0)
+    tracker = WorkTracker(clock=clock.event_clock(), reorder_s=reorder_s)
+    arrivals = sorted(
+        ((ts + timedelta(seconds=rnd.uniform(0, max_delay_s)), i) for i, (ts, _, _) in enumerate(events))
+    )
+    for at, i in arrivals:
+        clock.now = max(clock.now, at)
+        tracker.apply_events([events[i]])
+    clock.now = max(clock.now, events[-1][0]) + timedelta(seconds=reorder_s)
+    tracker.release()
+    return tracker
+
+
+@pytest.mark.parametrize("seed", SEEDS)
+def test_out_of_order_within_window_commits_in_order(seed):
+    rnd = random.Random(seed)
+    events = random_day(rnd)
+    tracker = deliver(events, rnd, max_delay_s=30, reorder_s=30)
+    assert tracker.state == fold(events, tracker.rules)
+    assert tracker.late_events == 0
+
+
+@pytest.mark.parametrize("seed", SEEDS)
+def test_late_beyond_window_refolds_the_day(seed):
+    rnd = random.Random(seed)
+    events = random_day(rnd)
+    tracker = deliver(events, rnd, max_delay_s=1800, reorder_s=2)
+    assert tracker.state == fold(events, tracker.rules)
+    assert tracker.late_events > 0
+
+
+@pytest.mark.parametrize("seed", SEEDS)
+def test_duplicate_transitions_change_nothing(seed):
+    rnd = random.Random(seed)
+    events = random_day(rnd)
+    copies = [e for e in events if e[1] in TRANSITIONS and rnd.random() < 0.5]
+    tracker = deliver(events + copies, rnd, max_delay_s=600, reorder_s=5)
+    assert tracker.state == fold(events, tracker.rules)
+
+
+@pytest.mark.parametrize("seed", SEEDS)
+def test_retried_batches_apply_once(seed):
+    rnd = random.Random(seed)
+    events = [e for e in random_day(rnd) if e[1] != "active"]
+    items = [{"id": str(i), "type": kind, "ts": ts.isoformat()} for i, (ts, kind, _) in enumerate(events)]
+    clock = ManualClock(events[-1][0])
+    tracker = WorkTracker(clock=clock.event_clock(), reorder_s=2)
+    ingestor = EventIngestor(tracker, lambda rows: None)
+    batches = [items[i:i + 7] for i in range(0, len(items), 7)]
+    sent = 0
+    for batch in batches + rnd.sample(batches, len(batches)):  # each batch retried once
+        sent += ingestor.ingest(rnd.sample(batch, len(batch)))["accepted"]
+    tracker.release(force=True)
+    assert sent == len(items)
+    assert tracker.state == fold(events, tracker.rules)
+
+
+def test_events_of_a_past_day_leave_today_alone():
+    rnd = random.Random(0)
+    events = random_day(rnd)
+    clock = ManualClock(events[-1][0])
+    tracker = WorkTracker(clock=clock.event_clock(), reorder_s=2)
+    tracker.apply_events(events)
+    tracker.release(force=True)
+    before = tracker.state
+    tracker.apply_events([(T0 - timedelta(days=1), "break_start", 0.0)])
+    tracker.release(force=True)
+    assert tracker.state == before
+    assert tracker.past_events == 1
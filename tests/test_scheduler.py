@@ -0,0 +1,72 @@
+import threading
+
+from compaction import LockRetry
+from scheduler import Scheduler
+
+
+class FakeClock:
+    def __init__(self) -> None:
+        self.t = 0.0
+
+    def __call__(self) -> float:
+        return self.t
+
+
+def test_blocking_timer_does_not_overlap_itself():
+    clock, release = FakeClock(), threading.Event()
+    running, overlaps = [], []
+
+    def job():
+        if running:
+            overlaps.append(True)
+        running.append(True)
+        release.wait(5)
+        running.pop()
+
+    sched = Scheduler(clock=clock, workers=2)
+    sched.add("maintenance", job, interval=60, blocking=True)
+    for _ in range(3):
+        clock.t += 60
+        sched.run_due()
+    stats = sched.stats()["maintenance"]
+    assert (stats["fired"], stats["skipped"]) == (1, 2)
+    release.set()
+    sched.stop()
+    assert not overlaps
+
+
+def test_retry_moves_the_same_timer():
+    clock, results, runs = FakeClock(), [False, False, True], []
+    sched = Scheduler(clock=clock, workers=0)
+
+    def job():
+        runs.append(clock.t)
+        return results.pop(0)
+
+    retry = LockRetry(job, lambda delay, _fn: sched.after("maintenance", delay), first=15, max_delay=600)
+    sched.add("maintenance", retry, interval=600, blocking=True)
+    for t in (600, 615, 645):
+        clock.t = t
+        assert sched.run_due() == 1
+    assert runs == [600, 615, 645]
+    assert (retry.retries, retry.delay) == (2, 0.0)
+    assert sched.due_in("maintenance") == 600  # back on its interval
+
+
+def test_lock_retry_calls_do_not_overlap():
+    entered, release = threading.Event(), threading.Event()
+    scheduled = []
+
+    def job():
+        entered.set()
+        release.wait(5)
+        return False
+
+    retry = LockRetry(job, lambda delay, _fn: scheduled.append(delay), first=15)
+    t = threading.Thread(target=retry)
+    t.start()
+    entered.wait(5)
+    assert retry() is False  # skipped: the running call owns the retry
+    release.set()
+    t.join()
+    assert scheduled == [15] and retry.retries == 1
@@ -0,0 +1,87 @@
+import time
+from datetime import datetime, timedelta
+
+from clock import EventClock, Stamp
+from session import SessionPipeline
+
+T0 = datetime(2026, 3, 2, 12, 0)
+
+
+def stamp(s: float) -> Stamp:
+    return Stamp(T0 + timedelta(seconds=s), s)
+
+
+def pipeline(debounce_s: float = 2.0):
+    applied = []
+    p = SessionPipeline(
+        on_lock=lambda at: applied.append(("lock", at)),
+        on_unlock=lambda at: applied.append(("unlock", at)),
+        debounce_s=debounce_s,
+    )
+    return p, applied
+
+
+def test_lock_undone_within_debounce_cancels_out():
+    p, applied = pipeline()
+    p.accept("lock", stamp(0))
+    p.accept("unlock", stamp(1.5))
+    assert p.expire(10) is None
+    assert applied == []
+    assert p.flaps == 1
+    assert p.stats()["raw"] == {"lock": 1, "unlock": 1}
+    assert p.stats()["applied"] == {}
+
+
+def test_repeats_of_the_same_state_are_dropped():
+    p, applied = pipeline()
+    p.accept("lock", stamp(0))
+    p.accept("lock", stamp(0.5))  # repeat of the pending event
+    assert p.expire(2) is None
+    p.accept("lock", stamp(5))  # repeat of the applied state
+    assert applied == [("lock", stamp(0))]
+    assert p.duplicates == 2
+    assert p.stats()["raw"] == {"lock": 3}
+    assert p.stats()["applied"] == {"lock": 1}
+    assert p.state == "lock"
+
+
+def test_applied_events_keep_their_original_stamps():
+    p, applied = pipeline()
+    p.accept("lock", stamp(0))
+    assert p.expire(1) == 1.0  # still pending, one second to go
+    p.accept("unlock", stamp(600))  # lasted: applies the lock, unlock pending
+    assert p.expire(700) is None
+    assert applied == [("lock", stamp(0)), ("unlock", stamp(600))]
+    assert p.stats()["state"] == "unlock" and p.stats()["pending"] is None
+
+
+def test_pending_event_is_applied_on_stop():
+    applied = []
+    p = SessionPipeline(
+        on_lock=lambda at: applied.append(("lock", at)),
+        on_unlock=lambda at: applied.append(("unlock", at)),
+        clock=EventClock(),
+        debounce_s=3600,
+    )
+    p.start()
+    p.lock()
+    deadline = time.monotonic() + 5
+    while p.pending is None and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert applied == []
+    p.stop()
+    assert [kind for kind, _ in applied] == ["lock"]
+    assert p.stats()["applied"] == {"lock": 1}
+
+
+def test_a_failing_handler_does_not_stop_the_pipeline():
+    def fail(at):
+        raise RuntimeError("tracker down")
+
+    applied = []
+    p = SessionPipeline(on_lock=fail, on_unlock=lambda at: applied.append(at))
+    p.accept("lock", stamp(0))
+    p.accept("unlock", stamp(10))
+    p.expire(20)
+    assert p.errors == 1
+    assert applied == [stamp(10)]
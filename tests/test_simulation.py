@@ -0,0 +1,16 @@
+from datetime import datetime
+
+from simulation import Simulation
+
+
+def test_simulated_days_have_fixed_totals():
+    sim = Simulation(datetime(2031, 1, 6))
+    days = sim.run_days(3, seed=7)
+    totals = [(d["work_minutes"], d["break_minutes"], d["absence_minutes"]) for d in days]
+    assert totals == [(592.5, 694.1, 485.0), (633.5, 628.0, 460.0), (591.8, 677.2, 514.0)]
+    assert [d["shown"] for d in days] == [
+        {"lookfar": 24, "standup": 0},
+        {"lookfar": 23, "standup": 1},
+        {"lookfar": 24, "standup": 3},
+    ]
+    assert [answer for _, answer in sim.questions] == [True, True, True]
@@ -0,0 +1,113 @@
+from datetime import datetime, timedelta
+
+from clock import EventClock
+from engine import Rules
+from state_store import StateStore
+from tracker import WorkTracker
+
+T0 = datetime(2026, 3, 2, 9, 0)
+
+
+def store(tmp_path, compact_every: int = 64) -> StateStore:
+    return StateStore(tmp_path / "state.json", tmp_path / "tail.jsonl", compact_every=compact_every)
+
+
+def tracker(tmp_path, now: datetime) -> WorkTracker:
+    return WorkTracker(
+        store=store(tmp_path, compact_every=4),
+        clock=EventClock(wall=lambda: now, mono=lambda: (now - T0).total_seconds()),
+        reorder_s=0,
+        rules=Rules(break_free=timedelta(minutes=10)),
+    )
+
+
+def test_tail_entries_covered_by_the_snapshot_are_not_replayed(tmp_path):
+    s = store(tmp_path)
+    s.append("start_work", T0, {})
+    s.append("break_start", T0 + timedelta(minutes=5), {})
+    before_compact = s.tail.path.read_bytes()
+    s.compact({"day": "2026-03-02", "marker": "snapshot"})
+    # a crash after the snapshot was written but before the tail was truncated
+    s.tail.close()
+    s.tail.path.write_bytes(before_compact)
+    s.append("break_end", T0 + timedelta(minutes=20), {})
+
+    again = store(tmp_path)
+    snap, tail = again.load()
+    assert snap["marker"] == "snapshot"
+    assert [(seq, kind) for seq, kind, _, _ in tail] == [(3, "break_end")]
+    assert again.seq == 3
+
+
+def test_a_torn_last_line_is_skipped_and_repaired(tmp_path):
+    s = store(tmp_path)
+    s.append("start_work", T0, {})
+    s.append("break_start", T0 + timedelta(minutes=5), {})
+    s.tail.close()
+    with s.tail.path.open("a", encoding="utf-8") as f:
+        f.write('{"seq": 3, "kind": "break_e')  # the crash hit mid-append
+
+    again = store(tmp_path)
+    _, tail = again.load()
+    assert [kind for _, kind, _, _ in tail] == ["start_work", "break_start"]
+    again.append("break_end", T0 + timedelta(minutes=20), {})
+
+    _, tail = store(tmp_path).load()
+    assert [(seq, kind) for seq, kind, _, _ in tail] == [(1, "start_work"), (2, "break_start"), (3, "break_end")]
+
+
+def test_state_is_restored_after_a_restart(tmp_path):
+    now = T0 + timedelta(hours=3)
+    first = tracker(tmp_path, now)
+    first.start_work(T0)
+    for minute in range(1, 8):  # more transitions than compact_every
+        first.apply_events([(T0 + timedelta(minutes=minute), "active", 60.0)])
+    first.break_start(T0 + timedelta(minutes=30))
+    first.break_end(T0 + timedelta(minutes=55))
+    first.break_start(T0 + timedelta(minutes=90))
+    first.release(force=True)
+    expected = first.state
+
+    # no checkpoint: the process died; snapshot plus tail must be enough
+    second = tracker(tmp_path, now)
+    assert second.state == expected
+    assert second.state.in_break and second.state.break_started == T0 + timedelta(minutes=90)
+    assert second.state.absence_total == timedelta(minutes=15)
+    second.break_end(T0 + timedelta(minutes=95))
+    second.release(force=True)
+    assert tracker(tmp_path, now).state == second.state
+
+
+def test_with_a_writer_the_caller_never_touches_the_disk(tmp_path, monkeypatch):
+    import threading
+
+    from writer import LogWriter
+
+    writer = LogWriter()
+    s = StateStore(tmp_path / "state.json", tmp_path / "tail.jsonl", writer=writer)
+    threads = []
+    for name in ("append_many", "sync"):
+        real = getattr(s.tail, name)
+
+        def record(*args, _real=real):
+            threads.append(threading.current_thread().name)
+            return _real(*args)
+
+        monkeypatch.setattr(s.tail, name, record)
+    s.append("start_work", T0, {})
+    assert writer.flush()
+    writer.stop()
+    assert threads and set(threads) == {"wwa-log-writer"}
+    _, tail = store(tmp_path).load()
+    assert [kind for _, kind, _, _ in tail] == ["start_work"]
+
+
+def test_a_full_writer_queue_falls_back_to_a_direct_append(tmp_path):
+    class Full:
+        def submit(self, journal, row):
+            return False
+
+    s = StateStore(tmp_path / "state.json", tmp_path / "tail.jsonl", writer=Full())
+    s.append("start_work", T0, {})
+    _, tail = store(tmp_path).load()
+    assert [kind for _, kind, _, _ in tail] == ["start_work"]
@@ -0,0 +1,62 @@
+from types import SimpleNamespace
+
+from app import create_app
+from broadcast import StatusBroadcaster
+
+
+def test_streams_over_the_cap_are_refused():
+    broadcaster = StatusBroadcaster()
+    broadcaster.publish({"work_minutes": 1.0})
+    client = create_app(SimpleNamespace(broadcaster=broadcaster), max_streams=2).test_client()
+
+    first = client.get("/stream", buffered=False)
+    second = client.get("/stream", buffered=False)
+    assert first.status_code == second.status_code == 200
+    refused = client.get("/stream")
+    assert refused.status_code == 503
+    assert refused.headers["Retry-After"]
+    assert broadcaster.subscribers() == 2
+
+    first.close()
+    assert broadcaster.subscribers() == 1
+    third = client.get("/stream", buffered=False)
+    assert third.status_code == 200
+    assert next(third.response) == b"retry: 3000\n\n"
+    second.close()
+    third.close()
+    assert broadcaster.subscribers() == 0
+
+
+
+def test_a_slow_offer_cannot_reorder_deltas():
+    import threading
+
+    from broadcast import Subscription
+
+    broadcaster = StatusBroadcaster()
+    stalled, second_done = threading.Event(), threading.Event()
+
+    class SlowFirstOffer(Subscription):
+        offers = 0
+
+        def offer(self, delta):
+            self.offers += 1
+            if self.offers == 1:  # the first publisher stalls between diff and offer
+                stalled.set()
+                second_done.wait(0.5)
+            super().offer(delta)
+
+    sub = SlowFirstOffer()
+    broadcaster._subs.append(sub)
+    first = threading.Thread(target=broadcaster.publish, args=({"work_minutes": 1.0},))
+    first.start()
+
+    def second():
+        broadcaster.publish({"work_minutes": 2.0})
+        second_done.set()
+
+    stalled.wait(2)
+    threading.Thread(target=second).start()
+    first.join()
+    second_done.wait(2)
+    assert sub.get(timeout=0) == {"work_minutes": 2.0} == broadcaster.current()
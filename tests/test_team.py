@@ -0,0 +1,71 @@
+from datetime import date
+
+import pytest
+
+import team_server
+from team import TeamHub, TeamStore
+
+
+@pytest.fixture
+def hub(tmp_path):
+    return TeamHub(TeamStore(tmp_path / "team.sqlite3"), shards=2)
+
+
+def test_days_are_counted_in_the_users_time_zone(hub):
+    events = [
+        {"id": "a", "kind": "start_work", "ts": "2026-03-02T23:00:00+09:00"},
+        {"id": "b", "kind": "active", "ts": "2026-03-02T23:30:00+09:00", "value": 600},
+        {"id": "c", "kind": "end_work", "ts": "2026-03-02T23:50:00+09:00"},
+    ]
+    assert hub.ingest("tokyo", events)["accepted"] == 3
+    (day,) = hub.store.user_days("tokyo", date(2026, 3, 1), date(2026, 3, 3))
+    assert day["day"] == "2026-03-02"
+    assert day["started"].startswith("2026-03-02T23:00")
+    assert day["work_minutes"] == 10.0
+
+
+def test_cors_only_for_configured_origins(hub):
+    closed = team_server.create_team_app(hub, token="t", origins=[]).test_client()
+    assert "Access-Control-Allow-Origin" not in closed.get("/team/now", headers={"Origin": "https://evil.example"}).headers
+
+    app = team_server.create_team_app(hub, token="t", origins=["https://intranet.example"]).test_client()
+    allowed = app.get("/team/now", headers={"Origin": "https://intranet.example"})
+    assert allowed.headers["Access-Control-Allow-Origin"] == "https://intranet.example"
+    assert "Access-Control-Allow-Origin" not in app.get("/team/now", headers={"Origin": "https://evil.example"}).headers
+
+
+def test_ingest_requires_the_token(hub):
+    client = team_server.create_team_app(hub, token="secret").test_client()
+    event = [{"id": "x", "kind": "start_work", "ts": "2026-03-02T09:00:00+01:00"}]
+    assert client.post("/team/u/events", json=event).status_code == 401
+    ok = client.post("/team/u/events", json=event, headers={"Authorization": "Bearer secret"})
+    assert ok.status_code == 200
+
+
+def test_refuses_to_listen_beyond_loopback_without_a_token(monkeypatch):
+    monkeypatch.setattr(team_server, "TEAM_TOKEN", None)
+    with pytest.raises(SystemExit):
+        team_server.main(["--host", "0.0.0.0"])
+    assert team_server._loopback("127.0.0.1") and team_server._loopback("::1")
+    assert team_server._loopback("localhost") and not team_server._loopback("10.0.0.5")
+
+
+def test_read_endpoints_require_the_token(hub):
+    client = team_server.create_team_app(hub, token="secret").test_client()
+    auth = {"Authorization": "Bearer secret"}
+    for url in ("/team/now", "/team/daily", "/team/summary", "/team/stats", "/team/u/days", "/team/u/status"):
+        assert client.get(url).status_code == 401, url
+        assert client.get(url, headers={"Authorization": "Bearer wrong"}).status_code == 401, url
+    assert client.get("/team/now", headers=auth).status_code == 200
+    assert client.get("/team").status_code == 200
+    open_client = team_server.create_team_app(hub, token=None).test_client()
+    assert open_client.get("/team/now").status_code == 200
+
+
+def test_status_of_unknown_users_creates_no_tracker(hub):
+    client = team_server.create_team_app(hub, token=None).test_client()
+    for i in range(50):
+        assert client.get(f"/team/nobody{i}/status").status_code == 404
+    assert hub.stats()["users"] == 0
+    hub.ingest("u", [{"id": "x", "kind": "start_work", "ts": "2026-03-02T09:00:00+01:00"}])
+    assert client.get("/team/u/status").status_code == 200
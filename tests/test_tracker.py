@@ -0,0 +1,53 @@
+from datetime import datetime, timedelta
+
+from clock import EventClock
+from tracker import Rules, WorkTracker
+
+DAY = datetime(2026, 3, 2, 9, 0)
+IDLE = timedelta(seconds=60)
+
+
+def tracker_at(now: datetime) -> WorkTracker:
+    # No free break portion, so break time is never credited as work
+    rules = Rules(break_free=timedelta(0))
+    return WorkTracker(rules=rules, clock=EventClock(wall=lambda: now, mono=lambda: 0.0))
+
+
+def feed(tracker: WorkTracker, inputs, until: datetime) -> dict:
+    """One-second inputs at ``inputs``, recorded once a minute as the agent does."""
+    inputs = sorted(inputs)
+    snap, tick = {}, DAY
+    while tick < until:
+        end = tick + timedelta(minutes=1)
+        runs = [(t, t + timedelta(seconds=1)) for t in inputs if tick <= t < end]
+        snap = tracker.record_activity(end, runs, IDLE)
+        tick = end
+    return snap
+
+
+def test_sparse_input_counts_as_work():
+    tracker = tracker_at(DAY + timedelta(hours=8))
+    tracker.start_work(at=DAY)
+    inputs = [DAY + timedelta(seconds=s) for s in range(0, 30 * 60, 5)]
+    snap = feed(tracker, inputs, DAY + timedelta(minutes=30))
+    assert snap["work_minutes"] >= 29.9
+    assert snap["break_minutes"] == 0
+
+
+def test_long_gap_is_a_break_not_work():
+    tracker = tracker_at(DAY + timedelta(hours=8))
+    tracker.start_work(at=DAY)
+    inputs = [DAY + timedelta(seconds=s) for s in range(0, 10 * 60, 5)]
+    inputs += [DAY + timedelta(minutes=15, seconds=s) for s in range(0, 5 * 60, 5)]
+    snap = feed(tracker, inputs, DAY + timedelta(minutes=20))
+    assert 14.8 <= snap["work_minutes"] <= 15.0
+    assert 5.0 <= snap["break_minutes"] <= 5.1
+
+
+def test_pause_after_unlock_counts_as_work():
+    tracker = tracker_at(DAY + timedelta(hours=8))
+    tracker.start_work(at=DAY)
+    tracker.break_start(at=DAY)
+    tracker.break_end(at=DAY + timedelta(minutes=1))
+    snap = feed(tracker, [DAY + timedelta(minutes=1, seconds=30)], DAY + timedelta(minutes=2))
+    assert snap["work_minutes"] == 0.5
@@ -0,0 +1,36 @@
+import sys
+
+import pytest
+
+import notifier
+from ui import UiThread
+
+pytestmark = pytest.mark.skipif(sys.platform == "win32", reason="needs a platform where Tk wants DISPLAY")
+
+
+@pytest.fixture
+def headless_ui(monkeypatch):
+    monkeypatch.delenv("DISPLAY", raising=False)
+    monkeypatch.delenv("WAYLAND_DISPLAY", raising=False)
+    ui = UiThread()
+    monkeypatch.setattr(notifier, "ui", ui)
+    return ui
+
+
+def test_ui_without_display_is_unavailable(headless_ui):
+    assert headless_ui.available() is False
+    with pytest.raises(RuntimeError):
+        headless_ui.call(lambda: None, timeout=1)
+
+
+def test_ask_yes_no_answers_the_default_without_tk(headless_ui):
+    answers = []
+    notifier.ask_yes_no("Koniec pracy", "?", answers.append)
+    notifier.ask_yes_no("Koniec pracy", "?", answers.append, default=True)
+    assert answers == [False, True]
+
+
+def test_stop_without_a_tk_root_returns(headless_ui):
+    UiThread().stop()
+    assert headless_ui.available() is False
+    headless_ui.stop()
@@ -0,0 +1,77 @@
+import threading
+import time
+
+from writer import LogWriter
+
+
+class StubJournal:
+    """Records appends and syncs; ``fail`` makes appends raise, ``gate``
+    holds them until set."""
+
+    def __init__(self, fail: bool = False, gate: threading.Event = None) -> None:
+        self.fail = fail
+        self.gate = gate
+        self.rows = []
+        self.syncs = 0
+
+    def append_many(self, rows):
+        if self.gate is not None:
+            self.gate.wait(5)
+        if self.fail:
+            raise OSError("disk full")
+        self.rows.extend(rows)
+
+    def sync(self):
+        self.syncs += 1
+
+
+def test_failed_appends_are_not_counted_as_written():
+    writer = LogWriter()
+    good, bad = StubJournal(), StubJournal(fail=True)
+    writer.submit_many(good, [{"n": 1}, {"n": 2}])
+    writer.submit_many(bad, [{"n": 3}, {"n": 4}, {"n": 5}])
+    assert writer.flush()
+    writer.stop()
+    stats = writer.stats()
+    assert stats["submitted"] == 5
+    assert stats["written"] == 2
+    assert stats["errors"] == 3
+    assert good.rows == [{"n": 1}, {"n": 2}]
+
+
+def test_flush_without_wait_does_not_block_on_a_full_queue():
+    gate = threading.Event()
+    journal = StubJournal(gate=gate)
+    writer = LogWriter(max_queue=1, batch_size=1)
+    writer.submit(journal, {"n": 1})
+    deadline = time.monotonic() + 5
+    while writer.stats()["queue_depth"] and time.monotonic() < deadline:
+        time.sleep(0.01)  # the writer took row 1 and is stuck appending it
+    assert writer.submit(journal, {"n": 2})
+    t0 = time.monotonic()
+    assert writer.flush(wait=False) is False
+    assert time.monotonic() - t0 < 0.5
+    gate.set()
+    writer.stop()
+    assert journal.rows == [{"n": 1}, {"n": 2}]
+    assert journal.syncs >= 1
+
+
+def test_counters_are_exact_under_concurrent_submits():
+    journal = StubJournal()
+    writer = LogWriter(max_queue=100000)
+
+    def produce():
+        for i in range(2000):
+            writer.submit(journal, {"n": i})
+
+    threads = [threading.Thread(target=produce) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert writer.flush()
+    writer.stop()
+    stats = writer.stats()
+    assert stats["submitted"] + stats["dropped"] == 16000
+    assert stats["written"] == stats["submitted"] == len(journal.rows)
@@ -0,0 +1,107 @@
+import os
+
+import pytest
+
+import xlsx_export
+from journal import Journal
+from xlsx_export import MonthlyExport
+
+openpyxl = pytest.importorskip("openpyxl")
+
+COLUMNS = ["timestamp", "event"]
+
+
+def row(ts: str, event: str = "active") -> dict:
+    return {"timestamp": ts, "event": event}
+
+
+@pytest.fixture
+def journal(tmp_path):
+    j = Journal(tmp_path / "aktywnosc.jsonl")
+    yield j
+    j.close()
+
+
+def exporter(journal, tmp_path) -> MonthlyExport:
+    return MonthlyExport(journal, tmp_path / "aktywnosc.xlsx", COLUMNS, tmp_path / "export.json")
+
+
+def sheet(export: MonthlyExport, month: str) -> list:
+    wb = openpyxl.load_workbook(export.path_for(month), read_only=True)
+    try:
+        return [list(r) for r in wb.active.iter_rows(values_only=True)]
+    finally:
+        wb.close()
+
+
+def test_rotates_to_a_new_file_each_month(journal, tmp_path):
+    export = exporter(journal, tmp_path)
+    journal.append_many([row("2026-10-30T09:00:00"), row("2026-10-31T09:00:00")])
+    assert export.export()
+    journal.append_many([row("2026-11-01T09:00:00")])
+    assert export.export()
+    assert sheet(export, "2026-10") == [COLUMNS, ["2026-10-30T09:00:00", "active"], ["2026-10-31T09:00:00", "active"]]
+    assert sheet(export, "2026-11") == [COLUMNS, ["2026-11-01T09:00:00", "active"]]
+    assert export.stats()["files_written"] == 2  # October was not rewritten for November's row
+
+
+def test_a_late_row_lands_in_its_own_months_file(journal, tmp_path):
+    export = exporter(journal, tmp_path)
+    journal.append_many([row("2026-10-30T09:00:00"), row("2026-11-02T09:00:00")])
+    assert export.export()
+    journal.append_many([row("2026-10-31T17:00:00", "late")])
+    assert export.export()
+    assert sheet(export, "2026-10")[1:] == [["2026-10-30T09:00:00", "active"], ["2026-10-31T17:00:00", "late"]]
+    assert sheet(export, "2026-11")[1:] == [["2026-11-02T09:00:00", "active"]]
+
+
+def test_resumes_from_the_saved_offset_after_a_restart(journal, tmp_path):
+    journal.append_many([row("2026-11-01T09:00:00")])
+    first = exporter(journal, tmp_path)
+    assert first.export()
+    offset = first.stats()["offset"]
+
+    journal.append_many([row("2026-11-02T09:00:00")])
+    again = exporter(journal, tmp_path)
+    assert again.stats()["offset"] == offset
+    assert again.export()
+    assert again.stats()["rows_written"] == 2  # the month is read back, not the whole journal
+    assert sheet(again, "2026-11")[1:] == [["2026-11-01T09:00:00", "active"], ["2026-11-02T09:00:00", "active"]]
+
+
+def test_a_rewritten_journal_rebuilds_every_month(journal, tmp_path):
+    export = exporter(journal, tmp_path)
+    journal.append_many([row("2026-10-30T09:00:00"), row("2026-11-02T09:00:00")])
+    assert export.export()
+    journal.rewrite([row("2026-10-29T09:00:00", "folded"), row("2026-10-30T09:00:00"), row("2026-11-02T09:00:00")])
+    assert export.export()
+    assert sheet(export, "2026-10")[1:] == [["2026-10-29T09:00:00", "folded"], ["2026-10-30T09:00:00", "active"]]
+    assert sheet(export, "2026-11")[1:] == [["2026-11-02T09:00:00", "active"]]
+
+
+def test_a_locked_workbook_stays_pending_and_is_retried(journal, tmp_path, monkeypatch):
+    export = exporter(journal, tmp_path)
+    locked = export.path_for("2026-11")
+    real_replace = os.replace
+
+    def replace(src, dst):
+        if os.fspath(dst) == os.fspath(locked):
+            raise PermissionError(13, "locked by Excel", os.fspath(dst))
+        real_replace(src, dst)
+
+    monkeypatch.setattr(xlsx_export.os, "replace", replace)
+    journal.append_many([row("2026-10-31T09:00:00"), row("2026-11-01T09:00:00")])
+    assert export.export() is False
+    assert export.stats()["pending"] == ["2026-11"]
+    assert sheet(export, "2026-10")[1:] == [["2026-10-31T09:00:00", "active"]]
+    assert not locked.exists()
+
+    # a restart while it is locked must not lose the pending rows
+    export = exporter(journal, tmp_path)
+    assert export.export() is False
+
+    monkeypatch.setattr(xlsx_export.os, "replace", real_replace)
+    journal.append_many([row("2026-11-02T09:00:00")])
+    assert export.export()
+    assert export.stats()["pending"] == []
+    assert sheet(export, "2026-11")[1:] == [["2026-11-01T09:00:00", "active"], ["2026-11-02T09:00:00", "active"]]
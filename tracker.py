@@ -1,139 +1,289 @@
 from __future__ import annotations
 
-from dataclasses import dataclass
-from datetime import datetime, timedelta
+import heapq
+from bisect import bisect_right
+from copy import copy
+from datetime import date, datetime, time, timedelta
+from itertools import count
 from threading import Lock
-from typing import Optional
+from typing import Callable, Iterable, List, Optional, Tuple
 
-from config import BREAK_FREE_MIN
+from clock import EventClock, Stamp, When
+from engine import DayState, Rules, apply_event, canonical
+from state_store import StateStore
 
+__all__ = ["DayState", "EventClock", "Rules", "Stamp", "WorkTracker"]
 
-@dataclass
-class DayState:
-    day: datetime.date
-    start_ts: Optional[datetime] = None
-    end_ts: Optional[datetime] = None
-    work_effective: timedelta = timedelta(0)
-    break_total: timedelta = timedelta(0)
-    absence_total: timedelta = timedelta(0)
-    in_break: bool = False
-    break_started: Optional[datetime] = None
-    youtube_on: bool = False
-    yt_started: Optional[datetime] = None
+EventSink = Callable[[str, datetime, float], None]
+DayEvents = Callable[[date], Iterable[Tuple[datetime, str, float]]]
+Interval = Tuple[datetime, datetime]
 
-    @staticmethod
-    def _minutes(td: timedelta) -> float:
-        return td.total_seconds() / 60.0
 
-    def snapshot(self) -> dict:
-        return {
-            "work_minutes": round(self._minutes(self.work_effective), 1),
-            "break_minutes": round(self._minutes(self.break_total), 1),
-            "absence_minutes": round(self._minutes(self.absence_total), 1),
-        }
+class WorkTracker:
+    """Per-day work accounting with break free portion logic.
 
+    The state is the fold of timestamped events through ``engine.apply_event``.
+    With a ``StateStore`` every transition that changes state is persisted,
+    and the constructor restores today's state from the last snapshot plus
+    its tail. ``on_event`` receives each effective event for the history log
+    (under the lock); ``subscribe`` listeners are called after the lock is
+    released whenever a call changed the state.
 
-class WorkTracker:
-    """Per-day work accounting with break free portion logic."""
+    Transitions take the time the event happened: a ``clock.Stamp`` taken
+    when it was observed, a wall time, or nothing for now (on ``clock``).
+    Events wait ``reorder_s`` seconds in a buffer and are committed in time
+    order, so small delays between sources cost nothing; ``state`` includes
+    the buffered ones. An event older than today's last committed one (a
+    client that was offline) is inserted in time order and the day is folded
+    again from its events; ``history`` supplies the events recorded before a
+    restart for that. Events from past days only reach ``on_event``.
+    """
 
-    def __init__(self) -> None:
-        self.state = DayState(day=datetime.now().date())
+    def __init__(
+        self,
+        store: Optional[StateStore] = None,
+        rules: Optional[Rules] = None,
+        on_event: Optional[EventSink] = None,
+        history: Optional[DayEvents] = None,
+        clock: Optional[EventClock] = None,
+        reorder_s: float = 0.0,
+    ) -> None:
+        self.clock = clock or EventClock()
+        self.reorder = timedelta(seconds=reorder_s)
+        self._state = DayState(day=self.clock.now().date())
+        self.rules = rules or Rules()
         self._lock = Lock()
+        self._store = store
+        self._on_event = on_event
+        self._history = history
+        self._pending: List[Tuple[datetime, int, str, float]] = []  # reorder buffer (heap)
+        self._seq = count()
+        self._view: Optional[DayState] = None  # _state plus _pending, cached
+        self._today: List[Tuple[datetime, str, float]] = []  # every event committed today
+        self._complete = True  # _today holds the whole day
+        self.late_events = 0
+        self.past_events = 0
+        self._last_active: Optional[datetime] = None
+        self._listeners: List[Callable[[], None]] = []
+        self._changed = False
+        if store is not None:
+            self._restore(store)
+
+    @property
+    def state(self) -> DayState:
+        """Current state, including events still in the reorder buffer."""
+        with self._lock:
+            return self._current()
+
+    def _current(self) -> DayState:
+        if self._view is None:
+            view = self._state
+            if self._pending:
+                view = copy(view)  # apply_event updates in place
+                for ts, _, kind, value in sorted(self._pending):
+                    view, _ = apply_event(view, canonical(kind), ts, self.rules, value)
+            self._view = view
+        return self._view
+
+    def _restore(self, store: StateStore) -> None:
+        snap, tail = store.load()
+        if snap is not None:
+            try:
+                self._state = DayState.from_dict(snap)
+            except (KeyError, TypeError, ValueError):
+                pass
+            else:
+                self._complete = False  # the events behind the snapshot are not in memory
+        for _, kind, ts, value in tail:
+            self._apply(kind, ts, value)
+        self._rollover_if_needed()
+
+    def _rollover_if_needed(self, today: Optional[date] = None) -> None:
+        now = today or self.clock.now().date()
+        if self._state.day != now:
+            self._release(datetime.combine(now, time.min), inclusive=False)
+            self._state = DayState(day=now)
+            self._today, self._complete, self._view = [], True, None
 
-    def _rollover_if_needed(self) -> None:
-        now = datetime.now().date()
-        if self.state.day != now:
-            self.state = DayState(day=now)
+    def _apply(self, kind: str, ts: datetime, value: float = 0.0) -> bool:
+        """Apply one event at ``ts``. True if the state changed."""
+        self._state, changed = apply_event(self._state, canonical(kind), ts, self.rules, value)
+        self._today.append((ts, kind, value))
+        return changed
 
-    def start_work(self) -> dict:
+    def _refold(self, kind: str, ts: datetime, value: float) -> bool:
+        """Insert a late event into today's events and fold the day again."""
+        if not self._complete and self._history is not None:
+            known = set(self._today)
+            known.update(self._history(self._state.day))
+            self._today = sorted(known, key=lambda e: e[0])
+            self._complete = True
+        if not self._complete:
+            return self._apply(kind, ts, value)  # best effort: in arrival order
+        self._today.insert(bisect_right(self._today, ts, key=lambda e: e[0]), (ts, kind, value))
+        state = DayState(day=self._state.day)
+        for e_ts, e_kind, e_value in self._today:
+            state, _ = apply_event(state, canonical(e_kind), e_ts, self.rules, e_value)
+        changed, self._state = state != self._state, state
+        return changed
+
+    def _commit(self, kind: str, ts: datetime, value: float = 0.0) -> None:
+        """Apply and persist one event. Caller holds the lock."""
+        self._view = None
+        if ts.date() > self._state.day:
+            self._rollover_if_needed(ts.date())
+        elif ts.date() < self._state.day:
+            self.past_events += 1
+            if self._on_event is not None:
+                self._on_event(kind, ts, value)  # history only; replay_history picks it up
+            return
+        late = bool(self._today) and ts < self._today[-1][0]
+        self.late_events += late
+        if not (self._refold(kind, ts, value) if late else self._apply(kind, ts, value)):
+            return
+        self._changed = True
+        if self._store is not None:
+            if late:  # the tail is replayed in order on restore, so snapshot instead
+                self._store.compact(self._state.to_dict())
+            else:
+                self._store.append(kind, ts, self._state.to_dict(), value)
+        if self._on_event is not None:
+            self._on_event(kind, ts, value)
+
+    def _release(self, upto: Optional[datetime], inclusive: bool = True) -> None:
+        """Commit buffered events up to ``upto`` (all if None), oldest first."""
+        pending = self._pending
+        while pending and (
+            upto is None or pending[0][0] < upto or (inclusive and pending[0][0] == upto)
+        ):
+            ts, _, kind, value = heapq.heappop(pending)
+            self._commit(kind, ts, value)
+
+    def _submit(self, kind: str, ts: datetime, value: float = 0.0, now: Optional[datetime] = None) -> None:
+        """Buffer one event and commit those older than the reorder window."""
+        horizon = (now or self.clock.now()) - self.reorder
+        if not self._pending and ts <= horizon:
+            self._commit(kind, ts, value)
+            return
+        before = copy(self._current())
+        heapq.heappush(self._pending, (ts, next(self._seq), kind, value))
+        self._view = None
+        self._release(horizon)
+        if self._current() != before:  # ``state`` includes buffered events
+            self._changed = True
+
+    def _transition(self, kind: str, at: When = None) -> dict:
+        now = self.clock.now()
         with self._lock:
-            self._rollover_if_needed()
-            if not self.state.start_ts:
-                self.state.start_ts = datetime.now()
-            return self.state.snapshot()
+            ts = now if at is None else self.clock.resolve(at)
+            self._submit(kind, ts, now=now)
+            if kind == "break_end" and (self._last_active is None or ts > self._last_active):
+                self._last_active = ts  # back at the desk; the pause until input is work
+            snap = self._current().snapshot()
+        self._notify()
+        return snap
 
-    def end_work(self) -> dict:
+    def release(self, force: bool = False) -> None:
+        """Commit buffered events whose reorder window has passed; with
+        ``force`` all of them (e.g. before the session locks)."""
         with self._lock:
-            self._rollover_if_needed()
-            self._close_open_sessions()
-            self.state.end_ts = datetime.now()
-            return self.state.snapshot()
-
-    def _close_open_sessions(self) -> None:
-        now = datetime.now()
-        if self.state.in_break and self.state.break_started:
-            self._finish_break(now)
-        if self.state.youtube_on and self.state.yt_started:
-            self._finish_youtube(now)
-
-    def tick_active_minute(self) -> dict:
+            self._release(None if force else self.clock.now() - self.reorder)
+        self._notify()
+
+    def subscribe(self, listener: Callable[[], None]) -> None:
+        self._listeners.append(listener)
+
+    def _notify(self) -> None:
         with self._lock:
-            self._rollover_if_needed()
-            if not self.state.start_ts:
-                return self.state.snapshot()
-            if not self.state.in_break and not self.state.youtube_on:
-                self.state.work_effective += timedelta(minutes=1)
-            return self.state.snapshot()
+            changed, self._changed = self._changed, False
+        if changed:
+            for listener in self._listeners:
+                listener()
 
-    # Breaks
-    def break_start(self) -> dict:
+    def apply_events(self, events: Iterable[Tuple]) -> List[dict]:
+        """Apply (ts, kind) or (ts, kind, value) events under one lock
+        acquisition; they need not be in order.
+
+        Returns the snapshot after each event.
+        """
+        snaps = []
         with self._lock:
-            if not self.state.in_break:
-                self.state.in_break = True
-                self.state.break_started = datetime.now()
-            return self.state.snapshot()
+            for ts, kind, *value in events:
+                self._submit(kind, ts, *value)
+                snaps.append(self._current().snapshot())
+        self._notify()
+        return snaps
+
+    def start_work(self, at: When = None) -> dict:
+        return self._transition("start_work", at)
+
+    def end_work(self, at: When = None) -> dict:
+        return self._transition("end_work", at)
+
+    def tick_active_minute(self, at: When = None) -> dict:
+        return self._transition("active_minute", at)
 
-    def break_end(self) -> dict:
+    def record_activity(
+        self, end: datetime, runs: Iterable[Interval], idle_break: timedelta
+    ) -> dict:
+        """Integrate per-second activity observed up to ``end``.
+
+        ``runs`` are the active intervals since the previous call, in order.
+        Each run credits its length plus the gap since the previous input,
+        if that gap is shorter than ``idle_break``; a longer gap is a break
+        from the last active second. Activity during a break ends the break
+        at the first active second, and no activity for ``idle_break``
+        starts a break at the last active second. The gap after the last
+        input is credited once the next input shows it was not a break.
+        """
         with self._lock:
-            if self.state.in_break and self.state.break_started:
-                self._finish_break(datetime.now())
-            return self.state.snapshot()
-
-    def _finish_break(self, end: datetime) -> None:
-        assert self.state.break_started is not None
-        dur = end - self.state.break_started
-        self.state.break_total += dur
-        free = timedelta(minutes=BREAK_FREE_MIN)
-        if dur > free:
-            self.state.absence_total += (dur - free)
-            self.state.work_effective += free
-        else:
-            self.state.work_effective += dur
-        self.state.in_break = False
-        self.state.break_started = None
+            for a, b in runs:
+                last = self._last_active
+                if last is not None and last.date() == a.date() and not self._current().in_break:
+                    if a - last < idle_break:
+                        a = last  # a short pause between inputs is work too
+                    else:  # a break the idle check has not started yet
+                        self._submit("break_start", last)
+                if self._current().in_break:
+                    self._submit("break_end", a)
+                if b > a:
+                    self._submit("active", b, (b - a).total_seconds())
+                    self._last_active = b
+            last = self._last_active
+            if not self._current().in_break and (last is None or end - last >= idle_break):
+                self._submit("break_start", last if last and last.date() == end.date() else end)
+            snap = self._current().snapshot()
+        self._notify()
+        return snap
+
+    # Breaks
+    def break_start(self, at: When = None) -> dict:
+        return self._transition("break_start", at)
+
+    def break_end(self, at: When = None) -> dict:
+        return self._transition("break_end", at)
 
     # YouTube
-    def youtube_start(self) -> dict:
-        with self._lock:
-            if not self.state.youtube_on:
-                self.state.youtube_on = True
-                self.state.yt_started = datetime.now()
-            return self.state.snapshot()
+    def youtube_start(self, at: When = None) -> dict:
+        return self._transition("youtube_start", at)
+
+    def youtube_stop(self, at: When = None) -> dict:
+        return self._transition("youtube_stop", at)
 
-    def youtube_stop(self) -> dict:
+    # Persistence
+    def checkpoint(self) -> None:
+        """Commit the reorder buffer and write a full snapshot (e.g. on shutdown)."""
         with self._lock:
-            if self.state.youtube_on and self.state.yt_started:
-                self._finish_youtube(datetime.now())
-            return self.state.snapshot()
-
-    def _finish_youtube(self, end: datetime) -> None:
-        assert self.state.yt_started is not None
-        dur = end - self.state.yt_started
-        free = timedelta(minutes=BREAK_FREE_MIN)
-        if dur > free:
-            self.state.absence_total += (dur - free)
-            self.state.work_effective += free
-        else:
-            self.state.work_effective += dur
-        self.state.break_total += dur
-        self.state.youtube_on = False
-        self.state.yt_started = None
+            self._release(None)
+            if self._store is not None:
+                self._store.compact(self._state.to_dict())
 
     # Status
     def get_status(self) -> dict:
         with self._lock:
+            self._release(self.clock.now() - self.reorder)
             self._rollover_if_needed()
-            s = self.state
+            s = self._current()
             return {
                 "day": str(s.day),
                 "started": s.start_ts.isoformat() if s.start_ts else None,
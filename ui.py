@@ -0,0 +1,116 @@
+"""The agent's single Tk UI thread.
+
+Tk is not thread-safe and each ``tk.Tk()`` starts a new Tcl interpreter, so
+the agent owns exactly one hidden root on one thread. Other threads hand
+work over with ``submit`` (fire and forget) or ``call`` (wait for result);
+the UI thread drains the queue every ``poll_ms`` milliseconds.
+"""
+
+from __future__ import annotations
+
+import queue
+import threading
+from concurrent.futures import Future
+from typing import Any, Callable, Optional
+
+
+class UiThread:
+    def __init__(self, poll_ms: int = 50) -> None:
+        self.poll_ms = poll_ms
+        self.root: Any = None
+        self._q: "queue.Queue[tuple]" = queue.Queue()
+        self._thread: Optional[threading.Thread] = None
+        self._ready = threading.Event()
+        self._start_lock = threading.Lock()
+        self._error: Optional[BaseException] = None
+
+    def start(self) -> None:
+        with self._start_lock:
+            if self._thread is not None:
+                return
+            self._thread = threading.Thread(target=self._run, name="wwa-ui", daemon=True)
+            self._thread.start()
+        self._ready.wait()
+
+    def available(self) -> bool:
+        """Start the UI thread if needed; False when Tk cannot run here."""
+        self.start()
+        return self._error is None
+
+    def on_ui_thread(self) -> bool:
+        return threading.current_thread() is self._thread
+
+    def submit(self, fn: Callable[..., Any], *args: Any) -> Future:
+        """Run ``fn(*args)`` on the UI thread. Returns a Future for the result."""
+        future: Future = Future()
+        if self.on_ui_thread():
+            self._execute(fn, args, future)
+            return future
+        self.start()
+        if self._error is not None:
+            future.set_exception(RuntimeError(f"Tk UI unavailable: {self._error}"))
+            return future
+        self._q.put((fn, args, future))
+        return future
+
+    def call(self, fn: Callable[..., Any], *args: Any, timeout: Optional[float] = None) -> Any:
+        return self.submit(fn, *args).result(timeout)
+
+    def stop(self, timeout: float = 5.0) -> None:
+        """Quit the Tk main loop; later ``submit`` calls fail fast."""
+        thread = self._thread
+        if thread is None or self.root is None or self.on_ui_thread():
+            return
+        self.submit(self.root.quit)
+        thread.join(timeout)
+
+    def pending(self) -> int:
+        return self._q.qsize()
+
+    @staticmethod
+    def _execute(fn: Callable[..., Any], args: tuple, future: Future) -> None:
+        if not future.set_running_or_notify_cancel():
+            return
+        try:
+            future.set_result(fn(*args))
+        except BaseException as exc:  # surfaced to the submitter via the Future
+            future.set_exception(exc)
+
+    def _drain(self) -> None:
+        while True:
+            try:
+                fn, args, future = self._q.get_nowait()
+            except queue.Empty:
+                break
+            self._execute(fn, args, future)
+        self.root.after(self.poll_ms, self._drain)
+
+    def _run(self) -> None:
+        try:
+            import tkinter as tk
+        except ImportError as exc:  # Python built without Tk
+            self._error = exc
+            self._ready.set()
+            return
+        try:
+            self.root = tk.Tk()
+        except tk.TclError as exc:  # no display
+            self._error = exc
+            self._ready.set()
+            return
+        self.root.withdraw()
+        self.root.after(self.poll_ms, self._drain)
+        self._ready.set()
+        self.root.mainloop()
+        self._error = RuntimeError("stopped")
+        self.root.destroy()
+        self.root = None
+        while True:  # calls that arrived after quit
+            try:
+                _, _, future = self._q.get_nowait()
+            except queue.Empty:
+                break
+            future.set_exception(RuntimeError(f"Tk UI unavailable: {self._error}"))
+
+
+ui = UiThread()
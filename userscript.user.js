@@ -1,10 +1,15 @@
 // ==UserScript==
 // @name         Work Wellness Assistant Bridge
 // @namespace    http://tampermonkey.net/
-// @version      0.2
+// @version      0.5
 // @description  Detect YouTube usage and show work time panel
 // @match        *://*/*
 // @grant        GM_addStyle
+// @grant        GM_getValue
+// @grant        GM_setValue
+// @grant        GM_deleteValue
+// @grant        GM_listValues
+// @grant        GM_addValueChangeListener
 // @run-at       document-idle
 // ==/UserScript==
 
@@ -36,54 +41,187 @@
       </div>`;
     document.documentElement.appendChild(box);
 
-    document.getElementById('wwa_start').onclick = ()=> fetch(`${API}/start`, {method:'POST'});
-    document.getElementById('wwa_end').onclick = ()=> fetch(`${API}/end`, {method:'POST'});
+    document.getElementById('wwa_start').onclick = ()=> enqueue('start_work', {reason:'manual'});
+    document.getElementById('wwa_end').onclick = ()=> enqueue('end_work', {reason:'manual'});
 
+    // Cross-tab coordination: one leader tab (lease in GM storage, shared by
+    // all tabs of this script) holds the connection to the agent, mirrors the
+    // status into GM storage and sends the merged YouTube signal.
+    const TAB_ID = Math.random().toString(36).slice(2);
+    const LEASE_MS = 6000, HEARTBEAT_MS = 2000, YT_STALE_MS = 10000, YT_DEBOUNCE_MS = 2000;
+    const K_LEADER = 'wwa_leader', K_STATUS = 'wwa_status', K_YT_SENT = 'wwa_yt_sent', YT_PREFIX = 'wwa_yt_';
+
+    function render(s){
+        document.getElementById('wwa_work').textContent = s.work_minutes ?? '-';
+        document.getElementById('wwa_left').textContent = s.remaining_minutes ?? '-';
+    }
+    render(GM_getValue(K_STATUS, {}));
+    GM_addValueChangeListener(K_STATUS, (_k, _old, s)=> render(s || {}));
+
+    // Outbox: each event is kept in GM storage (one key per event, so tabs
+    // never overwrite each other) with an id and the time it happened. The
+    // leader posts them in time order to /events, which applies them at that
+    // time and ignores ids it has seen, and deletes them once accepted. While
+    // the agent is unreachable retries back off up to BACKOFF_MAX_MS.
+    const OB_PREFIX = 'wwa_ob_', K_OB_KICK = 'wwa_outbox_kick', OB_MAX = 1000, OB_BATCH = 200;
+    const BACKOFF_MIN_MS = 1000, BACKOFF_MAX_MS = 60000;
+
+    function enqueue(type, extra){
+        const id = `${Date.now().toString(36)}-${TAB_ID}-${Math.random().toString(36).slice(2, 8)}`;
+        GM_setValue(OB_PREFIX + id, {id, type, ts: Date.now(), ...extra});
+        GM_setValue(K_OB_KICK, Date.now());  // wakes the leader in whichever tab it is
+    }
+    function outbox(){
+        return GM_listValues()
+            .filter(k => k.startsWith(OB_PREFIX))
+            .map(k => [k, GM_getValue(k, null)])
+            .filter(([, v]) => v)
+            .sort((a, b) => a[1].ts - b[1].ts);
+    }
+    let flushing = false, backoffMs = 0, retryAt = 0;
+    async function flushOutbox(){
+        if(!isLeader || flushing || Date.now() < retryAt) return;
+        let items = outbox();
+        if(items.length > OB_MAX){
+            items.slice(0, items.length - OB_MAX).forEach(([k]) => GM_deleteValue(k));
+            items = items.slice(-OB_MAX);
+        }
+        if(!items.length) return;
+        flushing = true;
+        try{
+            for(let i = 0; i < items.length; i += OB_BATCH){
+                const batch = items.slice(i, i + OB_BATCH);
+                const r = await fetch(`${API}/events`, {
+                    method:'POST', headers:{'Content-Type':'application/json'},
+                    body: JSON.stringify(batch.map(([, v]) => v)),
+                });
+                // 400 means the batch itself is malformed; resending cannot help
+                if(!r.ok && r.status !== 400) throw new Error(`HTTP ${r.status}`);
+                batch.forEach(([k]) => GM_deleteValue(k));
+            }
+            backoffMs = 0; retryAt = 0;
+        }catch(_){
+            backoffMs = Math.min(BACKOFF_MAX_MS, Math.max(BACKOFF_MIN_MS, backoffMs * 2));
+            retryAt = Date.now() + backoffMs * (0.5 + Math.random() / 2);
+        }finally{
+            flushing = false;
+        }
+    }
+    GM_addValueChangeListener(K_OB_KICK, ()=> flushOutbox());
+
+    let isLeader = false, source = null, pollTimer = null;
+    const status = {};
+    function publish(delta){
+        Object.assign(status, delta);
+        GM_setValue(K_STATUS, {...status});
+    }
     async function refresh(){
         try{
             const r = await fetch(`${API}/status`, {cache:'no-store'});
-            if(!r.ok) return;
-            const s = await r.json();
-            document.getElementById('wwa_work').textContent = s.work_minutes;
-            document.getElementById('wwa_left').textContent = s.remaining_minutes;
+            if(r.ok) publish(await r.json());
         }catch(_){ /* ignore */ }
     }
-    setInterval(refresh, 15000); refresh();
-
-    // YouTube watching detection
-    const onYouTube = /(^|\.)youtube\.com$/.test(location.hostname);
-    let ytActive = false;
-
-    function startYT(){
-        if(ytActive) return; ytActive = true;
-        fetch(`${API}/event`, {method:'POST', headers:{'Content-Type':'application/json'}, body: JSON.stringify({type:'youtube_start', url: location.href})});
+    function becomeLeader(){
+        isLeader = true;
+        retryAt = 0;
+        flushOutbox();
+        if(window.EventSource){
+            source = new EventSource(`${API}/stream`);
+            source.onmessage = e => publish(JSON.parse(e.data));
+            // Refused (503: the agent serves a limited number of streams): poll instead
+            source.onerror = () => {
+                if(source && source.readyState === EventSource.CLOSED){ source = null; startPolling(); }
+            };
+        }else{
+            startPolling();
+        }
+    }
+    function startPolling(){
+        if(!pollTimer){ pollTimer = setInterval(refresh, 15000); refresh(); }
+    }
+    function resignLeader(){
+        isLeader = false;
+        if(source){ source.close(); source = null; }
+        if(pollTimer){ clearInterval(pollTimer); pollTimer = null; }
     }
-    function stopYT(){
-        if(!ytActive) return; ytActive = false;
-        fetch(`${API}/event`, {method:'POST', headers:{'Content-Type':'application/json'}, body: JSON.stringify({type:'youtube_stop', url: location.href})});
+    function heartbeat(){
+        const now = Date.now();
+        const lease = GM_getValue(K_LEADER, null);
+        if(!lease || lease.id === TAB_ID || lease.until < now){
+            GM_setValue(K_LEADER, {id: TAB_ID, until: now + LEASE_MS});
+            // Another tab may have claimed at the same moment; last writer wins
+            setTimeout(()=>{
+                const won = (GM_getValue(K_LEADER, {}).id === TAB_ID);
+                if(won && !isLeader) becomeLeader();
+                if(!won && isLeader) resignLeader();
+            }, 100);
+        }else if(isLeader){
+            resignLeader();
+        }
+        if(isLeader){ syncYouTube(now); flushOutbox(); }
     }
+    window.addEventListener('pagehide', ()=>{
+        if(isLeader){ GM_deleteValue(K_LEADER); resignLeader(); }
+    });
 
-    function visibilityCheck(){
-        if(!onYouTube) return;
-        const visible = document.visibilityState === 'visible';
-        if(visible) startYT(); else stopYT();
+    // YouTube: every YouTube tab reports its own visibility and since when;
+    // the leader merges them ("any visible") and sends a change only once it
+    // held YT_DEBOUNCE_MS, stamped with the moment the merged state changed.
+    let ytCandidate = null, ytCandidateSince = 0;
+    function syncYouTube(now){
+        const tabs = GM_listValues()
+            .filter(k => k.startsWith(YT_PREFIX))
+            .map(k => [k, GM_getValue(k, null)])
+            .filter(([k, v]) => {
+                if(!v || now - v.ts > YT_STALE_MS){ GM_deleteValue(k); return false; }
+                return true;
+            })
+            .map(([, v]) => v);
+        const visible = tabs.filter(v => v.visible);
+        const watching = visible.length > 0;
+        if(watching !== ytCandidate){
+            // Watching began with the first tab shown, ended with the last one hidden
+            const since = watching ? Math.min(...visible.map(v => v.since || now))
+                                   : Math.max(0, ...tabs.map(v => v.since || 0));
+            ytCandidate = watching;
+            ytCandidateSince = Math.min(now, Math.max(since || now, ytCandidateSince));
+            return;
+        }
+        if(now - ytCandidateSince < YT_DEBOUNCE_MS) return;
+        if(GM_getValue(K_YT_SENT, false) === watching) return;
+        GM_setValue(K_YT_SENT, watching);
+        enqueue(watching ? 'youtube_start' : 'youtube_stop', {url: 'tabs', ts: ytCandidateSince});
     }
 
+    const onYouTube = /(^|\.)youtube\.com$/.test(location.hostname);
+    let ytVisible = null, ytVisibleSince = 0;
+    function reportVisibility(){
+        const visible = document.visibilityState === 'visible', now = Date.now();
+        if(visible !== ytVisible){ ytVisible = visible; ytVisibleSince = now; }
+        GM_setValue(YT_PREFIX + TAB_ID, {visible, since: ytVisibleSince, ts: now});
+    }
     if(onYouTube){
-        document.addEventListener('visibilitychange', visibilityCheck);
-        window.addEventListener('focus', visibilityCheck);
-        window.addEventListener('blur', visibilityCheck);
-        visibilityCheck();
+        document.addEventListener('visibilitychange', reportVisibility);
+        window.addEventListener('focus', reportVisibility);
+        window.addEventListener('blur', reportVisibility);
+        window.addEventListener('pagehide', ()=>{  // kept as hidden until stale, for its time
+            GM_setValue(YT_PREFIX + TAB_ID, {visible: false, since: Date.now(), ts: Date.now()});
+        });
+        setInterval(reportVisibility, HEARTBEAT_MS);
+        reportVisibility();
     }
 
+    setInterval(heartbeat, HEARTBEAT_MS);
+    heartbeat();
+
     // Generic manual break buttons via hotkeys
     // Ctrl+Alt+B = break start, Ctrl+Alt+N = break end
     document.addEventListener('keydown', e=>{
         if(e.ctrlKey && e.altKey && e.code==='KeyB'){
-            fetch(`${API}/event`, {method:'POST', headers:{'Content-Type':'application/json'}, body: JSON.stringify({type:'break_start', reason:'manual-hotkey'})});
+            enqueue('break_start', {reason:'manual-hotkey'});
         }
         if(e.ctrlKey && e.altKey && e.code==='KeyN'){
-            fetch(`${API}/event`, {method:'POST', headers:{'Content-Type':'application/json'}, body: JSON.stringify({type:'break_end', reason:'manual-hotkey'})});
+            enqueue('break_end', {reason:'manual-hotkey'});
         }
     });
 })();
@@ -1,5 +1,3 @@
-from __future__ import annotations
-
 """Windows session lock/unlock monitor with a clear API and tests in mind.
 
 - On Windows: creates a hidden message-only window, registers for
@@ -9,6 +7,8 @@ from __future__ import annotations
 Design goals: readability, minimal branching, safe cleanup, and testability.
 """
 
+from __future__ import annotations
+
 from dataclasses import dataclass
 from typing import Callable, Optional
 import sys
@@ -121,6 +121,7 @@ class WindowsSessionMonitor:
     # Window procedure
     def _wnd_proc(self, hwnd, msg, wparam, lparam):  # pragma: no cover - exercised via tests with fakes
         if msg == self.WM_WTSSESSION_CHANGE:
+            # Runs on the message pump: callbacks must only enqueue (session.py)
             if wparam == self.WTS_SESSION_LOCK and self.cb.on_lock:
                 self.cb.on_lock()
             elif wparam == self.WTS_SESSION_UNLOCK and self.cb.on_unlock:
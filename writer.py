@@ -0,0 +1,211 @@
+from __future__ import annotations
+
+import queue
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from journal import Journal
+
+_STOP = object()
+
+
+class _Call:
+    """A function queued to run on the writer thread; see ``LogWriter.call``."""
+
+    def __init__(self, fn: Callable[[], Any]) -> None:
+        self.fn = fn
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+
+
+class LogWriter:
+    """Background thread that drains a bounded queue into journals in batches.
+
+    A single consumer keeps rows in submission order. A batch is written when
+    it reaches ``batch_size`` rows or ``flush_interval`` seconds after its
+    first row, whichever comes first. ``flush()`` places a barrier in the
+    queue: everything submitted before it is written and fsynced.
+    """
+
+    def __init__(
+        self, max_queue: int = 10000, batch_size: int = 256, flush_interval: float = 1.0
+    ) -> None:
+        self._q: "queue.Queue[object]" = queue.Queue(maxsize=max_queue)
+        self._batch_size = max(1, batch_size)
+        self._flush_interval = flush_interval
+        self._thread: Optional[threading.Thread] = None
+        self._start_lock = threading.Lock()
+        self._dirty: Dict[int, Journal] = {}
+        self._sync_soon = threading.Event()  # a flush(wait=False) found the queue full
+        self._counts = threading.Lock()  # submitted/dropped are updated by producers
+        self.submitted = 0
+        self.dropped = 0
+        self.written = 0
+        self.batches = 0
+        self.errors = 0
+
+    # Public API
+    def start(self) -> None:
+        with self._start_lock:
+            if self._thread is not None:
+                return
+            self._thread = threading.Thread(
+                target=self._run, name="wwa-log-writer", daemon=True
+            )
+            self._thread.start()
+
+    def stop(self, timeout: float = 5.0) -> None:
+        if self._thread is None:
+            return
+        self.flush(timeout=timeout)
+        self._q.put(_STOP)
+        self._thread.join(timeout=timeout)
+        self._thread = None
+
+    def submit(self, journal: Journal, row: Dict) -> bool:
+        """Queue a row without blocking. False if the queue is full."""
+        self.start()
+        try:
+            self._q.put_nowait((journal, row))
+        except queue.Full:
+            with self._counts:
+                self.dropped += 1
+            return False
+        with self._counts:
+            self.submitted += 1
+        return True
+
+    def submit_many(self, journal: Journal, rows: List[Dict]) -> bool:
+        """Queue rows as one unit; they are written in a single append."""
+        if not rows:
+            return True
+        self.start()
+        try:
+            self._q.put_nowait((journal, rows))
+        except queue.Full:
+            with self._counts:
+                self.dropped += len(rows)
+            return False
+        with self._counts:
+            self.submitted += len(rows)
+        return True
+
+    def flush(self, wait: bool = True, timeout: float = 5.0) -> bool:
+        """Write and fsync everything submitted so far.
+
+        With ``wait=False`` the call never blocks: the barrier is queued if
+        there is room, otherwise (False) the writer syncs after its next
+        write instead.
+        """
+        self.start()
+        done = threading.Event()
+        if not wait:
+            try:
+                self._q.put_nowait(done)
+            except queue.Full:
+                self._sync_soon.set()
+                return False
+            return True
+        try:
+            self._q.put(done, timeout=timeout)
+        except queue.Full:
+            return False
+        return done.wait(timeout)
+
+    def call(self, fn: Callable[[], Any]) -> Any:
+        """Run ``fn`` on the writer thread once everything submitted before
+        is written and fsynced, and return its result. Rows submitted
+        meanwhile are written after it returns, so ``fn`` sees the journals
+        and sinks in the same state (e.g. to rebuild one from the other)."""
+        self.start()
+        item = _Call(fn)
+        self._q.put(item)
+        item.done.wait()
+        if item.error is not None:
+            raise item.error
+        return item.result
+
+    def stats(self) -> dict:
+        with self._counts:
+            submitted, dropped = self.submitted, self.dropped
+        return {
+            "queue_depth": self._q.qsize(),
+            "submitted": submitted,
+            "dropped": dropped,
+            "written": self.written,
+            "batches": self.batches,
+            "errors": self.errors,
+        }
+
+    # Internals
+    def _write(self, batch: List[Tuple[Journal, Any]]) -> None:
+        if not batch:
+            return
+        grouped: Dict[int, Tuple[Journal, List[Dict]]] = {}
+        for journal, row in batch:
+            rows = grouped.setdefault(id(journal), (journal, []))[1]
+            if isinstance(row, list):
+                rows.extend(row)
+            else:
+                rows.append(row)
+        for key, (journal, rows) in grouped.items():
+            try:
+                journal.append_many(rows)
+            except OSError:
+                self.errors += len(rows)
+                continue
+            self._dirty[key] = journal
+            self.written += len(rows)
+        self.batches += 1
+        batch.clear()
+        if self._sync_soon.is_set():
+            self._sync_soon.clear()
+            self._sync()
+
+    def _sync(self) -> None:
+        for journal in self._dirty.values():
+            try:
+                journal.sync()
+            except OSError:
+                self.errors += 1
+        self._dirty.clear()
+
+    def _run(self) -> None:
+        batch: List[Tuple[Journal, Any]] = []
+        deadline: Optional[float] = None
+        while True:
+            timeout = None if deadline is None else max(0.0, deadline - time.monotonic())
+            try:
+                item = self._q.get(timeout=timeout)
+            except queue.Empty:
+                self._write(batch)
+                deadline = None
+                continue
+            if item is _STOP:
+                self._write(batch)
+                self._sync()
+                return
+            if isinstance(item, threading.Event):
+                self._write(batch)
+                self._sync()
+                deadline = None
+                item.set()
+                continue
+            if isinstance(item, _Call):
+                self._write(batch)
+                self._sync()
+                deadline = None
+                try:
+                    item.result = item.fn()
+                except BaseException as exc:  # re-raised in the caller
+                    item.error = exc
+                item.done.set()
+                continue
+            batch.append(item)  # type: ignore[arg-type]
+            if deadline is None:
+                deadline = time.monotonic() + self._flush_interval
+            if len(batch) >= self._batch_size:
+                self._write(batch)
+                deadline = None
@@ -0,0 +1,168 @@
+"""XLSX export of a journal, one workbook per calendar month.
+
+``aktywnosc.jsonl`` is exported to ``aktywnosc-2026-10.xlsx``,
+``aktywnosc-2026-11.xlsx``, ... next to ``aktywnosc.xlsx``. Each export
+reads only the journal bytes appended since the previous one (the offset is
+kept in a small state file, so this holds across restarts) and rewrites
+only the months those rows belong to, in openpyxl's write-only mode. Its
+cost is bounded by one month of rows, however long the history is. XLSX
+is a zip of XML parts, so a sheet cannot be appended to without rewriting
+that part; a month is the unit that is rewritten.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import re
+from pathlib import Path
+from typing import Dict, List, Optional, Set, Tuple
+
+from journal import Journal
+
+_MONTH = re.compile(r"\d{4}-\d{2}")
+
+
+def _month(row: Dict) -> str:
+    ts = str(row.get("timestamp", ""))[:7]
+    return ts if _MONTH.fullmatch(ts) else "undated"
+
+
+class MonthlyExport:
+    """Monthly XLSX files from ``journal``, named after ``path``.
+
+    Rows of the newest month stay in memory between exports; an older month
+    that receives a late row is read back from its file first. A journal
+    that was replaced (a sidecar fold rewrites it) or a month file that
+    went missing leads to a full rebuild.
+    """
+
+    def __init__(self, journal: Journal, path: Path, columns: List[str], state: Path) -> None:
+        self.journal = journal
+        self.path = path
+        self.columns = columns
+        self.state = state
+        self._months: Dict[str, List[list]] = {}
+        self._dirty: Set[str] = set()
+        self._files: Dict[str, int] = {}  # month -> journal offset its file covers
+        self._offset = 0
+        self._inode: Optional[int] = None
+        self.files_written = 0
+        self.rows_written = 0
+        self._load_state()
+
+    def path_for(self, month: str) -> Path:
+        return self.path.with_name(f"{self.path.stem}-{month}{self.path.suffix}")
+
+    def reset(self) -> None:
+        """Forget what was exported; the next export rewrites every month."""
+        self._months.clear()
+        self._dirty.clear()
+        self._files.clear()
+        self._offset = 0
+        self._inode = None
+
+    def _load_state(self) -> None:
+        try:
+            state = json.loads(self.state.read_text(encoding="utf-8"))
+            self._inode = state["inode"]
+            self._files = {m: int(o) for m, o in state["files"].items()}
+            self._offset = int(state["offset"])
+        except (OSError, ValueError, KeyError, TypeError, AttributeError):
+            self.reset()
+
+    def _save_state(self) -> None:
+        # After a restart, re-read from the oldest month that is not written yet
+        offset = min([self._files.get(m, 0) for m in self._dirty] + [self._offset])
+        tmp = self.state.with_name(self.state.name + ".tmp")
+        tmp.write_text(
+            json.dumps({"inode": self._inode, "offset": offset, "files": self._files}),
+            encoding="utf-8",
+        )
+        os.replace(tmp, self.state)
+
+    def _read_month(self, month: str) -> List[list]:
+        from openpyxl import load_workbook
+
+        wb = load_workbook(self.path_for(month), read_only=True)
+        try:
+            width = len(self.columns)
+            return [
+                (list(r) + [None] * width)[:width]
+                for r in wb.active.iter_rows(min_row=2, values_only=True)
+            ]
+        finally:
+            wb.close()
+
+    def _write_month(self, month: str) -> bool:
+        from openpyxl import Workbook
+
+        wb = Workbook(write_only=True)
+        ws = wb.create_sheet("Sheet1")
+        ws.append(self.columns)
+        rows = self._months[month]
+        for row in rows:
+            ws.append(row)
+        path = self.path_for(month)
+        tmp = path.with_name(f"~{path.name}")
+        try:
+            wb.save(tmp)
+            os.replace(tmp, path)
+        except (PermissionError, OSError):  # Excel holds the file
+            return False
+        self.files_written += 1
+        self.rows_written += len(rows)
+        return True
+
+    def export(self) -> bool:
+        """Write the months with new rows. False if a file was locked; the
+        rows stay pending and the next call retries them."""
+        try:
+            inode = os.stat(self.journal.path).st_ino
+        except FileNotFoundError:
+            return True
+        if inode != self._inode or self.journal.size() < self._offset:
+            self.reset()
+            self._inode = inode
+        records, offset = self.journal.tail(self._offset)
+        new: List[Tuple[str, list]] = []
+        for row, end in records:
+            month = _month(row)
+            if end > self._files.get(month, 0):  # not yet in its file
+                new.append((month, [row.get(c) for c in self.columns]))
+        try:
+            for month in {m for m, _ in new} - set(self._months):
+                self._months[month] = self._read_month(month) if month in self._files else []
+        except FileNotFoundError:
+            self.reset()
+            return self.export()
+        except (PermissionError, OSError):
+            return False
+        for month, values in new:
+            self._months[month].append(values)
+            self._dirty.add(month)
+        changed, self._offset = offset != self._offset, offset
+
+        ok = True
+        for month in sorted(self._dirty):
+            if self._write_month(month):
+                self._dirty.discard(month)
+                self._files[month] = self._offset
+                changed = True
+            else:
+                ok = False
+        if changed:
+            self._save_state()
+        latest = max(self._months, default=None)
+        for month in [m for m in self._months if m != latest and m not in self._dirty]:
+            del self._months[month]
+        return ok
+
+    def stats(self) -> dict:
+        return {
+            "months": len(self._files),
+            "pending": sorted(self._dirty),
+            "offset": self._offset,
+            "files_written": self.files_written,
+            "rows_written": self.rows_written,
+        }